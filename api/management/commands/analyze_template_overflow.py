@@ -0,0 +1,98 @@
+import sys
+import json
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from main.models import Template
+from api.services.executor import RenderExecutor, render_executor, template_snapshot
+from api.services.overflow import SCOPES, analyze_template
+
+
+class Command(BaseCommand):
+    help = "Проверить, какие элементы шаблона не помещаются на этикетках товаров и контрагентов (без генерации PDF)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("template", help="ID или название шаблона")
+        parser.add_argument(
+            "--elements",
+            dest="elements",
+            default=None,
+            help="JSON-файл с измененной разметкой (\"-\" для stdin); шаблон в базе не меняется",
+        )
+        parser.add_argument("--width", dest="width", type=float, default=None, help="Измененная ширина, мм")
+        parser.add_argument("--height", dest="height", type=float, default=None, help="Измененная высота, мм")
+        parser.add_argument(
+            "--scope",
+            dest="scope",
+            choices=SCOPES,
+            default="linked",
+            help="linked: только привязанные к шаблону; catalog: все товары и контрагенты (по умолчанию linked)",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            type=int,
+            default=None,
+            help="Сколько процессов использовать (по умолчанию LABEL_RENDER_WORKERS)",
+        )
+        parser.add_argument("--json", action="store_true", dest="as_json", help="Вывести отчет в JSON")
+
+    def handle(self, *args, **options):
+        logging.getLogger("api.services").setLevel(logging.WARNING)
+        template = self._template(options["template"])
+        snapshot = {**template_snapshot(template), "name": template.name}
+        if options["elements"]:
+            snapshot["elements"] = self._elements(options["elements"])
+        for name in ("width", "height"):
+            if options[name] is not None:
+                snapshot[name] = options[name]
+
+        executor = RenderExecutor(workers=options["workers"]) if options["workers"] else render_executor
+        try:
+            report = analyze_template(snapshot, scope=options["scope"], executor=executor)
+        finally:
+            if executor is not render_executor:
+                executor.shutdown()
+
+        if options["as_json"]:
+            self.stdout.write(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(
+            f"Шаблон: {report.template} ({report.version}), товаров: {report.products}, "
+            f"контрагентов: {report.contractors}, процессов: {report.workers}, {report.seconds:.2f} с"
+        )
+        self.stdout.write(
+            f"{'элемент':<20} {'текстов':>8} {'уменьш.':>8} {'мин.кегль':>10} {'не влезло':>10} {'ошибок':>7} {'макс.длина':>11}"
+        )
+        for element in report.elements.values():
+            line = (
+                f"{element.key:<20} {element.texts:>8} {element.shrunk:>8} {element.at_min:>10} "
+                f"{element.overflow:>10} {element.errors:>7} {element.max_length:>11}"
+            )
+            self.stdout.write(self.style.ERROR(line) if element.overflow else self.style.WARNING(line) if element.at_min else line)
+            for item in element.worst:
+                self.stdout.write(
+                    f"    {item['kind']}:{item['pk']} {item['name'][:40]}: {item['length']} симв., "
+                    f"кегль {item['font_size']}, строк {item['lines']}, высота {item['text_height']} из {element.height}"
+                )
+
+        if report.problems:
+            self.stdout.write(self.style.WARNING(f"Проблемных элементов: {len(report.problems)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Все тексты помещаются"))
+
+    def _template(self, value):
+        lookup = {"pk": value} if value.isdigit() else {"name": value}
+        try:
+            return Template.objects.get(**lookup)
+        except Template.DoesNotExist:
+            raise CommandError(f"Шаблон {value} не найден")
+
+    def _elements(self, path):
+        try:
+            if path == "-":
+                return json.load(sys.stdin)
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось прочитать разметку {path}: {e}")
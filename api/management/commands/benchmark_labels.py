@@ -0,0 +1,314 @@
+import os
+import time
+import statistics
+import logging
+from io import BytesIO
+from PIL import Image
+from django.core.management.base import BaseCommand
+from main.models import Contractor, Product
+from api.serializers import ProductPayloadSerializer
+from api.services.label_service import label_service
+from api.services.executor import RenderExecutor
+from api.services.pdf_profile import PDF_PROFILES
+from api.services.raster import RASTER_TOLERANCE, pixel_diff
+from api.services.search import DEFAULT_LIMIT, search_contractors, search_products
+from api.services.text_fit import TextFitter, linear_fit
+from api.services.text_measure import text_measure
+from main.utils.barcode import BarcodeCache, BARCODE_OPTIONS, BARCODE_DPI
+
+
+class Command(BaseCommand):
+    help = "Замеры производительности генерации этикеток на товарах из базы."
+
+    suites = ["text_fit", "text_measure", "barcode", "raster", "executor", "pdf_profile", "search"]
+    search_budget_ms = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--suite",
+            dest="suite",
+            choices=self.suites,
+            default="text_fit",
+            help="Какой замер запустить (по умолчанию text_fit)",
+        )
+        parser.add_argument(
+            "--limit",
+            dest="limit",
+            type=int,
+            default=50,
+            help="Сколько товаров взять для замера (по умолчанию 50)",
+        )
+        parser.add_argument(
+            "--copies",
+            dest="copies",
+            type=int,
+            default=5,
+            help="Сколько копий каждой этикетки печатать в замере executor (по умолчанию 5)",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="До скольких процессов наращивать замер executor (по умолчанию число ядер)",
+        )
+
+    def handle(self, *args, **options):
+        logging.getLogger("api.services").setLevel(logging.WARNING)
+        if options["suite"] == "search":
+            # searches need no templates, any products will do
+            return self.bench_search(options)
+        samples = self._product_samples(options["limit"])
+        if not samples:
+            self.stderr.write(self.style.ERROR("Нет доступных товаров с шаблоном"))
+            return
+        getattr(self, f"bench_{options['suite']}")(samples, options)
+
+    def _product_samples(self, limit):
+        products = (
+            Product.objects
+            .filter(status=Product.ProductStatus.AVAILABLE)
+            .select_related("category")
+            .prefetch_related("product_template__template", "org_standart__org_standart")
+            [:limit]
+        )
+        samples = []
+        for product in products:
+            entity_template = product.entity_template
+            if not entity_template:
+                continue
+            payload = ProductPayloadSerializer(instance=product).data
+            samples.append((product, entity_template.template, payload))
+        return samples
+
+    def bench_text_fit(self, samples, options):
+        total_linear = 0
+        total_bisect = 0
+        mismatches = 0
+        linear_time = 0.0
+        bisect_time = 0.0
+
+        self.stdout.write(f"{'товар':>8} {'элемент':<20} {'символов':>9} {'кегль':>6} {'итог':>6} {'линейно':>8} {'бинарно':>8}")
+        for product, template, payload in samples:
+            plan = label_service.compile_layout(template)
+            for op in plan.ops:
+                text = payload.get(op.key)
+                if op.kind != "text" or not text:
+                    continue
+
+                start = time.perf_counter()
+                linear_size, linear_wraps = linear_fit(text, op.style_name, op.raw_style, op.width, op.height, op.min_fontsize)
+                linear_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                fit = TextFitter().fit(text, op.style_name, op.raw_style, op.width, op.height, min_fontsize=op.min_fontsize)
+                bisect_time += time.perf_counter() - start
+
+                total_linear += linear_wraps
+                total_bisect += fit.wraps
+                line = f"{product.pk:>8} {op.key:<20} {len(text):>9} {op.raw_style.get('fontSize'):>6} {fit.font_size:>6} {linear_wraps:>8} {fit.wraps:>8}"
+                if fit.font_size != linear_size:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"{line}  (рекурсия выбрала {linear_size})"))
+                else:
+                    self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS("Замер text_fit завершен"))
+        self.stdout.write(f"Переносов, рекурсия: {total_linear} за {linear_time * 1000:.1f} мс")
+        self.stdout.write(f"Переносов, бинарный поиск: {total_bisect} за {bisect_time * 1000:.1f} мс")
+        self.stdout.write(f"Расхождений кегля: {mismatches}")
+
+    def bench_text_measure(self, samples, options):
+        elements = {}
+        for _, template, payload in samples:
+            plan = label_service.compile_layout(template)
+            for op in plan.ops:
+                text = payload.get(op.key)
+                if op.kind == "text" and text:
+                    elements.setdefault((plan.version, op.key), (op, []))[1].append(text)
+
+        texts = sum(len(values) for _, values in elements.values())
+        paragraph_time = 0.0
+        start = time.perf_counter()
+        measured = [text_measure.fit_many(values, op.raw_style, op.width, op.height, op.min_fontsize) for op, values in elements.values()]
+        measure_time = time.perf_counter() - start
+
+        fallbacks = 0
+        mismatches = 0
+        for (op, values), fits in zip(elements.values(), measured):
+            for text, fit in zip(values, fits):
+                start = time.perf_counter()
+                reference = TextFitter().fit(text, op.style_name, op.raw_style, op.width, op.height, min_fontsize=op.min_fontsize)
+                paragraph_time += time.perf_counter() - start
+                if fit is None:
+                    fallbacks += 1
+                elif (fit.font_size, fit.lines, fit.fits) != (reference.font_size, len(reference.paragraph.blPara.lines), reference.fits):
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"{op.key:<20} {fit.font_size:>6} {reference.font_size:>6}  {text[:60]}"))
+
+        self.stdout.write(self.style.SUCCESS("Замер text_measure завершен"))
+        self.stdout.write(f"Текстов: {texts}, элементов: {len(elements)}, через Paragraph (разметка): {fallbacks}")
+        self.stdout.write(f"Paragraph: {paragraph_time * 1000:.1f} мс, numpy: {measure_time * 1000:.1f} мс")
+        self.stdout.write(f"Расхождений кегля или переносов: {mismatches}")
+
+    def bench_barcode(self, samples, options):
+        codes = [str(product.barcode) for product, _, _ in samples]
+        cache = BarcodeCache(maxsize=len(codes))
+
+        start = time.perf_counter()
+        for code in codes:
+            cache._render(code[:12], BARCODE_OPTIONS, BARCODE_DPI)
+        cold = time.perf_counter() - start
+
+        for code in codes:
+            cache.get_png(code)
+        cache.memory_hits = cache.redis_hits = cache.misses = 0
+
+        start = time.perf_counter()
+        for code in codes:
+            cache.get_png(code)
+        warm = time.perf_counter() - start
+
+        stats = cache.stats()
+        self.stdout.write(self.style.SUCCESS("Замер barcode завершен"))
+        self.stdout.write(f"Штрихкодов: {len(codes)}")
+        self.stdout.write(f"Без кэша: {cold * 1000:.1f} мс ({cold * 1000 / len(codes):.2f} мс на штрихкод)")
+        self.stdout.write(f"Из кэша: {warm * 1000:.1f} мс ({warm * 1000 / len(codes):.4f} мс на штрихкод)")
+        self.stdout.write(f"Попаданий: {stats['memory_hits'] + stats['redis_hits']}, промахов: {stats['misses']}")
+
+    def bench_raster(self, samples, options):
+        from pdf2image import convert_from_bytes
+
+        poppler_time = 0.0
+        raster_time = 0.0
+        worst = 0.0
+        compared = 0
+
+        for product, template, payload in samples:
+            plan = label_service.compile_layout(template)
+
+            start = time.perf_counter()
+            placements = label_service.layout_label(plan, payload)
+            png = label_service._render_png(plan, placements)
+            raster_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                pdf = label_service._generate_label(plan, payload)
+                reference = convert_from_bytes(pdf, dpi=203)[0]
+            except Exception as e:
+                self.stderr.write(self.style.WARNING(f"Poppler недоступен, сравнение пропущено: {e}"))
+                break
+            poppler_time += time.perf_counter() - start
+
+            diff = pixel_diff(Image.open(BytesIO(png)), reference)
+            worst = max(worst, diff)
+            compared += 1
+            line = f"{product.pk:>8} расхождение: {diff:.2f}%"
+            self.stdout.write(self.style.ERROR(line) if diff > RASTER_TOLERANCE else line)
+
+        self.stdout.write(self.style.SUCCESS("Замер raster завершен"))
+        self.stdout.write(f"Этикеток: {len(samples)}, сравнено с poppler: {compared}")
+        self.stdout.write(f"PIL напрямую: {raster_time * 1000 / len(samples):.1f} мс на этикетку")
+        if compared:
+            self.stdout.write(f"PDF + poppler: {poppler_time * 1000 / compared:.1f} мс на этикетку")
+            self.stdout.write(f"Худшее расхождение: {worst:.2f}% (допуск {RASTER_TOLERANCE}%)")
+
+    def bench_executor(self, samples, options):
+        jobs = [(template, payload, options["copies"]) for _, template, payload in samples]
+        pages = len(jobs) * options["copies"]
+        limit = max(options["workers"], 1)
+        counts = [1]
+        while counts[-1] * 2 <= limit:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != limit:
+            counts.append(limit)
+
+        self.stdout.write(f"Этикеток: {pages}, ядер: {os.cpu_count()}")
+        self.stdout.write(f"{'процессов':>9} {'секунд':>8} {'этикеток/с':>11} {'ускорение':>10}")
+        baseline = None
+        for workers in counts:
+            executor = RenderExecutor(workers=workers, chunk_pages=1)
+            if workers > 1:
+                executor.warm()
+            try:
+                start = time.perf_counter()
+                executor.render_pdf(jobs)
+                elapsed = time.perf_counter() - start
+            finally:
+                executor.shutdown()
+            baseline = baseline or elapsed
+            self.stdout.write(f"{workers:>9} {elapsed:>8.2f} {pages / elapsed:>11.1f} {baseline / elapsed:>9.2f}x")
+
+        self.stdout.write(self.style.SUCCESS("Замер executor завершен"))
+
+    def bench_pdf_profile(self, samples, options):
+        copies = options["copies"]
+        jobs = [(template, payload, copies) for _, template, payload in samples]
+        pages = len(jobs) * copies
+
+        self.stdout.write(f"Товаров: {len(samples)}, этикеток в пачке: {pages}")
+        self.stdout.write(
+            f"{'профиль':<8} {'байт/этик.':>11} {'base64':>9} {'мс/этик.':>9} "
+            f"{'пачка байт/этик.':>17} {'пачка мс/этик.':>15} {'стабилен':>9}"
+        )
+        for profile in PDF_PROFILES.values():
+            single_bytes = 0
+            start = time.perf_counter()
+            for _, template, payload in samples:
+                plan = label_service.compile_layout(template)
+                pdf = label_service._render_pdf(plan, label_service.layout_label(plan, payload), profile)
+                single_bytes += len(pdf)
+            single_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            batch = label_service.generate_batch_pdf(jobs, pdf_profile=profile.name)
+            batch_time = time.perf_counter() - start
+
+            _, template, payload = samples[0]
+            plan = label_service.compile_layout(template)
+            placements = label_service.layout_label(plan, payload)
+            stable = label_service._render_pdf(plan, placements, profile) == label_service._render_pdf(plan, placements, profile)
+
+            per_label = single_bytes / len(samples)
+            self.stdout.write(
+                f"{profile.name:<8} {per_label:>11.0f} {per_label * 4 / 3:>9.0f} {single_time * 1000 / len(samples):>9.1f} "
+                f"{len(batch) / pages:>17.0f} {batch_time * 1000 / pages:>15.1f} {'да' if stable else 'нет':>9}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Замер pdf_profile завершен"))
+
+    def bench_search(self, options):
+        products = list(Product.objects.order_by("?")[:options["limit"]])
+        names = [product.name.split() for product in products]
+        words = [word for name in names for word in name if word.isalpha() and len(word) > 4]
+        queries = {
+            "слово": [(search_products, word) for word in words],
+            "начало слова": [(search_products, word[:4]) for word in words],
+            "опечатка": [(search_products, word[:2] + word[3] + word[2] + word[4:]) for word in words],
+            "два слова": [(search_products, " ".join(name[:2])) for name in names if len(name) > 1],
+            "штрихкод": [(search_products, str(product.barcode)[4:11]) for product in products],
+            "контрагент": [
+                (search_contractors, value)
+                for contractor in Contractor.objects.order_by("?")[:options["limit"]]
+                for value in (contractor.city, f"{contractor.street} {contractor.name}".strip())
+                if value
+            ],
+        }
+        querysets = {search_products: Product.objects.all(), search_contractors: Contractor.objects.all()}
+
+        self.stdout.write(f"Товаров в базе: {Product.objects.count()}, контрагентов: {Contractor.objects.count()}")
+        self.stdout.write(f"{'запрос':<14} {'запросов':>9} {'медиана мс':>11} {'худший мс':>10} {'дольше ' + str(self.search_budget_ms) + ' мс':>13}")
+        for kind, items in queries.items():
+            if not items:
+                continue
+            times = []
+            for search, query in items:
+                start = time.perf_counter()
+                list(search(querysets[search], query)[:DEFAULT_LIMIT])
+                times.append((time.perf_counter() - start) * 1000)
+            slow = sum(t > self.search_budget_ms for t in times)
+            line = f"{kind:<14} {len(times):>9} {statistics.median(times):>11.1f} {max(times):>10.1f} {slow:>13}"
+            self.stdout.write(self.style.ERROR(line) if slow else line)
+
+        self.stdout.write(self.style.SUCCESS("Замер search завершен"))
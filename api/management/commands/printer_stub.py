@@ -0,0 +1,74 @@
+import socketserver
+import threading
+from pathlib import Path
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from api.services.printer import parse_printer_jobs
+
+
+class PrinterStubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        data = self.rfile.read()
+        if data:
+            self.server.record(self.client_address, data)
+
+
+class PrinterStubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, output_dir=None, on_job=None):
+        super().__init__(address, PrinterStubHandler)
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.on_job = on_job
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def record(self, client, data: bytes):
+        jobs = parse_printer_jobs(data)
+        with self._lock:
+            number = len(self.jobs) + 1
+            self.jobs.extend(jobs)
+        if self.output_dir:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            language = jobs[0]["language"] if jobs else "raw"
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            (self.output_dir / f"{stamp}-{number:05d}.{language}").write_bytes(data)
+        if self.on_job:
+            self.on_job(client, data, jobs)
+
+
+class Command(BaseCommand):
+    help = "Заглушка термопринтера: принимает задания ZPL/TSPL по TCP, разбирает и сохраняет их."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", dest="host", default="127.0.0.1", help="Адрес (по умолчанию 127.0.0.1)")
+        parser.add_argument("--port", dest="port", type=int, default=9100, help="Порт (по умолчанию 9100)")
+        parser.add_argument(
+            "--output-dir",
+            dest="output_dir",
+            default=None,
+            help="Каталог для сохранения принятых заданий",
+        )
+
+    def handle(self, *args, **options):
+        server = PrinterStubServer((options["host"], options["port"]), options["output_dir"], on_job=self._report)
+        self.stdout.write(f"Заглушка принтера слушает {options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.SUCCESS(f"Принято заданий: {len(server.jobs)}"))
+
+    def _report(self, client, data, jobs):
+        if not jobs:
+            self.stderr.write(self.style.WARNING(f"{client[0]}: {len(data)} байт, задания не распознаны"))
+            return
+        for job in jobs:
+            self.stdout.write(
+                f"{client[0]}: {job['language']} {job['bytes']} байт, "
+                f"команд {len(job['commands'])}, графики {job['graphics']}, "
+                f"штрихкоды {', '.join(job['barcodes']) or '-'}, копий {job['copies']}"
+            )
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderJob",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Задание",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="render_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "задание печати",
+                "verbose_name_plural": "задания печати",
+            },
+        ),
+    ]
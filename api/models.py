@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import models
+
+
+class RenderJob(models.Model):
+    # Who started a background PDF job; the job state itself lives in the Celery backend.
+    id = models.CharField(
+        "Задание",
+        max_length=36,
+        primary_key=True,
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="render_jobs",
+        verbose_name="Пользователь",
+    )
+    created_at = models.DateTimeField(
+        "Создано",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "задание печати"
+        verbose_name_plural = "задания печати"
+
+    def __str__(self):
+        return self.id
@@ -0,0 +1,72 @@
+import json
+import base64
+import binascii
+from typing import Any, List, Optional, Sequence
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    # Pages by the last row's ordering values instead of OFFSET, so a deep page costs the
+    # same single range query as the first. The last ordering field must be unique.
+    default_limit = 100
+    max_limit = 500
+
+    def __init__(self, ordering: Sequence[str]):
+        self.ordering = list(ordering)
+        self.names = [field.lstrip('-') for field in self.ordering]
+
+    def is_requested(self, request) -> bool:
+        return 'limit' in request.query_params or 'cursor' in request.query_params
+
+    def paginate(self, queryset, request) -> List[Any]:
+        self.request = request
+        self.limit = self.get_limit(request)
+        cursor = request.query_params.get('cursor')
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode(cursor)))
+        rows = list(queryset[:self.limit + 1])
+        self.last = rows[self.limit - 1] if len(rows) > self.limit else None
+        return rows[:self.limit]
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Ensure this value is greater than or equal to 1.'})
+        return min(limit, self.max_limit)
+
+    def get_next_url(self) -> Optional[str]:
+        if self.last is None:
+            return None
+        row = self.last
+        values = [row[name] if isinstance(row, dict) else getattr(row, name) for name in self.names]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'cursor', self.encode(values))
+
+    def after(self, values: List[Any]) -> Q:
+        # (a, b, c) > (x, y, z) spelled out per field, honouring descending fields
+        condition = Q()
+        for i, (field, name) in enumerate(zip(self.ordering, self.names)):
+            step = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": values[i]})
+            for prev, value in zip(self.names[:i], values):
+                step &= Q(**{prev: value})
+            condition |= step
+        return condition
+
+    def encode(self, values: List[Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(values, ensure_ascii=False).encode()).decode()
+
+    def decode(self, cursor: str) -> List[Any]:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, binascii.Error):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        return values
+
@@ -1,11 +1,12 @@
 from rest_framework.permissions import BasePermission
+from .utils.access import user_access
 
 
 class IsPrintOperator(BasePermission):
     def has_permission(self, request, view):
         return (
             request.user.is_superuser
-            or request.user.groups.filter(name='Печатник').exists()
+            or user_access.in_group(request.user, 'Печатник')
         )
 
 
@@ -13,5 +14,5 @@ class IsContractor(BasePermission):
     def has_permission(self, request, view):
         return (
             request.user.is_superuser
-            or request.user.groups.filter(name='Контрагент').exists()
+            or user_access.in_group(request.user, 'Контрагент')
         )
@@ -0,0 +1,19 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class BinaryRenderer(BaseRenderer):
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if data is not None else b''
+
+
+class PDFRenderer(BinaryRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class PNGRenderer(BinaryRenderer):
+    media_type = 'image/png'
+    format = 'png'
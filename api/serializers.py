@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from main.models import BaseInfo, Product, Contractor
+from .services.pdf_profile import PDF_PROFILES
 from .utils.format import (
     to_dec,
     safe_load_json,
@@ -93,7 +95,9 @@ class ProductPayloadSerializer(serializers.Serializer, ProductRepresentationMixi
         base = super().to_representation(instance)
         request = self.context.get('request')
         extra = {}
-        if request and request.GET.get('date', None):
+        if self.context.get('date'):
+            extra["date"] = self.context['date']
+        elif request and request.GET.get('date', None):
             extra["date"] = request.GET.get('date')
         return self.build_product_representation(base, instance, extra)
 
@@ -123,9 +127,12 @@ class ProductTemplateListSerializer(serializers.Serializer):
     name = serializers.CharField()
     category = serializers.CharField()
     edit_url = serializers.URLField(required=False, allow_blank=True)
+    thumbnail = serializers.DictField(required=False)
+    similarity = serializers.FloatField(required=False)
 
 
 class ProductTemplateSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
     name = serializers.CharField()
     category = serializers.CharField()
     pdf = serializers.CharField()
@@ -137,9 +144,70 @@ class ContractorTemplateListSerializer(serializers.Serializer):
     street = serializers.CharField()
     category = serializers.CharField()
     edit_url = serializers.URLField(required=False, allow_blank=True)
+    thumbnail = serializers.DictField(required=False)
+    similarity = serializers.FloatField(required=False)
 
 
 class ContractorTemplateSerializer(serializers.Serializer):
     name = serializers.CharField()
     category = serializers.CharField()
     pdf = serializers.CharField()
+
+
+class LabelBatchSerializerMixin:
+    def validate_items(self, items):
+        if not items:
+            raise serializers.ValidationError("Batch is empty")
+        pages = sum(item['quantity'] for item in items)
+        if pages > settings.LABEL_BATCH_MAX_PAGES:
+            raise serializers.ValidationError(f"Too many labels: {pages}, limit is {settings.LABEL_BATCH_MAX_PAGES}")
+        return items
+
+
+class ProductBatchItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    date = serializers.DateField(required=False, allow_null=True)
+
+
+class ProductBatchSerializer(LabelBatchSerializerMixin, serializers.Serializer):
+    items = ProductBatchItemSerializer(many=True)
+
+
+class ContractorBatchItemSerializer(serializers.Serializer):
+    contractor_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class ContractorBatchSerializer(LabelBatchSerializerMixin, serializers.Serializer):
+    items = ContractorBatchItemSerializer(many=True)
+
+
+class LabelBatchResultSerializer(serializers.Serializer):
+    pages = serializers.IntegerField()
+    pdf = serializers.CharField()
+
+
+class RenderJobCreateSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=["product", "contractor"])
+    items = serializers.ListField(child=serializers.DictField())
+    pdf_profile = serializers.ChoiceField(choices=list(PDF_PROFILES), required=False)
+
+    def validate(self, attrs):
+        batch_serializer = {
+            "product": ProductBatchSerializer,
+            "contractor": ContractorBatchSerializer,
+        }[attrs['kind']]
+        batch = batch_serializer(data={'items': attrs['items']})
+        batch.is_valid(raise_exception=True)
+        attrs['items'] = batch.validated_data['items']
+        return attrs
+
+
+class RenderJobSerializer(serializers.Serializer):
+    job_id = serializers.CharField()
+    status = serializers.CharField()
+    pages_done = serializers.IntegerField()
+    pages_total = serializers.IntegerField(allow_null=True)
+    download_url = serializers.URLField(required=False, allow_blank=True)
+    error = serializers.CharField(required=False, allow_blank=True)
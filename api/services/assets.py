@@ -0,0 +1,140 @@
+import logging
+import threading
+from io import BytesIO
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+IMAGES_DIR = BASE_DIR / "static" / "img"
+
+PRINTER_DPIS = (203, 300)
+RASTER_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+VECTOR_SUFFIXES = (".svg",)
+BITMAP_THRESHOLD = 128
+
+
+@dataclass
+class Asset:
+    name: str
+    mtime: float
+    data: bytes
+    image: Optional[Image.Image] = None
+    reader: Optional[ImageReader] = None
+    drawing: Optional[object] = None
+    bitmaps: Dict[Tuple[int, int, int], Image.Image] = field(default_factory=dict)
+
+    @property
+    def is_vector(self) -> bool:
+        return self.drawing is not None
+
+    @property
+    def size_pt(self) -> Tuple[float, float]:
+        if self.drawing is not None:
+            return self.drawing.width, self.drawing.height
+        dpi = self.image.info.get("dpi", (72, 72))[0] or 72
+        return self.image.width * 72 / dpi, self.image.height * 72 / dpi
+
+
+class AssetRegistry:
+    def __init__(self, root: Path, dpis: Tuple[int, ...] = PRINTER_DPIS):
+        self.root = root
+        self.dpis = dpis
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        self._scanned = False
+
+    def get(self, filename: str) -> Asset:
+        self._scan()
+        path = (self.root / filename).resolve()
+        mtime = path.stat().st_mtime
+        asset = self._assets.get(filename)
+        if asset is None or asset.mtime != mtime:
+            asset = self._load(filename, path, mtime)
+            with self._lock:
+                self._assets[filename] = asset
+        return asset
+
+    def bitmap(self, filename: str, dpi: int, size: Tuple[int, int]) -> Image.Image:
+        asset = self.get(filename)
+        key = (dpi, size[0], size[1])
+        bitmap = asset.bitmaps.get(key)
+        if bitmap is None:
+            bitmap = self._rasterize(asset, dpi, size)
+            asset.bitmaps[key] = bitmap
+        return bitmap
+
+    def warm(self, filename: str, width_pt: float, height_pt: float):
+        for dpi in self.dpis:
+            size = (max(int(width_pt * dpi / 72), 1), max(int(height_pt * dpi / 72), 1))
+            try:
+                self.bitmap(filename, dpi, size)
+            except Exception as e:
+                logger.warning(f"Failed to rasterize asset {filename} at {dpi} dpi: {e}")
+
+    def preload(self):
+        with self._lock:
+            self._scanned = True
+        for path in sorted(self.root.iterdir()):
+            if path.suffix.lower() not in RASTER_SUFFIXES + VECTOR_SUFFIXES:
+                continue
+            try:
+                self.get(path.name)
+            except Exception as e:
+                logger.warning(f"Failed to preload asset {path.name}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._assets.clear()
+            self._scanned = False
+
+    def _scan(self):
+        if not self._scanned:
+            self.preload()
+
+    def _load(self, filename: str, path: Path, mtime: float) -> Asset:
+        with open(str(path), "rb") as f:
+            data = f.read()
+        asset = Asset(name=filename, mtime=mtime, data=data)
+
+        if path.suffix.lower() in VECTOR_SUFFIXES:
+            from svglib.svglib import svg2rlg
+
+            asset.drawing = svg2rlg(str(path))
+            if asset.drawing is None:
+                raise ValueError(f"Unable to parse SVG {filename}")
+        else:
+            asset.image = Image.open(BytesIO(data))
+            asset.image.load()
+            asset.reader = ImageReader(BytesIO(data))
+        return asset
+
+    def _rasterize(self, asset: Asset, dpi: int, size: Tuple[int, int]) -> Image.Image:
+        if asset.drawing is not None:
+            from reportlab.graphics import renderPM
+
+            w_pt, h_pt = asset.size_pt
+            scale = min(size[0] / (w_pt * dpi / 72), size[1] / (h_pt * dpi / 72))
+            source = renderPM.drawToPIL(asset.drawing, dpi=dpi * scale, bg=0xFFFFFF)
+        else:
+            source = asset.image
+
+        if source.mode in ("RGBA", "LA", "P"):
+            rgba = source.convert("RGBA")
+            source = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+            source.alpha_composite(rgba)
+
+        fitted = source.convert("L")
+        ratio = min(size[0] / fitted.width, size[1] / fitted.height)
+        target = (max(round(fitted.width * ratio), 1), max(round(fitted.height * ratio), 1))
+        if fitted.size != target:
+            fitted = fitted.resize(target, Image.Resampling.LANCZOS)
+        fitted = fitted.point(lambda v: 255 if v >= BITMAP_THRESHOLD else 0)
+        return fitted.convert("1", dither=Image.Dither.NONE)
+
+
+asset_registry = AssetRegistry(IMAGES_DIR)
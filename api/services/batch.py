@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Tuple
+from main.models import Product, Contractor
+from api.serializers import ProductPayloadSerializer, ContractorPayloadSerializer
+
+Job = Tuple[Any, Dict[str, Any], int]
+
+
+class BatchError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def product_jobs(items: List[Dict[str, Any]], request=None) -> List[Job]:
+    ids = {item['product_id'] for item in items}
+    products = (
+        Product.objects
+        .select_related('category')
+        .prefetch_related('product_template__template', 'org_standart__org_standart')
+        .in_bulk(ids)
+    )
+    missing = sorted(ids - set(products))
+    if missing:
+        raise BatchError(f'Products not found: {missing}', status=404)
+
+    jobs = []
+    for item in items:
+        product = products[item['product_id']]
+        entity_template = product.entity_template
+        if not entity_template:
+            raise BatchError(f'Product {product.pk} has no template')
+        date = item.get('date')
+        context = {'request': request, 'date': date.isoformat() if hasattr(date, 'isoformat') else date}
+        payload = ProductPayloadSerializer(instance=product, context=context).data
+        jobs.append((entity_template.template, payload, item['quantity']))
+    return jobs
+
+
+def contractor_jobs(items: List[Dict[str, Any]], request=None) -> List[Job]:
+    ids = {item['contractor_id'] for item in items}
+    contractors = (
+        Contractor.objects
+        .select_related('category')
+        .prefetch_related('contractor_template__template')
+        .in_bulk(ids)
+    )
+    missing = sorted(ids - set(contractors))
+    if missing:
+        raise BatchError(f'Contractors not found: {missing}', status=404)
+
+    jobs = []
+    for item in items:
+        contractor = contractors[item['contractor_id']]
+        entity_template = contractor.entity_template
+        if not entity_template:
+            raise BatchError(f'Contractor {contractor.pk} has no template')
+        payload = ContractorPayloadSerializer(instance=contractor).data
+        jobs.append((entity_template.template, payload, item['quantity']))
+    return jobs
+
+
+BATCH_JOBS = {
+    "product": product_jobs,
+    "contractor": contractor_jobs,
+}
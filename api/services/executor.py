@@ -0,0 +1,122 @@
+import atexit
+import logging
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from pypdf import PdfReader, PdfWriter
+from main.models import Template
+from .label_service import label_service
+from .pdf_profile import get_pdf_profile
+from .render_worker import init_worker, ping, render_chunk
+
+logger = logging.getLogger(__name__)
+
+Job = Tuple[Any, Dict[str, Any], int]
+
+
+def template_snapshot(template) -> Dict[str, Any]:
+    # plain dicts pickle without the app registry and keep the same layout version as the model
+    if isinstance(template, dict):
+        return template
+    return {"pk": template.pk, "width": template.width, "height": template.height, "elements": template.elements}
+
+
+class RenderExecutor:
+    def __init__(self, workers: int = 1, chunk_pages: int = 50):
+        self.workers = max(workers, 1)
+        self.chunk_pages = max(chunk_pages, 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def render_pdf(self, jobs: Iterable[Job], pdf_profile: Optional[str] = None) -> bytes:
+        profile = get_pdf_profile(pdf_profile)
+        jobs = [(template_snapshot(template), dict(payload), quantity) for template, payload, quantity in jobs]
+        chunks = self.split(jobs)
+        if len(chunks) < 2 or self.workers < 2:
+            return label_service.generate_batch_pdf(jobs, pdf_profile=profile.name)
+        try:
+            parts = list(self._get_pool().map(render_chunk, chunks, [profile.name] * len(chunks)))
+        except BrokenProcessPool as e:
+            logger.error(f"Render pool is broken, rendering inline: {e}")
+            self.shutdown()
+            return label_service.generate_batch_pdf(jobs, pdf_profile=profile.name)
+        return self.merge(parts, dedupe=profile.dedupe_on_merge)
+
+    def map(self, fn, *iterables) -> list:
+        # fn must be importable without Django, like the render_worker entry points
+        try:
+            return list(self._get_pool().map(fn, *iterables))
+        except BrokenProcessPool as e:
+            logger.error(f"Render pool is broken, running inline: {e}")
+            self.shutdown()
+            return list(map(fn, *iterables))
+
+    def split(self, jobs: List[Job]) -> List[List[Job]]:
+        pages = sum(quantity for _, _, quantity in jobs)
+        size = max(self.chunk_pages, -(-pages // self.workers))
+        chunks, chunk, filled = [], [], 0
+        for template, payload, quantity in jobs:
+            while quantity:
+                take = min(quantity, size - filled)
+                chunk.append((template, payload, take))
+                filled += take
+                quantity -= take
+                if filled == size:
+                    chunks.append(chunk)
+                    chunk, filled = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def merge(self, parts: List[bytes], dedupe: bool = False) -> bytes:
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(PdfReader(BytesIO(part)))
+        if dedupe:
+            # every chunk embeds its own copy of the barcodes and logos
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        buf = BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    def warm(self):
+        pool = self._get_pool()
+        for future in [pool.submit(ping) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                templates = [template_snapshot(t) for t in Template.objects.all()]
+                # spawn keeps forked gunicorn/celery DB connections and locks out of the workers
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(templates,),
+                )
+            return self._pool
+
+
+render_executor = RenderExecutor(
+    workers=getattr(settings, "LABEL_RENDER_WORKERS", 1),
+    chunk_pages=getattr(settings, "LABEL_RENDER_CHUNK_PAGES", 50),
+)
+atexit.register(render_executor.shutdown)
+
+
+@worker_process_shutdown.connect
+def shutdown_render_executor(**kwargs):
+    # prefork celery children leave through os._exit, which skips atexit
+    render_executor.shutdown()
@@ -1,24 +1,51 @@
+import math
 import logging
 import base64
 from io import BytesIO
-from pathlib import Path
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from PIL import Image
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
 from reportlab.platypus import Paragraph
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.enums import TA_CENTER
-from PIL import Image, ImageDraw, ImageFont
 from pdf2image import convert_from_bytes
-from barcode import EAN13
-from barcode.writer import ImageWriter
 from main.models import Template
+from main.utils.barcode import barcode_cache, ean13_widget
 from api.utils.styles import STYLES
+from .layout import LayoutOp, LayoutPlan, Placement, TextBlock, layout_cache, template_version
+from .text_fit import FitResult, text_fitter
+from .assets import asset_registry
+from .raster import raster_renderer
+from .printer import PRINTER_RENDERERS
+from .render_cache import render_cache, render_key
+from .pdf_profile import PdfProfile, get_pdf_profile, pdf_scope
+from .png_profile import PngProfile, get_png_profile
 
 logger = logging.getLogger(__name__)
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-IMAGES_DIR = BASE_DIR / "static" / "img"
+THUMBNAIL_WIDTH = 160
+
+
+@lru_cache(maxsize=256)
+def image_reader(data: bytes, gray: bool = False) -> ImageReader:
+    # one reader per distinct image keeps the decoded pixels around, so repeated
+    # drawImage calls only hash them and reuse the XObject already in the document
+    if not gray:
+        return ImageReader(BytesIO(data))
+    image = Image.open(BytesIO(data))
+    if image.mode in ("RGBA", "LA", "P"):
+        rgba = image.convert("RGBA")
+        image = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image.alpha_composite(rgba)
+    return ImageReader(image.convert("L"))
+
+
+def canvas_profile(c: canvas.Canvas) -> PdfProfile:
+    return getattr(c, "_label_profile", None) or get_pdf_profile()
+
 
 class LabelService:
     def __init__(self):
@@ -32,290 +59,86 @@ class LabelService:
     def mm_to_px(mm: float, dpi: int = 203) -> float:
         return int(float(mm) * dpi / 25.4)
 
-    def draw_debug(self, c: canvas.Canvas, spec: Dict[str, Any] = {}):
-        page_w, page_h = c._pagesize
-        c.rect(
-            self.mm_to_pt(spec.get("x")),
-            page_h - self.mm_to_pt(spec.get("y")) - self.mm_to_pt(spec.get("height")),
-            self.mm_to_pt(spec.get("width")),
-            self.mm_to_pt(spec.get("height")),
-            stroke=1,
-            fill=0,
-        )
+    def draw_debug(self, c: canvas.Canvas, op: LayoutOp):
+        c.rect(op.x, op.bottom, op.width, op.height, stroke=1, fill=0)
 
-    def draw_barcode_v2(self, c: canvas.Canvas, barcode: str = "0000000000000", spec: Dict[str, Any] = {}):
-        from reportlab.graphics.barcode import eanbc
+    def draw_barcode_v2(self, c: canvas.Canvas, placement: Placement):
         from reportlab.graphics.shapes import Drawing
         from reportlab.graphics import renderPDF
 
-        x = self.mm_to_pt(spec.get("x"))
-        y = self.mm_to_pt(spec.get("y"))
-        w = self.mm_to_pt(spec.get("width"))
-        h = self.mm_to_pt(spec.get("height"))
-
-        min_dpi = 203
-        raw_module = w / 95
-        module_px = max(1, round(raw_module * min_dpi / 72))
-        barWidth = module_px * 72 / min_dpi
-
-        widget = eanbc.Ean13BarcodeWidget(barcode, barWidth=barWidth, barHeight=h, humanReadable=True)
+        op = placement.op
+        widget = ean13_widget(placement.value, op.width, op.height)
 
-        drawing = Drawing(w, h)
+        drawing = Drawing(op.width, op.height)
         drawing.add(widget)
-        page_h = c._pagesize[1]
-        renderPDF.draw(drawing, c, x, page_h - y - h)
+        renderPDF.draw(drawing, c, op.x, op.bottom)
 
-    def draw_barcode(self, c: canvas.Canvas, barcode: str = "0000000000000", spec: Dict[str, Any] = {}):
-        img_bytes = self._get_barcode_bytes(barcode)
-        img = ImageReader(BytesIO(img_bytes))
+    def draw_barcode(self, c: canvas.Canvas, placement: Placement):
+        op = placement.op
+        img_bytes = self._get_barcode_bytes(placement.value)
+        img = image_reader(img_bytes, canvas_profile(c).gray_images)
         c.drawImage(
             img,
-            self.mm_to_pt(spec.get("x")),
-            c._pagesize[1] - self.mm_to_pt(spec.get("y")) - self.mm_to_pt(spec.get("height")),
-            width=self.mm_to_pt(spec.get("width")),
-            height=self.mm_to_pt(spec.get("height")),
+            op.x,
+            op.bottom,
+            width=op.width,
+            height=op.height,
             preserveAspectRatio=True,
             mask="auto",
         )
 
-    def draw_img(self, c: canvas.Canvas, spec: Dict[str, Any] = {}):
-        filename = spec.get("filename")
-        img_bytes = self._get_img_bytes(filename)
-        img = ImageReader(BytesIO(img_bytes))
+    def draw_img(self, c: canvas.Canvas, placement: Placement):
+        from reportlab.graphics import renderPDF
+
+        op = placement.op
+        asset = asset_registry.get(op.filename)
+        if asset.is_vector:
+            w_pt, h_pt = asset.size_pt
+            scale = min(op.width / w_pt, op.height / h_pt)
+            c.saveState()
+            c.translate(op.x + (op.width - w_pt * scale) / 2, op.bottom + (op.height - h_pt * scale) / 2)
+            c.scale(scale, scale)
+            renderPDF.draw(asset.drawing, c, 0, 0)
+            c.restoreState()
+            return
+
+        gray = canvas_profile(c).gray_images
         c.drawImage(
-            img,
-            self.mm_to_pt(spec.get("x")),
-            c._pagesize[1] - self.mm_to_pt(spec.get("y")) - self.mm_to_pt(spec.get("height")),
-            width=self.mm_to_pt(spec.get("width")),
-            height=self.mm_to_pt(spec.get("height")),
+            image_reader(asset.data, True) if gray else asset.reader,
+            op.x,
+            op.bottom,
+            width=op.width,
+            height=op.height,
             preserveAspectRatio=True,
             mask="auto",
         )
 
-    def draw_text_v3(
-        self,
-        c: canvas.Canvas,
-        d: ImageDraw.Draw,
-        text: str,
-        spec: Dict[str, Any] = {},
-        override_styles: Dict[str, Any] = {}
-    ):
-        from reportlab.pdfbase.pdfmetrics import getAscent
-
-        if not text:
+    def draw_text_v2(self, c: canvas.Canvas, placement: Placement):
+        block = placement.block
+        if block is None:
             return
 
-        style_name = spec.get("style", "product__body_1")
-        style_obj = self._build_style(style_name, override_styles)
-        options = spec.get("options", {})
-        p = Paragraph(text, style_obj)
-        page_h = c._pagesize[1]
-        textbox_w = self.mm_to_pt(spec.get("width"))
-        textbox_h = self.mm_to_pt(spec.get("height"))
-        w_wrap, h_wrap = p.wrap(textbox_w, textbox_h)
-        raw_styles = STYLES.get(style_name, STYLES["product__body_1"])
-
-        if h_wrap > textbox_h:
-            base_fontsize = raw_styles.get("fontSize")
-            current_fontsize = override_styles.get("fontSize", None) or base_fontsize
-            min_fontsize = options.get("min_fontsize", None)
-            logger.info(f"Text does not fit the textbox; reduce font or enlarge box:\r\n{text}")
-
-            if min_fontsize and min_fontsize < current_fontsize:
-                self.draw_text_v3(
-                    c,
-                    d,
-                    text,
-                    spec,
-                    {
-                        **override_styles,
-                        "fontSize": current_fontsize - 0.5,
-                        "leading": current_fontsize - 0.5
-                    }
-                )
-                return
-
-        x_pt = self.mm_to_pt(spec.get("x")) + raw_styles.get("leftIndent")
-        y_top = page_h - self.mm_to_pt(spec.get("y"))
-
-        x_px = max(int(x_pt * 203 / 72), 1)
-        y_px = max(int(self.mm_to_pt(spec.get("y")) * 203 / 72), 1)
-
-
-        font_name = p.style.fontName
-        font_size = p.style.fontSize
-        leading = font_size
-        # TODO: replace 1 with real font ascent
-        ascent = getattr(p.blPara, "ascent", 1)
-
-        if hasattr(style_obj, "vAlignment") and style_obj.vAlignment == "center":
-            ascent += (textbox_h - (leading * (len(p.blPara.lines) - 1) + font_size)) / 2
-
         text_obj = c.beginText()
-        text_obj.setTextOrigin(x_pt, y_top - ascent)
-        text_obj.setFont(font_name, font_size)
-        text_obj.setLeading(font_size)
-        ww_font_size = max(int(font_size * 203 / 72), 1)
-        ww_font_name = font_name.lower().replace(" ", "_")
-        font = ImageFont.truetype(f"/app/main/static/fonts/{ww_font_name}.ttf", ww_font_size)
-
-        i = 0
-        if hasattr(style_obj, "alignment") and style_obj.alignment == TA_CENTER:
-            if isinstance(p.blPara.lines[0], tuple):
-                for line_width, words in p.blPara.lines:
-                    text_line = " ".join(words)
-                    offset = max(int((line_width) * 203 / 72), 1) / 2
-                    d.text((x_px + offset, y_px + (i * ww_font_size)), text_line, fill=0, font=font)
-                    text_obj.setTextOrigin(x_pt + offset, text_obj.getY())
-                    text_obj.textLine(text_line)
-                    i += 1
-            else:
-                for line in p.blPara.lines:
-                    text_line = "".join(frag.text for frag in line.words)
-                    offset = max(int((line.extraSpace / 2) * 203 / 72), 1)
-                    d.text((x_px + offset, y_px + (i * ww_font_size)), text_line, fill=0, font=font)
-                    text_obj.setTextOrigin(x_pt + offset, text_obj.getY())
-                    text_obj.textLine(text_line)
-                    i += 1
-        else:
-            if isinstance(p.blPara.lines[0], tuple):
-                for _, words in p.blPara.lines:
-                    text_line = " ".join(words)
-                    d.text((x_px, y_px + (i * ww_font_size)), text_line, fill=0, font=font)
-                    text_obj.textLine(text_line)
-                    i += 1
-            else:
-                for line in p.blPara.lines:
-                    text_line = "".join(frag.text for frag in line.words)
-                    d.text((x_px, y_px + (i * ww_font_size)), text_line, fill=0, font=font)
-                    text_obj.textLine(text_line)
-                    i += 1
-
-        c.drawText(text_obj)
-
-    def draw_text_v2(
-        self,
-        c: canvas.Canvas,
-        text: str,
-        spec: Dict[str, Any] = {},
-        override_styles: Dict[str, Any] = {}
-    ):
-        from reportlab.pdfbase.pdfmetrics import getAscent
-
-        if not text:
-            return
+        text_obj.setTextOrigin(block.x, block.y)
+        text_obj.setFont(block.font_name, block.font_size)
+        text_obj.setLeading(block.font_size)
 
-        style_name = spec.get("style", "product__body_1")
-        style_obj = self._build_style(style_name, override_styles)
-        options = spec.get("options", {})
-        p = Paragraph(text, style_obj)
-        page_h = c._pagesize[1]
-        textbox_w = self.mm_to_pt(spec.get("width"))
-        textbox_h = self.mm_to_pt(spec.get("height"))
-        w_wrap, h_wrap = p.wrap(textbox_w, textbox_h)
-        raw_styles = STYLES.get(style_name, STYLES["product__body_1"])
-
-        if h_wrap > textbox_h:
-            base_fontsize = raw_styles.get("fontSize")
-            current_fontsize = override_styles.get("fontSize", None) or base_fontsize
-            min_fontsize = options.get("min_fontsize", None)
-            logger.info(f"Text does not fit the textbox; reduce font or enlarge box:\r\n{text}")
-
-            if min_fontsize and min_fontsize < current_fontsize:
-                self.draw_text_v2(
-                    c,
-                    text,
-                    spec,
-                    {
-                        **override_styles,
-                        "fontSize": current_fontsize - 0.5,
-                        "leading": current_fontsize - 0.5
-                    }
-                )
-                return
-
-        x_pt = self.mm_to_pt(spec.get("x")) + raw_styles.get("leftIndent")
-        y_top = page_h - self.mm_to_pt(spec.get("y"))
-
-
-        font_name = p.style.fontName
-        font_size = p.style.fontSize
-        leading = font_size
-        # TODO: replace 1 with real font ascent
-        ascent = getattr(p.blPara, "ascent", 1)
-
-        if hasattr(style_obj, "vAlignment") and style_obj.vAlignment == "center":
-            ascent += (textbox_h - (leading * (len(p.blPara.lines) - 1) + font_size)) / 2
-
-        text_obj = c.beginText()
-        text_obj.setTextOrigin(x_pt, y_top - ascent)
-        text_obj.setFont(font_name, font_size)
-        text_obj.setLeading(font_size)
-
-        if hasattr(style_obj, "alignment") and style_obj.alignment == TA_CENTER:
-            if isinstance(p.blPara.lines[0], tuple):
-                for line_width, words in p.blPara.lines:
-                    text_line = " ".join(words)
-                    offset = line_width / 2
-                    text_obj.setTextOrigin(x_pt + offset, text_obj.getY())
-                    text_obj.textLine(text_line)
-            else:
-                for line in p.blPara.lines:
-                    text_line = "".join(frag.text for frag in line.words)
-                    offset = line.extraSpace / 2
-                    text_obj.setTextOrigin(x_pt + offset, text_obj.getY())
-                    text_obj.textLine(text_line)
-        else:
-            if isinstance(p.blPara.lines[0], tuple):
-                for _, words in p.blPara.lines:
-                    text_line = " ".join(words)
-                    text_obj.textLine(text_line)
-            else:
-                for line in p.blPara.lines:
-                    text_line = "".join(frag.text for frag in line.words)
-                    text_obj.textLine(text_line)
+        for offset, text_line in block.lines:
+            if block.centered:
+                text_obj.setTextOrigin(block.x + offset, text_obj.getY())
+            text_obj.textLine(text_line)
 
         c.drawText(text_obj)
 
     def draw_text(
         self,
         c: canvas.Canvas,
+        op: LayoutOp,
         text: str = "Текст не заполнен",
-        spec: Dict[str, Any] = {},
         override_styles: Dict[str, Any] = {}
     ):
-        style_name = spec.get("style", "product__body_1")
-        style_obj = self._build_style(style_name, override_styles)
-        options = spec.get("options", {})
-        p = Paragraph(text, style_obj)
-        page_h = c._pagesize[1]
-        textbox_w = self.mm_to_pt(spec.get("width"))
-        textbox_h = self.mm_to_pt(spec.get("height"))
-        w_wrap, h_wrap = p.wrap(textbox_w, textbox_h)
-
-        if h_wrap > textbox_h:
-            raw_styles = STYLES.get(style_name, STYLES["product__body_1"])
-            base_fontsize = raw_styles.get("fontSize")
-            current_fontsize = override_styles.get("fontSize", None) or base_fontsize
-            min_fontsize = options.get("min_fontsize", None)
-            logger.info(f"Text does not fit the textbox; reduce font or enlarge box:\r\n{text}")
-
-            if min_fontsize and min_fontsize < current_fontsize:
-                self.draw_text(
-                    c,
-                    text,
-                    spec,
-                    {
-                        **override_styles,
-                        "fontSize": current_fontsize - 0.5,
-                        "leading": current_fontsize - 0.5
-                    }
-                )
-                return
-
-        x_pt = self.mm_to_pt(spec.get("x"))
-        y_pt = page_h - self.mm_to_pt(spec.get("y")) - h_wrap
-        p.drawOn(c, x_pt, y_pt)
+        fit = self._fit_text(op, text, override_styles)
+        fit.paragraph.drawOn(c, op.x, op.top - fit.height)
 
     def draw_text_beta(self, c: canvas.Canvas, text: str, spec: dict, override_styles: dict = {}):
         style_name = spec.get("style", "product__body_1")
@@ -361,39 +184,78 @@ class LabelService:
         kif = KeepInFrame(textbox_w, textbox_h, [p], mode=mode, vAlign="MIDDLE", hAlign="LEFT")
         frame.addFromList([kif], c)
 
+    def _layout_text(self, op: LayoutOp, text: str, override_styles: Dict[str, Any] = {}) -> TextBlock:
+        fit = self._fit_text(op, text, override_styles)
+        p = fit.paragraph
+        style_obj = p.style
+        font_size = style_obj.fontSize
+        leading = font_size
+        ascent = self._first_ascent(p.blPara, style_obj.fontName, font_size)
+
+        if hasattr(style_obj, "vAlignment") and style_obj.vAlignment == "center":
+            ascent += (op.height - (leading * (len(p.blPara.lines) - 1) + font_size)) / 2
+
+        centered = hasattr(style_obj, "alignment") and style_obj.alignment == TA_CENTER
+        block = TextBlock(
+            font_name=style_obj.fontName,
+            font_size=font_size,
+            x=op.x + op.raw_style.get("leftIndent"),
+            y=op.top - ascent,
+            centered=centered,
+            fits=fit.fits,
+        )
+        for line in p.blPara.lines:
+            if isinstance(line, tuple):
+                extra_space, words = line
+                text_line = " ".join(words)
+            else:
+                extra_space = line.extraSpace
+                text_line = "".join(frag.text for frag in line.words)
+            block.lines.append((extra_space / 2 if centered else 0, text_line))
+        return block
+
+    def _first_ascent(self, bl_para, font_name: str, font_size: float) -> float:
+        # plain paragraphs carry the font ascent; markup ones (kind 1) carry it per line
+        ascent = getattr(bl_para, "ascent", None)
+        if ascent is None and bl_para.lines:
+            ascent = getattr(bl_para.lines[0], "ascent", None)
+        if ascent is None:
+            ascent = pdfmetrics.getAscent(font_name, font_size)
+        return ascent
+
+    def _fit_text(self, op: LayoutOp, text: str, override_styles: Dict[str, Any] = {}) -> FitResult:
+        return text_fitter.fit(
+            text,
+            op.style_name,
+            op.raw_style,
+            op.width,
+            op.height,
+            min_fontsize=op.min_fontsize,
+            override_styles=override_styles,
+        )
+
     def _build_style(self, style_name: str, override: Dict[str, Any] = {}) -> ParagraphStyle:
         raw = STYLES.get(style_name, STYLES["product__body_1"])
         merged = {**raw, **(override or {})}
         return ParagraphStyle(style_name, **merged)
 
-    def _get_barcode_bytes(self, barcode: str) -> str:
-        code = str(barcode)[:12]
-        buffer = BytesIO()
-        writer = ImageWriter()
-        writer.dpi = 300
-        EAN13(code, writer=writer).write(
-            buffer,
-            options={
-                "quiet_zone": 0,
-                "write_text": True,
-                "foreground": "black",
-                "background": "white",
-                "module_width": 0.5,
-            },
-        )
-        return buffer.getvalue()
+    def _get_barcode_bytes(self, barcode: str) -> bytes:
+        return barcode_cache.get_png(barcode)
 
-    def _get_img_bytes(self, filename: str) -> str:
-        path = (IMAGES_DIR / filename).resolve()
-        with open(str(path), "rb") as f:
-            data = f.read()
-        return data
+    def _get_img_bytes(self, filename: str) -> bytes:
+        return asset_registry.get(filename).data
 
-    def _create_canvas(self, page_w_mm: float, page_h_mm: float):
-        page_w = self.mm_to_pt(page_w_mm)
-        page_h = self.mm_to_pt(page_h_mm)
+    def _create_canvas(self, page_w: float, page_h: float, profile: Optional[PdfProfile] = None):
+        profile = profile or get_pdf_profile()
         buf = BytesIO()
-        c = canvas.Canvas(buf, pagesize=(page_w, page_h), pageCompression=0, pdfVersion=(1, 4))
+        c = canvas.Canvas(
+            buf,
+            pagesize=(page_w, page_h),
+            pageCompression=int(profile.compression),
+            invariant=int(profile.invariant),
+            pdfVersion=(1, 4),
+        )
+        c._label_profile = profile
         return c, buf
 
     def _finalize_pdf(self, c: canvas.Canvas, buf: BytesIO) -> bytes:
@@ -403,35 +265,113 @@ class LabelService:
         buf.close()
         return pdf_bytes
 
-    def _generate_label(
-        self,
-        page_w_mm: float,
-        page_h_mm: float,
-        layout: Dict[str, Any],
-        payload: Dict[str, Any]
-    ) -> bytes:
-        c, buf = self._create_canvas(page_w_mm, page_h_mm)
-
-        for key, spec in layout.items():
+    def compile_layout(self, template) -> LayoutPlan:
+        version = template_version(template)
+        plan = layout_cache.get(version)
+        if plan is None:
+            if isinstance(template, dict):
+                width, height, elements = template["width"], template["height"], template["elements"]
+            else:
+                width, height, elements = template.width, template.height, template.elements
+            plan = self._compile_plan(version, width, height, elements)
+            layout_cache.put(plan)
+        return plan
+
+    def _compile_plan(self, version: str, page_w_mm: float, page_h_mm: float, layout: Dict[str, Any]) -> LayoutPlan:
+        plan = LayoutPlan(version=version, page_w=self.mm_to_pt(page_w_mm), page_h=self.mm_to_pt(page_h_mm))
+        for key, spec in (layout or {}).items():
             try:
-                value = payload.get(key)
+                plan.ops.append(self._compile_op(key, spec, plan.page_h))
+            except Exception as e:
+                logger.error(f"Error while compiling: {key}: {e}")
+        return plan
 
-                if spec.get("debug", False):
-                    self.draw_debug(c, spec)
+    def _compile_op(self, key: str, spec: Dict[str, Any], page_h: float) -> LayoutOp:
+        style_name = spec.get("style", "product__body_1")
+        op = LayoutOp(
+            key=key,
+            kind=spec.get("type", None) or "text",
+            x=self.mm_to_pt(spec.get("x")),
+            top=page_h - self.mm_to_pt(spec.get("y")),
+            width=self.mm_to_pt(spec.get("width")),
+            height=self.mm_to_pt(spec.get("height")),
+            style_name=style_name,
+            style=self._build_style(style_name),
+            raw_style=STYLES.get(style_name, STYLES["product__body_1"]),
+            options=spec.get("options", {}) or {},
+            filename=spec.get("filename"),
+            debug=spec.get("debug", False),
+        )
 
-                if spec.get("type", None) == "image" and "filename" in spec:
-                    self.draw_img(c, spec)
-                elif spec.get("type", None) == "barcode_v2":
-                    self.draw_barcode_v2(c, value, spec)
-                elif spec.get("type", None) == "barcode":
-                    self.draw_barcode(c, value, spec)
-                else:
-                    self.draw_text_v2(c, value, spec)
+        if op.kind == "image" and op.filename is not None:
+            op.draw = self.draw_img
+            op.raster = raster_renderer.draw_img
+            asset_registry.warm(op.filename, op.width, op.height)
+        elif op.kind == "barcode_v2":
+            op.draw = self.draw_barcode_v2
+            op.raster = raster_renderer.draw_barcode_v2
+        elif op.kind == "barcode":
+            op.draw = self.draw_barcode
+            op.raster = raster_renderer.draw_barcode
+        else:
+            op.kind = "text"
+            op.draw = self.draw_text_v2
+            op.raster = raster_renderer.draw_text
+        return op
+
+    def layout_label(self, plan: LayoutPlan, payload: Dict[str, Any]) -> List[Placement]:
+        placements = []
+        for op in plan.ops:
+            placement = Placement(op=op, value=payload.get(op.key))
+            if op.kind == "text" and placement.value:
+                try:
+                    placement.block = self._layout_text(op, placement.value)
+                except Exception as e:
+                    logger.error(f"Error while laying out: {op.key}: {e}")
+            placements.append(placement)
+        return placements
+
+    def _draw_plan(self, c: canvas.Canvas, placements: List[Placement]):
+        for placement in placements:
+            op = placement.op
+            try:
+                if op.debug:
+                    self.draw_debug(c, op)
+                op.draw(c, placement)
             except Exception as e:
-                logger.error(f"Error while drawing: {key}: {e}")
+                logger.error(f"Error while drawing: {op.key}: {e}")
 
-        pdf_bytes = self._finalize_pdf(c, buf)
-        return pdf_bytes
+    def _generate_label(self, plan: LayoutPlan, payload: Dict[str, Any]) -> bytes:
+        return self._render_pdf(plan, self.layout_label(plan, payload))
+
+    def _render_pdf(self, plan: LayoutPlan, placements: List[Placement], profile: Optional[PdfProfile] = None) -> bytes:
+        profile = profile or get_pdf_profile()
+        with pdf_scope(profile):
+            c, buf = self._create_canvas(plan.page_w, plan.page_h, profile)
+            self._draw_plan(c, placements)
+            return self._finalize_pdf(c, buf)
+
+    def _render_png(self, plan: LayoutPlan, placements: List[Placement], dpi: int = 203) -> bytes:
+        return self._encode_png(raster_renderer.render(plan, placements, dpi=dpi), dpi=dpi)
+
+    def thumbnail_size(self, template, dpi: int = 203, width: int = THUMBNAIL_WIDTH) -> Tuple[int, int]:
+        # known without rendering, so sprite sheets can be laid out before the thumbnails exist
+        plan = self.compile_layout(template)
+        page_w, page_h = math.ceil(plan.page_w * dpi / 72), math.ceil(plan.page_h * dpi / 72)
+        return width, max(round(page_h * width / page_w), 1)
+
+    def _thumbnail(self, image: Image.Image, width: int = THUMBNAIL_WIDTH) -> Image.Image:
+        height = max(round(image.height * width / image.width), 1)
+        return image.convert("L").resize((width, height), Image.Resampling.LANCZOS)
+
+    def _encode_png(self, image: Image.Image, dpi: int = 203, profile: Optional[PngProfile] = None, thumbnail: bool = False) -> bytes:
+        profile = profile or get_png_profile()
+        png_buf = BytesIO()
+        try:
+            profile.convert(image, thumbnail).save(png_buf, dpi=(dpi, dpi), format="PNG", compress_level=profile.compress_level)
+            return png_buf.getvalue()
+        finally:
+            png_buf.close()
 
     def _pdf_to_png_base64(self, pdf_bytes: bytes, dpi: int = 203) -> str:
         images = convert_from_bytes(pdf_bytes, dpi=dpi)
@@ -440,14 +380,9 @@ class LabelService:
             logger.error("pdf2image returned no images")
             raise RuntimeError("pdf2image returned no images")
 
-        img = images[0]
-        png_buf = BytesIO()
-
         try:
-            img.save(png_buf, dpi=(dpi, dpi), format="PNG")
-            png_bytes = png_buf.getvalue()
+            png_bytes = self._encode_png(images[0], dpi=dpi)
         finally:
-            png_buf.close()
             for im in images:
                 try:
                     im.close()
@@ -457,20 +392,205 @@ class LabelService:
         return base64.b64encode(png_bytes).decode("utf-8")
 
     def generate_template_png_preview_base64(self, template, dpi: int = 203) -> str:
+        return base64.b64encode(self.generate_template_png(template, dpi=dpi)).decode("utf-8")
+
+    def generate_template_png(self, template, dpi: int = 203) -> bytes:
         payload = {k: k for k in template["elements"]}
         elements = {
             k: {kk: vv for kk, vv in v.items() if kk in ("x", "y", "style", "width", "height")} | {"debug": True}
             for k, v in template["elements"].items()
         }
-        pdf_bytes = self._generate_label(template["width"], template["height"], elements, payload)
-        return self._pdf_to_png_base64(pdf_bytes, dpi=dpi)
+        plan = self.compile_layout({"width": template["width"], "height": template["height"], "elements": elements})
+        return self._render_png(plan, self.layout_label(plan, payload), dpi=dpi)
+
+    def cache_key(self, template, payload, fmt: str = "pdf", dpi: int = 203, pdf_profile: Optional[str] = None) -> str:
+        plan = self.compile_layout(template)
+        if fmt == "pdf":
+            return render_key(plan.version, dict(payload), f"pdf:{get_pdf_profile(pdf_profile).name}")
+        if fmt == "png":
+            return render_key(plan.version, dict(payload), f"png:{get_png_profile().key}", dpi)
+        if fmt == "thumbnail":
+            return render_key(plan.version, dict(payload), f"thumbnail:{THUMBNAIL_WIDTH}:{get_png_profile().key}", dpi)
+        return render_key(plan.version, dict(payload), fmt, dpi)
+
+    def is_rendered(self, template, payload, fmt: str = "pdf", dpi: int = 203, pdf_profile: Optional[str] = None) -> bool:
+        return render_cache.contains(self.cache_key(template, payload, fmt, dpi, pdf_profile))
+
+    def render(
+        self, template, payload, fmt: str = "pdf", dpi: int = 203, tags: Iterable[str] = (), pdf_profile: Optional[str] = None
+    ) -> bytes:
+        return self.render_many(template, payload, (fmt,), dpi=dpi, tags=tags, pdf_profile=pdf_profile)[fmt]
 
-    def generate_pdf_preview_base64(self, template: Template, payload) -> str:
-        pdf_bytes = self._generate_label(template.width, template.height, template.elements, payload)
+    def render_many(
+        self,
+        template,
+        payload,
+        formats: Iterable[str] = ("pdf", "png"),
+        dpi: int = 203,
+        tags: Iterable[str] = (),
+        pdf_profile: Optional[str] = None,
+    ) -> Dict[str, bytes]:
+        # one layout pass serves every requested output; png and thumbnail share one raster
+        plan = self.compile_layout(template)
+        payload = dict(payload)
+        keys = {fmt: self.cache_key(template, payload, fmt, dpi, pdf_profile) for fmt in formats}
+        results = {}
+        for fmt, key in keys.items():
+            data = render_cache.get(key)
+            if data is not None:
+                results[fmt] = data
+        missing = [fmt for fmt in keys if fmt not in results]
+        if not missing:
+            return results
+
+        template_pk = plan.version.split(":", 1)[0]
+        if template_pk != "draft":
+            tags = [*tags, f"template:{template_pk}"]
+
+        placements = self.layout_label(plan, payload)
+        image = None
+        for fmt in missing:
+            if fmt == "pdf":
+                data = self._render_pdf(plan, placements, get_pdf_profile(pdf_profile))
+            elif fmt in ("png", "thumbnail"):
+                if image is None:
+                    image = raster_renderer.render(plan, placements, dpi=dpi)
+                if fmt == "png":
+                    data = self._encode_png(image, dpi=dpi)
+                else:
+                    data = self._encode_png(self._thumbnail(image), dpi=dpi, thumbnail=True)
+            elif fmt in PRINTER_RENDERERS:
+                data = PRINTER_RENDERERS[fmt](dpi=dpi).render(plan, placements)
+            else:
+                raise ValueError(f"Unknown output format: {fmt}")
+            render_cache.set(keys[fmt], data, tags=tags)
+            results[fmt] = data
+        return results
+
+    def generate_pdf_preview_base64(
+        self, template: Template, payload, tags: Iterable[str] = (), pdf_profile: Optional[str] = None
+    ) -> str:
+        pdf_bytes = self.render(template, payload, "pdf", tags=tags, pdf_profile=pdf_profile)
         return base64.b64encode(pdf_bytes).decode("utf-8")
 
-    def generate_png_preview_base64(self, template: Template, payload, dpi: int = 203) -> str:
-        pdf_bytes = self._generate_label(template.width, template.height, template.elements, payload)
-        return self._pdf_to_png_base64(pdf_bytes, dpi=dpi)
+    def generate_batch_pdf(
+        self,
+        jobs: Iterable[Tuple[Template, Dict[str, Any], int]],
+        progress: Optional[Callable[[int, int], None]] = None,
+        pdf_profile: Optional[str] = None,
+    ) -> bytes:
+        # one canvas for the whole run, so font subsets, barcodes and images are embedded once per document.
+        # Elements shared by every label of a template are drawn once into forms, the rest of each label
+        # into its own forms, and every copy is just a page stamping them.
+        profile = get_pdf_profile(pdf_profile)
+        layouts = []
+        payloads: Dict[str, List[Dict[str, Any]]] = {}
+        for template, payload, quantity in jobs:
+            plan = self.compile_layout(template)
+            layouts.append((plan, self.layout_label(plan, payload), quantity))
+            payloads.setdefault(plan.version, []).append(payload)
+        if not layouts:
+            raise ValueError("Empty batch")
+
+        with pdf_scope(profile):
+            c, buf = self._create_canvas(layouts[0][0].page_w, layouts[0][0].page_h, profile)
+            self._draw_batch(c, layouts, payloads, progress)
+            return self._finalize_pdf(c, buf)
+
+    def _draw_batch(
+        self,
+        c: canvas.Canvas,
+        layouts: List[Tuple[LayoutPlan, List[Placement], int]],
+        payloads: Dict[str, List[Dict[str, Any]]],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        total = sum(quantity for _, _, quantity in layouts)
+        done = 0
+        # pages stamped per template version: the shared forms are used that many times
+        stamps: Dict[str, int] = {}
+        for plan, _, quantity in layouts:
+            stamps[plan.version] = stamps.get(plan.version, 0) + quantity
+        static_forms: Dict[str, Tuple[set, Dict[int, str]]] = {}
+        for index, (plan, placements, quantity) in enumerate(layouts):
+            if plan.version not in static_forms:
+                static_forms[plan.version] = (self._static_keys(plan, payloads[plan.version]), {})
+            static_keys, shared = static_forms[plan.version]
+
+            layers = []
+            for layer, (is_static, layer_placements) in enumerate(self._layers(placements, static_keys)):
+                if (stamps[plan.version] if is_static else quantity) == 1:
+                    # a form only pays off when it is stamped more than once
+                    layers.append(layer_placements)
+                    continue
+                if not is_static:
+                    name = f"Label{index}x{layer}"
+                    self._draw_form(c, name, plan, layer_placements)
+                elif layer in shared:
+                    name = shared[layer]
+                else:
+                    name = shared[layer] = f"Static{len(static_forms)}x{layer}"
+                    self._draw_form(c, name, plan, layer_placements)
+                layers.append(name)
+
+            for _ in range(quantity):
+                if done:
+                    c.showPage()
+                    c.setPageSize((plan.page_w, plan.page_h))
+                for layer in layers:
+                    if isinstance(layer, str):
+                        c.doForm(layer)
+                    else:
+                        self._draw_plan(c, layer)
+                done += 1
+                if progress:
+                    progress(done, total)
+
+    def _static_keys(self, plan: LayoutPlan, payloads: List[Dict[str, Any]]) -> set:
+        # images never depend on the payload; other elements are static when every label
+        # of the template in this document carries the same value
+        first = payloads[0]
+        return {
+            op.key for op in plan.ops
+            if op.kind == "image" or all(payload.get(op.key) == first.get(op.key) for payload in payloads)
+        }
+
+    def _layers(self, placements: List[Placement], static_keys: set) -> List[Tuple[bool, List[Placement]]]:
+        # consecutive runs of static or per-label elements, in template order, so overlapping
+        # elements (e.g. a mark covering overflowing text) keep their stacking
+        layers = []
+        for placement in placements:
+            is_static = placement.op.key in static_keys
+            if layers and layers[-1][0] == is_static:
+                layers[-1][1].append(placement)
+            else:
+                layers.append((is_static, [placement]))
+        return layers
+
+    def _draw_form(self, c: canvas.Canvas, name: str, plan: LayoutPlan, placements: List[Placement]):
+        c.beginForm(name, upperx=plan.page_w, uppery=plan.page_h)
+        self._draw_plan(c, placements)
+        c.endForm()
+
+    def generate_png_preview_base64(self, template: Template, payload, dpi: int = 203, tags: Iterable[str] = ()) -> str:
+        png_bytes = self.render(template, payload, "png", dpi=dpi, tags=tags)
+        return base64.b64encode(png_bytes).decode("utf-8")
+
+    def generate_printer_job(
+        self, template: Template, payload, language: str = "zpl", dpi: int = 203, text_mode: str = "graphic", copies: int = 1
+    ) -> bytes:
+        if language not in PRINTER_RENDERERS:
+            raise ValueError(f"Unknown printer language: {language}")
+        if text_mode == "graphic" and copies == 1:
+            # the variant render() caches and the nightly prerender fills
+            return self.render(template, payload, language, dpi=dpi)
+        plan = self.compile_layout(template)
+        renderer = PRINTER_RENDERERS[language](dpi=dpi, text_mode=text_mode)
+        return renderer.render(plan, self.layout_label(plan, payload), copies=copies)
+
+    def generate_zpl(self, template: Template, payload, dpi: int = 203, text_mode: str = "graphic", copies: int = 1) -> bytes:
+        return self.generate_printer_job(template, payload, "zpl", dpi=dpi, text_mode=text_mode, copies=copies)
+
+    def generate_tspl(self, template: Template, payload, dpi: int = 203, text_mode: str = "graphic", copies: int = 1) -> bytes:
+        return self.generate_printer_job(template, payload, "tspl", dpi=dpi, text_mode=text_mode, copies=copies)
 
 label_service = LabelService()
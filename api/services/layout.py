@@ -0,0 +1,105 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from reportlab.lib.styles import ParagraphStyle
+
+
+@dataclass
+class LayoutOp:
+    key: str
+    kind: str
+    x: float
+    top: float
+    width: float
+    height: float
+    style_name: str
+    style: ParagraphStyle
+    raw_style: Dict[str, Any]
+    options: Dict[str, Any] = field(default_factory=dict)
+    filename: Optional[str] = None
+    debug: bool = False
+    draw: Optional[Callable] = None
+    raster: Optional[Callable] = None
+
+    @property
+    def bottom(self) -> float:
+        return self.top - self.height
+
+    @property
+    def min_fontsize(self) -> Optional[float]:
+        return self.options.get("min_fontsize", None)
+
+
+@dataclass
+class LayoutPlan:
+    version: str
+    page_w: float
+    page_h: float
+    ops: List[LayoutOp] = field(default_factory=list)
+
+
+@dataclass
+class TextBlock:
+    font_name: str
+    font_size: float
+    x: float
+    y: float
+    centered: bool
+    lines: List[Tuple[float, str]] = field(default_factory=list)
+    fits: bool = True
+
+
+@dataclass
+class Placement:
+    op: LayoutOp
+    value: Any = None
+    block: Optional[TextBlock] = None
+
+
+def template_version(template) -> str:
+    if isinstance(template, dict):
+        width, height, elements, pk = template.get("width"), template.get("height"), template.get("elements"), template.get("pk")
+    else:
+        width, height, elements, pk = template.width, template.height, template.elements, template.pk
+    raw = json.dumps([str(width), str(height), elements], sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return f"{pk}:{digest}" if pk is not None else f"draft:{digest}"
+
+
+class LayoutCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str) -> Optional[LayoutPlan]:
+        with self._lock:
+            plan = self._plans.get(version)
+            if plan is not None:
+                self._plans.move_to_end(version)
+            return plan
+
+    def put(self, plan: LayoutPlan):
+        with self._lock:
+            self._plans[plan.version] = plan
+            self._plans.move_to_end(plan.version)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, pk=None):
+        with self._lock:
+            if pk is None:
+                self._plans.clear()
+                return
+            prefix = f"{pk}:"
+            for version in [v for v in self._plans if v.startswith(prefix)]:
+                del self._plans[version]
+
+    def __len__(self):
+        return len(self._plans)
+
+
+layout_cache = LayoutCache()
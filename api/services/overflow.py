@@ -0,0 +1,193 @@
+import time
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from main.models import Product, Contractor
+from api.serializers import ProductPayloadSerializer, ContractorPayloadSerializer
+from .executor import RenderExecutor, render_executor, template_snapshot
+from .label_service import label_service
+from .layout import LayoutOp
+from .render_worker import analyze_chunk
+from .text_fit import text_fitter
+from .text_measure import MeasuredFit, text_measure
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+EXAMPLES = 10
+SCOPES = ("linked", "catalog")
+
+
+@dataclass
+class ElementOverflow:
+    key: str
+    style_name: str
+    font_size: float
+    min_fontsize: Optional[float]
+    width: float
+    height: float
+    texts: int = 0
+    shrunk: int = 0
+    at_min: int = 0
+    overflow: int = 0
+    errors: int = 0
+    max_length: int = 0
+    longest: Optional[Dict[str, Any]] = None
+    worst: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_op(cls, op: LayoutOp) -> "ElementOverflow":
+        return cls(op.key, op.style_name, op.raw_style.get("fontSize"), op.min_fontsize, round(op.width, 1), round(op.height, 1))
+
+    def add(self, entity: Dict[str, Any], text: Any, fit: Optional[MeasuredFit]):
+        self.texts += 1
+        length = len(str(text))
+        if length > self.max_length:
+            self.max_length, self.longest = length, entity
+        if fit is None:
+            self.errors += 1
+            return
+        if fit.font_size < self.font_size:
+            self.shrunk += 1
+        if self.min_fontsize and fit.font_size <= self.min_fontsize:
+            self.at_min += 1
+        if not fit.fits:
+            self.overflow += 1
+            self.worst.append({**entity, "length": length, "font_size": fit.font_size, "lines": fit.lines, "text_height": round(fit.height, 1)})
+            self._trim()
+
+    def merge(self, other: "ElementOverflow"):
+        for name in ("texts", "shrunk", "at_min", "overflow", "errors"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.max_length > self.max_length:
+            self.max_length, self.longest = other.max_length, other.longest
+        self.worst.extend(other.worst)
+        self._trim()
+
+    def _trim(self):
+        self.worst.sort(key=lambda item: item["text_height"], reverse=True)
+        del self.worst[EXAMPLES:]
+
+
+@dataclass
+class OverflowReport:
+    template: str
+    version: str
+    scope: str = "linked"
+    products: int = 0
+    contractors: int = 0
+    elements: Dict[str, ElementOverflow] = field(default_factory=dict)
+    workers: int = 1
+    seconds: float = 0.0
+
+    @property
+    def problems(self) -> List[ElementOverflow]:
+        return [element for element in self.elements.values() if element.overflow or element.at_min]
+
+    def element(self, op: LayoutOp) -> ElementOverflow:
+        element = self.elements.get(op.key)
+        if element is None:
+            element = self.elements[op.key] = ElementOverflow.from_op(op)
+        return element
+
+    def merge(self, other: "OverflowReport"):
+        self.products += other.products
+        self.contractors += other.contractors
+        for key, element in other.elements.items():
+            if key in self.elements:
+                self.elements[key].merge(element)
+            else:
+                self.elements[key] = element
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["elements"] = list(data["elements"].values())
+        data["seconds"] = round(self.seconds, 3)
+        return data
+
+
+def analyze_template(template, scope: str = "linked", executor: Optional[RenderExecutor] = None) -> OverflowReport:
+    # Runs every product/contractor linked to the template (or the whole catalog) through
+    # layout text fitting only; nothing is drawn. Accepts an unsaved snapshot dict too.
+    started = time.perf_counter()
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown scope: {scope}")
+    executor = executor or render_executor
+    snapshot = template_snapshot(template)
+    plan = label_service.compile_layout(snapshot)
+    name = snapshot.get("name") if isinstance(template, dict) else template.name
+    report = OverflowReport(template=name or "draft", version=plan.version, scope=scope)
+
+    chunks = []
+    for kind, pks in _entities(snapshot.get("pk"), scope):
+        chunks.extend((kind, pks[i:i + CHUNK_SIZE]) for i in range(0, len(pks), CHUNK_SIZE))
+    # payload serialization dominates; the pool only pays off past one chunk of entities
+    if sum(len(pks) for _, pks in chunks) > CHUNK_SIZE and executor.workers > 1:
+        report.workers = min(executor.workers, len(chunks))
+        parts = executor.map(analyze_chunk, [snapshot] * len(chunks), [kind for kind, _ in chunks], [pks for _, pks in chunks])
+    else:
+        parts = [analyze_entities(snapshot, kind, pks) for kind, pks in chunks]
+
+    for op in plan.ops:
+        if op.kind == "text":
+            report.element(op)
+    for part in parts:
+        report.merge(part)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def analyze_entities(template, kind: str, pks: List[int]) -> OverflowReport:
+    plan = label_service.compile_layout(template)
+    report = OverflowReport(template="", version=plan.version)
+    payloads = list(_payloads(kind, pks))
+    setattr(report, f"{kind}s", len(payloads))
+
+    for op in plan.ops:
+        if op.kind != "text":
+            continue
+        items = [(entity, payload[op.key]) for entity, payload in payloads if payload.get(op.key)]
+        fits = text_measure.fit_many([text for _, text in items], op.raw_style, op.width, op.height, op.min_fontsize)
+        element = report.element(op)
+        for (entity, text), fit in zip(items, fits):
+            element.add(entity, text, fit or _paragraph_fit(op, text))
+    return report
+
+
+def _entities(template_pk, scope: str) -> List[Tuple[str, List[int]]]:
+    products = Product.objects.filter(status=Product.ProductStatus.AVAILABLE)
+    contractors = Contractor.objects.all()
+    if scope == "linked":
+        products = products.filter(product_template__template_id=template_pk)
+        contractors = contractors.filter(contractor_template__template_id=template_pk)
+    return [
+        ("product", list(products.order_by("pk").values_list("pk", flat=True).distinct())),
+        ("contractor", list(contractors.order_by("pk").values_list("pk", flat=True).distinct())),
+    ]
+
+
+def _payloads(kind: str, pks: List[int]):
+    if kind == "product":
+        products = (
+            Product.objects
+            .filter(pk__in=pks)
+            .select_related("category")
+            .prefetch_related("org_standart__org_standart")
+            .order_by("pk")
+        )
+        for product in products:
+            yield {"kind": kind, "pk": product.pk, "name": product.name}, ProductPayloadSerializer(instance=product).data
+    else:
+        contractors = Contractor.objects.filter(pk__in=pks).select_related("category").order_by("pk")
+        for contractor in contractors:
+            yield {"kind": kind, "pk": contractor.pk, "name": str(contractor)}, ContractorPayloadSerializer(instance=contractor).data
+
+
+def _paragraph_fit(op: LayoutOp, text: Any) -> Optional[MeasuredFit]:
+    # markup and long words go through the same TextFitter the layout uses
+    try:
+        fit = text_fitter.fit(text, op.style_name, op.raw_style, op.width, op.height, min_fontsize=op.min_fontsize)
+    except Exception as e:
+        logger.warning(f"Overflow analysis failed: {op.key}: {e}")
+        return None
+    return MeasuredFit(fit.font_size, len(fit.paragraph.blPara.lines), fit.height, fit.fits)
@@ -0,0 +1,68 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+from django.conf import settings
+from reportlab import rl_config
+
+
+@dataclass(frozen=True)
+class PdfProfile:
+    name: str
+    compression: bool = True
+    # fixed document id and timestamps, so the same label always yields the same bytes
+    invariant: bool = False
+    # labels go to monochrome printers; greyscale images are a fraction of the RGB+alpha size
+    gray_images: bool = True
+    # drop identical objects (images, fonts) repeated across merged chunks
+    dedupe_on_merge: bool = True
+    # ASCII85 on binary streams only inflates the PDF, and it is base64-encoded for transport anyway
+    ascii85: bool = False
+
+
+PDF_PROFILES: Dict[str, PdfProfile] = {
+    "legacy": PdfProfile("legacy", compression=False, gray_images=False, dedupe_on_merge=False, ascii85=True),
+    "compact": PdfProfile("compact"),
+    "stable": PdfProfile("stable", invariant=True),
+}
+
+
+def get_pdf_profile(name: Optional[str] = None) -> PdfProfile:
+    name = name or getattr(settings, "LABEL_PDF_PROFILE", "compact")
+    try:
+        return PDF_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF profile: {name}")
+
+
+class ReportLabScope:
+    # rl_config is process-wide and ReportLab reads useA85 while a canvas draws images and
+    # while it saves. Canvases wanting the same value run side by side, one wanting the other
+    # value waits for them; the process default is restored once none are open.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._open = 0
+        self._ascii85 = None
+        self._default = None
+
+    @contextmanager
+    def __call__(self, profile: PdfProfile):
+        with self._cond:
+            while self._open and self._ascii85 != profile.ascii85:
+                self._cond.wait()
+            if not self._open:
+                self._default = rl_config.useA85
+                self._ascii85 = profile.ascii85
+                rl_config.useA85 = int(profile.ascii85)
+            self._open += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._open -= 1
+                if not self._open:
+                    rl_config.useA85 = self._default
+                    self._cond.notify_all()
+
+
+pdf_scope = ReportLabScope()
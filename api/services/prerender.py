@@ -0,0 +1,103 @@
+import time
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+from django.utils import timezone
+from main.models import Product, Contractor
+from api.serializers import ProductPayloadSerializer, ContractorPayloadSerializer
+from .label_service import label_service
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+
+
+def next_production_day() -> date:
+    return timezone.localdate() + timedelta(days=1)
+
+
+class PrerenderReport:
+    def __init__(self, day: date, formats: Iterable[str]):
+        self.day = day
+        self.formats = list(formats)
+        self.products = 0
+        self.contractors = 0
+        self.rendered = 0
+        self.reused = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = self.rendered + self.reused
+        return {
+            "date": self.day.isoformat(),
+            "formats": self.formats,
+            "products": self.products,
+            "contractors": self.contractors,
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 3),
+            "labels_per_second": round(labels / self.seconds, 1) if self.seconds else 0.0,
+            "renders_per_second": round(self.rendered / self.seconds, 1) if self.seconds else 0.0,
+        }
+
+
+def prerender_labels(day: Optional[date] = None, formats: Iterable[str] = ("pdf",), dpi: int = 203) -> PrerenderReport:
+    # payloads are built exactly as the preview endpoints build them, so the
+    # morning requests resolve to the same render cache keys
+    day = day or next_production_day()
+    report = PrerenderReport(day, formats)
+
+    products = (
+        Product.objects
+        .filter(status=Product.ProductStatus.AVAILABLE)
+        .select_related('category')
+        .prefetch_related('product_template__template', 'org_standart__org_standart')
+        .order_by('pk')
+    )
+    for product in products.iterator(chunk_size=CHUNK_SIZE):
+        report.products += 1
+        entity_template = product.entity_template
+        if not entity_template:
+            report.skipped += 1
+            continue
+        payload = ProductPayloadSerializer(instance=product, context={'date': day.isoformat()}).data
+        _render(report, entity_template.template, payload, [f"product:{product.pk}"], dpi)
+
+    contractors = (
+        Contractor.objects
+        .select_related('category')
+        .prefetch_related('contractor_template__template')
+        .order_by('pk')
+    )
+    for contractor in contractors.iterator(chunk_size=CHUNK_SIZE):
+        report.contractors += 1
+        entity_template = contractor.entity_template
+        if not entity_template:
+            report.skipped += 1
+            continue
+        payload = ContractorPayloadSerializer(instance=contractor).data
+        _render(report, entity_template.template, payload, [f"contractor:{contractor.pk}"], dpi)
+
+    return report.finish()
+
+
+def _render(report: PrerenderReport, template, payload, tags, dpi: int):
+    for fmt in report.formats:
+        try:
+            if label_service.is_rendered(template, payload, fmt, dpi):
+                report.reused += 1
+                continue
+            label_service.render(template, payload, fmt, dpi=dpi, tags=tags)
+            report.rendered += 1
+        except Exception as e:
+            report.failed += 1
+            logger.warning(f"Prerender failed: {tags[0]} ({fmt}): {e}")
@@ -0,0 +1,312 @@
+import re
+import socket
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+from .layout import LayoutOp, LayoutPlan, Placement
+from .raster import raster_renderer
+
+logger = logging.getLogger(__name__)
+
+TEXT_MODES = ("graphic", "font")
+ZPL_RUN_LOW = "GHIJKLMNOPQRSTUVWXY"
+ZPL_RUN_HIGH = "ghijklmnopqrstuvwxyz"
+
+
+def zpl_compress_row(row: str) -> str:
+    # ZPL alternative compression scheme for one ^GFA row of hex digits
+    if set(row) == {"0"}:
+        return ","
+    if set(row) == {"F"}:
+        return "!"
+    stripped = row.rstrip("0")
+    tail = "," if len(stripped) < len(row) else ""
+    out = []
+    i = 0
+    while i < len(stripped):
+        j = i
+        while j < len(stripped) and stripped[j] == stripped[i]:
+            j += 1
+        count = j - i
+        if count > 1:
+            out.append(zpl_run_length(count))
+        out.append(stripped[i])
+        i = j
+    return "".join(out) + tail
+
+
+def zpl_run_length(count: int) -> str:
+    out = []
+    while count >= 400:
+        out.append("z")
+        count -= 400
+    if count >= 20:
+        out.append(ZPL_RUN_HIGH[count // 20 - 1])
+        count %= 20
+    if count:
+        out.append(ZPL_RUN_LOW[count - 1])
+    return "".join(out)
+
+
+def bitmap_rows(bitmap: Image.Image, ink_bit: int = 1) -> Tuple[int, List[bytes]]:
+    bitmap = bitmap.convert("1")
+    bytes_per_row = (bitmap.width + 7) // 8
+    # PIL "1" packs black as 0; flip so that ink_bit marks the dots to burn
+    raw = bitmap.tobytes()
+    if ink_bit:
+        raw = bytes(b ^ 0xFF for b in raw)
+    # the row padding PIL leaves at 0 must not burn either
+    pad = bytes_per_row * 8 - bitmap.width
+    if pad:
+        mask = (0xFF << pad) & 0xFF
+        fill = 0 if ink_bit else ~mask & 0xFF
+        raw = b"".join(
+            raw[i:i + bytes_per_row - 1] + bytes([raw[i + bytes_per_row - 1] & mask | fill])
+            for i in range(0, len(raw), bytes_per_row)
+        )
+    rows = [raw[i:i + bytes_per_row] for i in range(0, len(raw), bytes_per_row)]
+    return bytes_per_row, rows
+
+
+class PrinterRenderer:
+    language = None
+
+    def __init__(self, dpi: int = 203, text_mode: str = "graphic"):
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Unknown text mode: {text_mode}")
+        self.dpi = dpi
+        self.text_mode = text_mode
+
+    def dots(self, pt: float) -> int:
+        return int(round(pt * self.dpi / 72))
+
+    def origin(self, plan: LayoutPlan, op: LayoutOp) -> Tuple[int, int]:
+        return self.dots(op.x), self.dots(plan.page_h - op.top)
+
+    def render(self, plan: LayoutPlan, placements: List[Placement], copies: int = 1) -> bytes:
+        commands = self.begin(plan, copies)
+        for placement in placements:
+            op = placement.op
+            try:
+                if op.debug:
+                    commands.extend(self.box(plan, op))
+                if op.kind in ("barcode", "barcode_v2"):
+                    if placement.value:
+                        commands.extend(self.barcode(plan, placement))
+                elif op.kind == "text" and self.text_mode == "font":
+                    commands.extend(self.text(plan, placement))
+                else:
+                    commands.extend(self.graphic(plan, placement))
+            except Exception as e:
+                logger.error(f"Error while encoding {self.language}: {op.key}: {e}")
+        commands.extend(self.end(copies))
+        return b"".join(c if isinstance(c, bytes) else c.encode("utf-8") for c in commands)
+
+    def graphic(self, plan: LayoutPlan, placement: Placement) -> List[Any]:
+        element = raster_renderer.render_element(plan, placement, dpi=self.dpi)
+        if element is None:
+            return []
+        x, y, bitmap = element
+        return self.encode_bitmap(x, y, bitmap)
+
+    def barcode_geometry(self, plan: LayoutPlan, op: LayoutOp) -> Tuple[int, int, int, int]:
+        # EAN-13 is 95 modules plus the leading digit of the interpretation line
+        box_w, box_h = self.dots(op.width), self.dots(op.height)
+        module = max(1, min(10, box_w // 105))
+        x, y = self.origin(plan, op)
+        x += max((box_w - module * 105) // 2, 0)
+        text_h = max(int(box_h * 0.2), 10)
+        return x, y, module, max(box_h - text_h, 1)
+
+    def begin(self, plan: LayoutPlan, copies: int) -> List[Any]:
+        raise NotImplementedError
+
+    def end(self, copies: int) -> List[Any]:
+        raise NotImplementedError
+
+    def box(self, plan: LayoutPlan, op: LayoutOp) -> List[Any]:
+        raise NotImplementedError
+
+    def text(self, plan: LayoutPlan, placement: Placement) -> List[Any]:
+        raise NotImplementedError
+
+    def barcode(self, plan: LayoutPlan, placement: Placement) -> List[Any]:
+        raise NotImplementedError
+
+    def encode_bitmap(self, x: int, y: int, bitmap: Image.Image) -> List[Any]:
+        raise NotImplementedError
+
+
+class ZplRenderer(PrinterRenderer):
+    language = "zpl"
+
+    def begin(self, plan, copies):
+        return ["^XA", "^CI28", f"^PW{self.dots(plan.page_w)}", f"^LL{self.dots(plan.page_h)}", "^LH0,0"]
+
+    def end(self, copies):
+        return [f"^PQ{copies}", "^XZ\n"]
+
+    def box(self, plan, op):
+        x, y = self.origin(plan, op)
+        return [f"^FO{x},{y}^GB{self.dots(op.width)},{self.dots(op.height)},1^FS"]
+
+    def text(self, plan, placement):
+        block = placement.block
+        if block is None:
+            return []
+        height = max(self.dots(block.font_size), 1)
+        commands = []
+        for i, (offset, text_line) in enumerate(block.lines):
+            x = self.dots(block.x + offset)
+            y = self.dots(plan.page_h - block.y + i * block.font_size) - height
+            commands.append(f"^FO{x},{max(y, 0)}^A0N,{height},{height}^FH_^FD{self.field(text_line)}^FS")
+        return commands
+
+    def barcode(self, plan, placement):
+        x, y, module, height = self.barcode_geometry(plan, placement.op)
+        code = str(placement.value)[:12]
+        return [f"^FO{x},{y}^BY{module}^BEN,{height},Y,N^FD{code}^FS"]
+
+    def encode_bitmap(self, x, y, bitmap):
+        bytes_per_row, rows = bitmap_rows(bitmap, ink_bit=1)
+        total = bytes_per_row * len(rows)
+        data = []
+        previous = None
+        for row in rows:
+            hex_row = row.hex().upper()
+            data.append(":" if hex_row == previous else zpl_compress_row(hex_row))
+            previous = hex_row
+        return [f"^FO{x},{y}^GFA,{total},{total},{bytes_per_row},{''.join(data)}^FS"]
+
+    def field(self, text: str) -> str:
+        return text.replace("_", "_5F").replace("^", "_5E").replace("~", "_7E")
+
+
+class TsplRenderer(PrinterRenderer):
+    language = "tspl"
+
+    def __init__(self, dpi: int = 203, text_mode: str = "graphic", gap_mm: float = 2):
+        super().__init__(dpi=dpi, text_mode=text_mode)
+        self.gap_mm = gap_mm
+
+    def begin(self, plan, copies):
+        width_mm = plan.page_w / 2.834645669
+        height_mm = plan.page_h / 2.834645669
+        return [
+            f"SIZE {width_mm:.1f} mm,{height_mm:.1f} mm\r\n",
+            f"GAP {self.gap_mm} mm,0 mm\r\n",
+            "DIRECTION 0\r\n",
+            "CODEPAGE UTF-8\r\n",
+            "CLS\r\n",
+        ]
+
+    def end(self, copies):
+        return [f"PRINT 1,{copies}\r\n"]
+
+    def box(self, plan, op):
+        x, y = self.origin(plan, op)
+        return [f"BOX {x},{y},{x + self.dots(op.width)},{y + self.dots(op.height)},1\r\n"]
+
+    def text(self, plan, placement):
+        block = placement.block
+        if block is None:
+            return []
+        height = max(self.dots(block.font_size), 1)
+        # font "0" is the scalable printer font, multiplication factors are point sizes
+        size = max(int(round(block.font_size)), 1)
+        commands = []
+        for i, (offset, text_line) in enumerate(block.lines):
+            x = self.dots(block.x + offset)
+            y = self.dots(plan.page_h - block.y + i * block.font_size) - height
+            commands.append(f'TEXT {x},{max(y, 0)},"0",0,{size},{size},"{self.field(text_line)}"\r\n')
+        return commands
+
+    def barcode(self, plan, placement):
+        x, y, module, height = self.barcode_geometry(plan, placement.op)
+        code = str(placement.value)[:12]
+        return [f'BARCODE {x},{y},"EAN13",{height},1,0,{module},{module},"{code}"\r\n']
+
+    def encode_bitmap(self, x, y, bitmap):
+        # TSPL burns the dots whose bit is 0
+        bytes_per_row, rows = bitmap_rows(bitmap, ink_bit=0)
+        return [f"BITMAP {x},{y},{bytes_per_row},{len(rows)},0,", b"".join(rows), "\r\n"]
+
+    def field(self, text: str) -> str:
+        return text.replace('"', '\\["]')
+
+
+PRINTER_RENDERERS = {
+    "zpl": ZplRenderer,
+    "tspl": TsplRenderer,
+}
+
+
+def send_raw(host: str, port: int, data: bytes, timeout: float = 5.0):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(data)
+
+
+def parse_printer_jobs(data: bytes) -> List[Dict[str, Any]]:
+    if data.lstrip().startswith(b"^XA"):
+        return parse_zpl(data)
+    return parse_tspl(data)
+
+
+def parse_zpl(data: bytes) -> List[Dict[str, Any]]:
+    jobs = []
+    for body in re.findall(rb"\^XA(.*?)\^XZ", data, re.S):
+        commands = [
+            (name.decode(), args.decode("utf-8", "replace"))
+            for name, args in re.findall(rb"\^([A-Z@][A-Z0-9@]?)([^\^]*)", body)
+        ]
+        barcodes = []
+        for i, (name, _) in enumerate(commands):
+            if name == "BE":
+                barcodes.append(next((args for n, args in commands[i + 1:] if n == "FD"), ""))
+        jobs.append(
+            {
+                "language": "zpl",
+                "bytes": len(body) + 6,
+                "commands": commands,
+                "graphics": sum(1 for name, _ in commands if name == "GF"),
+                "barcodes": barcodes,
+                "copies": next((int(args) for name, args in commands if name == "PQ"), 1),
+            }
+        )
+    return jobs
+
+
+def parse_tspl(data: bytes) -> List[Dict[str, Any]]:
+    jobs = []
+    job: Optional[Dict[str, Any]] = None
+    pos = 0
+    while pos < len(data):
+        end = data.find(b"\r\n", pos)
+        end = len(data) if end < 0 else end
+        line = data[pos:end]
+        if job is None:
+            job = {"language": "tspl", "bytes": 0, "commands": [], "graphics": 0, "barcodes": [], "copies": 1}
+            start = pos
+
+        if line.startswith(b"BITMAP "):
+            # the raster payload is binary and may contain CR LF, skip it by its declared size
+            header = line[len(b"BITMAP "):].split(b",", 5)
+            width_bytes, height = int(header[2]), int(header[3])
+            payload_start = pos + len(b"BITMAP ") + sum(len(part) + 1 for part in header[:5])
+            job["commands"].append(("BITMAP", b",".join(header[:5]).decode()))
+            job["graphics"] += 1
+            end = data.find(b"\r\n", payload_start + width_bytes * height)
+            end = len(data) if end < 0 else end
+        else:
+            name, _, args = line.decode("utf-8", "replace").partition(" ")
+            if name:
+                job["commands"].append((name, args))
+            if name == "BARCODE":
+                job["barcodes"].append(args.rsplit(",", 1)[-1].strip('"'))
+            if name == "PRINT":
+                job["copies"] = int(args.split(",")[-1])
+                job["bytes"] = end + 2 - start
+                jobs.append(job)
+                job = None
+        pos = end + 2
+    return jobs
@@ -0,0 +1,148 @@
+import math
+import logging
+from io import BytesIO
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageOps
+from reportlab.lib import colors
+from main.utils.barcode import barcode_cache, ean13_widget
+from main.utils.fonts import font_registry, get_pil_font
+from .assets import asset_registry
+from .layout import LayoutOp, LayoutPlan, Placement
+
+logger = logging.getLogger(__name__)
+
+TEXT_ANCHORS = {"start": "ls", "middle": "ms", "end": "rs"}
+# largest pixel_diff (%) between a direct raster and the poppler render of the same label
+RASTER_TOLERANCE = 1.0
+
+
+def pixel_diff(image: Image.Image, reference: Image.Image) -> float:
+    # Share of ink pixels (either side) with no ink within 1px on the other side.
+    image = image.convert("L")
+    reference = reference.convert("L").resize(image.size)
+    ink = [im.point(lambda v: 255 if v < 128 else 0) for im in (image, reference)]
+    grown = [im.filter(ImageFilter.MaxFilter(3)) for im in ink]
+    unmatched = ImageChops.subtract(ink[0], grown[1]).histogram()[255] + ImageChops.subtract(ink[1], grown[0]).histogram()[255]
+    total = ink[0].histogram()[255] + ink[1].histogram()[255]
+    return 100 * unmatched / total if total else 0.0
+
+
+@lru_cache(maxsize=512)
+def get_barcode_bitmap(barcode: str, size: Tuple[int, int]) -> Image.Image:
+    image = Image.open(BytesIO(barcode_cache.get_png(barcode))).convert("L")
+    ratio = min(size[0] / image.width, size[1] / image.height)
+    target = (max(round(image.width * ratio), 1), max(round(image.height * ratio), 1))
+    return image.resize(target, Image.Resampling.BOX)
+
+
+class RasterPage:
+    def __init__(self, page_w: float, page_h: float, dpi: int = 203, mode: str = "L"):
+        self.dpi = dpi
+        self.page_h = page_h
+        self.image = Image.new(mode, (math.ceil(self.px(page_w)), math.ceil(self.px(page_h))), 255)
+        self.draw = ImageDraw.Draw(self.image)
+
+    def px(self, pt: float) -> float:
+        return pt * self.dpi / 72
+
+    def point(self, x: float, y: float) -> Tuple[float, float]:
+        return self.px(x), self.px(self.page_h - y)
+
+    def box(self, op: LayoutOp) -> Tuple[float, float, float, float]:
+        left, top = self.point(op.x, op.top)
+        return left, top, left + self.px(op.width), top + self.px(op.height)
+
+    def box_size(self, op: LayoutOp) -> Tuple[int, int]:
+        return max(round(self.px(op.width)), 1), max(round(self.px(op.height)), 1)
+
+    def stamp(self, bitmap: Image.Image, op: LayoutOp):
+        left, top, right, bottom = self.box(op)
+        x = round(left + (right - left - bitmap.width) / 2)
+        y = round(top + (bottom - top - bitmap.height) / 2)
+        self.image.paste(0, (x, y, x + bitmap.width, y + bitmap.height), mask=ImageOps.invert(bitmap.convert("L")))
+
+
+class RasterRenderer:
+    def render(self, plan: LayoutPlan, placements: List[Placement], dpi: int = 203) -> Image.Image:
+        page = RasterPage(plan.page_w, plan.page_h, dpi=dpi)
+        for placement in placements:
+            op = placement.op
+            try:
+                if op.debug:
+                    self.draw_debug(page, op)
+                op.raster(page, placement)
+            except Exception as e:
+                logger.error(f"Error while rasterizing: {op.key}: {e}")
+        return page.image
+
+    def render_element(self, plan: LayoutPlan, placement: Placement, dpi: int = 203) -> Optional[Tuple[int, int, Image.Image]]:
+        page = RasterPage(plan.page_w, plan.page_h, dpi=dpi)
+        placement.op.raster(page, placement)
+        bbox = ImageOps.invert(page.image).getbbox()
+        if bbox is None:
+            return None
+        return bbox[0], bbox[1], page.image.crop(bbox).point(lambda v: 255 if v >= 128 else 0, mode="1")
+
+    def draw_debug(self, page: RasterPage, op: LayoutOp):
+        page.draw.rectangle(page.box(op), outline=0, width=1)
+
+    def draw_text(self, page: RasterPage, placement: Placement):
+        block = placement.block
+        if block is None:
+            return
+
+        font = get_pil_font(block.font_name, page.px(block.font_size))
+        for i, (offset, text_line) in enumerate(block.lines):
+            y = block.y - i * block.font_size
+            x = block.x + offset
+            # glyph by glyph at the PDF advances: PIL rounds hinted advances to whole
+            # pixels, which at label sizes makes lines several percent narrower
+            for ch in text_line:
+                if not ch.isspace():
+                    page.draw.text(page.point(x, y), ch, fill=0, font=font, anchor="ls")
+                x += font_registry.string_width(ch, block.font_name, block.font_size)
+
+    def draw_barcode(self, page: RasterPage, placement: Placement):
+        op = placement.op
+        page.stamp(get_barcode_bitmap(str(placement.value), page.box_size(op)), op)
+
+    def draw_barcode_v2(self, page: RasterPage, placement: Placement):
+        op = placement.op
+        widget = ean13_widget(placement.value, op.width, op.height)
+        self._draw_shapes(page, widget.draw(), op.x, op.bottom)
+
+    def draw_img(self, page: RasterPage, placement: Placement):
+        op = placement.op
+        page.stamp(asset_registry.bitmap(op.filename, page.dpi, page.box_size(op)), op)
+
+    def _draw_shapes(self, page: RasterPage, group, dx: float, dy: float):
+        from reportlab.graphics.shapes import Group, Rect, String
+
+        transform = getattr(group, "transform", (1, 0, 0, 1, 0, 0))
+        dx, dy = dx + transform[4], dy + transform[5]
+        for shape in group.contents:
+            if isinstance(shape, Group):
+                self._draw_shapes(page, shape, dx, dy)
+            elif isinstance(shape, Rect):
+                fill = self._ink(shape.fillColor)
+                if fill is None:
+                    continue
+                left, top = page.point(dx + shape.x, dy + shape.y + shape.height)
+                right, bottom = page.point(dx + shape.x + shape.width, dy + shape.y)
+                page.draw.rectangle((left, top, right - 1, bottom - 1), fill=fill)
+            elif isinstance(shape, String):
+                font = get_pil_font(shape.fontName, page.px(shape.fontSize))
+                anchor = TEXT_ANCHORS.get(shape.textAnchor, "ls")
+                page.draw.text(page.point(dx + shape.x, dy + shape.y), shape.text, fill=0, font=font, anchor=anchor)
+
+    def _ink(self, color):
+        if color is None:
+            return None
+        if color == colors.white:
+            return 255
+        r, g, b = color.red, color.green, color.blue
+        return round(255 * (0.299 * r + 0.587 * g + 0.114 * b))
+
+
+raster_renderer = RasterRenderer()
@@ -0,0 +1,379 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from django.conf import settings
+from core.utils.redis_client import get_label_cache_redis
+from api.utils.styles import STYLES
+
+logger = logging.getLogger(__name__)
+
+# bump when a renderer change alters output for the same template and payload
+RENDER_REVISION = 5
+STYLES_DIGEST = hashlib.sha1(json.dumps(STYLES, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def render_key(version: str, payload: Dict[str, Any], fmt: str, dpi: Optional[int] = None) -> str:
+    raw = json.dumps(
+        [RENDER_REVISION, STYLES_DIGEST, version, payload, fmt, dpi],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskRenderStore:
+    def __init__(self, root, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def contains(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def set(self, key: str, data: bytes, tags: Iterable[str] = ()):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+        for tag in tags:
+            tag_path = self.root / "tags" / tag
+            tag_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tag_path, "a") as f:
+                f.write(key + "\n")
+        with self._lock:
+            if self._size is None:
+                # the scan already sees the file just written
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def invalidate_tag(self, tag: str) -> int:
+        tag_path = self.root / "tags" / tag
+        try:
+            keys = set(tag_path.read_text().split())
+            tag_path.unlink()
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for key in keys:
+            try:
+                self._path(key).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size = None
+        return removed
+
+    def clear(self):
+        for path in self._files(with_tags=True):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size = 0
+
+    def evict(self):
+        # drop least recently used entries down to 90% of the budget
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        evicted = set()
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+                size -= entry_size
+                evicted.add(path.name)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size = size
+        if evicted:
+            self._prune_tags(evicted)
+
+    def _prune_tags(self, keys):
+        # Tag files are append-only between invalidations; drop evicted keys so they do not
+        # grow forever. An append racing the rewrite can be lost, which only leaves that blob
+        # to the LRU: keys hash the payload, so a changed label never hits it.
+        tags_dir = self.root / "tags"
+        if not tags_dir.exists():
+            return
+        for tag_path in tags_dir.iterdir():
+            if tag_path.name.startswith("."):
+                continue
+            try:
+                lines = tag_path.read_text().split()
+            except FileNotFoundError:
+                continue
+            kept = [key for key in dict.fromkeys(lines) if key not in keys]
+            if len(kept) == len(lines):
+                continue
+            if not kept:
+                tag_path.unlink(missing_ok=True)
+                continue
+            tmp = tag_path.with_name(f".{tag_path.name}.{os.getpid()}.tmp")
+            tmp.write_text("".join(key + "\n" for key in kept))
+            os.replace(tmp, tag_path)
+
+    def size(self) -> int:
+        return self._scan_size()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _files(self, with_tags: bool = False):
+        if not self.root.exists():
+            return
+        for sub in self.root.iterdir():
+            if sub.is_dir() and (with_tags or sub.name != "tags"):
+                yield from (p for p in sub.iterdir() if p.is_file())
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._files():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+# Sizes are kept per key in a hash so the byte counter moves by exact deltas: an overwrite
+# replaces the old size and a drop subtracts what was added, whether or not the blob is
+# still there (entries also expire by TTL).
+SET_SCRIPT = """
+local old = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or 0)
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], string.len(ARGV[2]))
+return redis.call('INCRBY', KEYS[4], string.len(ARGV[2]) - old)
+"""
+
+DROP_SCRIPT = """
+local removed, freed = 0, 0
+for i = 2, #ARGV do
+    removed = removed + redis.call('DEL', ARGV[1] .. ARGV[i])
+    freed = freed + tonumber(redis.call('HGET', KEYS[2], ARGV[i]) or 0)
+    redis.call('HDEL', KEYS[2], ARGV[i])
+    redis.call('ZREM', KEYS[1], ARGV[i])
+end
+redis.call('DECRBY', KEYS[3], freed)
+return removed
+"""
+
+EVICT_SCRIPT = """
+local removed = 0
+while tonumber(redis.call('GET', KEYS[3]) or 0) > tonumber(ARGV[2]) do
+    local oldest = redis.call('ZPOPMIN', KEYS[1])
+    if #oldest == 0 then
+        redis.call('DEL', KEYS[2], KEYS[3])
+        break
+    end
+    removed = removed + redis.call('DEL', ARGV[1] .. oldest[1])
+    redis.call('DECRBY', KEYS[3], tonumber(redis.call('HGET', KEYS[2], oldest[1]) or 0))
+    redis.call('HDEL', KEYS[2], oldest[1])
+end
+return removed
+"""
+
+
+class RedisRenderStore:
+    prefix = "render:"
+
+    def __init__(self, client, max_bytes: int, ttl: int):
+        self.client = client
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # "total" replaces the drifting "bytes" counter of older releases
+        self.index_keys = [self.prefix + "lru", self.prefix + "sizes", self.prefix + "total"]
+
+    def get(self, key: str) -> Optional[bytes]:
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + key)
+        pipe.zadd(self.prefix + "lru", {key: time.time()}, xx=True)
+        data = pipe.execute()[0]
+        if data is None:
+            # expired by TTL: stop counting it
+            self._drop([key])
+        return data
+
+    def contains(self, key: str) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+    def set(self, key: str, data: bytes, tags: Iterable[str] = ()):
+        lru, sizes, total = self.index_keys
+        size = self.client.eval(SET_SCRIPT, 4, self.prefix + key, lru, sizes, total, key, data, self.ttl, time.time())
+        if tags:
+            pipe = self.client.pipeline()
+            for tag in tags:
+                pipe.sadd(self.prefix + "tag:" + tag, key)
+                pipe.expire(self.prefix + "tag:" + tag, self.ttl)
+            pipe.execute()
+        if size > self.max_bytes:
+            self.evict()
+
+    def invalidate_tag(self, tag: str) -> int:
+        keys = [k.decode() for k in self.client.smembers(self.prefix + "tag:" + tag)]
+        self.client.delete(self.prefix + "tag:" + tag)
+        return self._drop(keys)
+
+    def clear(self):
+        keys = [k.decode() for k in self.client.zrange(self.prefix + "lru", 0, -1)]
+        self._drop(keys)
+        self.client.delete(*self.index_keys)
+
+    def evict(self):
+        # least recently used first, one entry at a time down to 90% of the budget
+        self.client.eval(EVICT_SCRIPT, 3, *self.index_keys, self.prefix, int(self.max_bytes * 0.9))
+
+    def size(self) -> int:
+        return int(self.client.get(self.prefix + "total") or 0)
+
+    def _drop(self, keys) -> int:
+        if not keys:
+            return 0
+        return self.client.eval(DROP_SCRIPT, 3, *self.index_keys, self.prefix, *keys)
+
+
+class RenderCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        backend = getattr(settings, "LABEL_RENDER_CACHE", "disk")
+        max_bytes = getattr(settings, "LABEL_RENDER_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+        if backend == "redis":
+            client = get_label_cache_redis()
+            if client is None:
+                return None
+            return RedisRenderStore(client, max_bytes, getattr(settings, "LABEL_RENDER_CACHE_TTL", 60 * 60 * 24 * 7))
+        if backend == "disk":
+            return self._disk_store(str(getattr(settings, "LABEL_RENDER_CACHE_DIR")), max_bytes)
+        return None
+
+    def _disk_store(self, root: str, max_bytes: int) -> DiskRenderStore:
+        store = getattr(self, "_disk", None)
+        if store is None or str(store.root) != root or store.max_bytes != max_bytes:
+            store = self._disk = DiskRenderStore(root, max_bytes)
+        return store
+
+    def get(self, key: str) -> Optional[bytes]:
+        store = self.store
+        data = None
+        if store is not None:
+            try:
+                data = store.get(key)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Render cache read failed: {e}")
+        self._count("hits" if data is not None else "misses")
+        return data
+
+    def contains(self, key: str) -> bool:
+        store = self.store
+        if store is None:
+            return False
+        try:
+            return store.contains(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Render cache read failed: {e}")
+            return False
+
+    def set(self, key: str, data: bytes, tags: Iterable[str] = ()):
+        store = self.store
+        if store is None:
+            return
+        try:
+            store.set(key, data, tags=tags)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Render cache write failed: {e}")
+
+    def invalidate(self, *tags: str):
+        store = self.store
+        if store is None:
+            return
+        for tag in tags:
+            try:
+                store.invalidate_tag(tag)
+            except Exception as e:
+                logger.warning(f"Render cache invalidation failed: {tag}: {e}")
+
+    def clear(self):
+        store = self.store
+        if store is None:
+            return
+        try:
+            store.clear()
+        except Exception as e:
+            logger.warning(f"Render cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        store = self.store
+        try:
+            size = store.size() if store is not None else 0
+        except Exception:
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": getattr(settings, "LABEL_RENDER_CACHE", "disk") if store is not None else None,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.errors = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+render_cache = RenderCache()
@@ -0,0 +1,35 @@
+import os
+from typing import Any, Dict, List, Optional
+
+# Entry points for spawned render processes. Nothing Django-related may be imported
+# at module level: the child unpickles these functions before the app registry is ready.
+
+
+def init_worker(templates: List[Dict[str, Any]]):
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        # fonts are registered by MainConfig.ready()
+        django.setup()
+
+    from .label_service import label_service
+
+    for template in templates:
+        label_service.compile_layout(template)
+
+
+def render_chunk(jobs, pdf_profile: Optional[str] = None) -> bytes:
+    from .label_service import label_service
+
+    return label_service.generate_batch_pdf(jobs, pdf_profile=pdf_profile)
+
+
+def analyze_chunk(template: Dict[str, Any], kind: str, pks: List[int]):
+    from .overflow import analyze_entities
+
+    return analyze_entities(template, kind, pks)
+
+
+def ping() -> int:
+    return os.getpid()
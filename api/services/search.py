@@ -0,0 +1,50 @@
+from django.contrib.postgres.search import TrigramWordDistance, TrigramWordSimilarity
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Coalesce
+from main.models import contractor_search_text
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def search(queryset, query: str, field: str):
+    # Every word has to match; word similarity (<%) makes a prefix or a typo still match.
+    # Ordering by the distance of the whole query alone lets the GiST index return the
+    # nearest rows first and stop at the limit, instead of ranking every match (a common
+    # word matches thousands of products). No tie-breaker: it would defeat the index.
+    condition = Q()
+    for term in query.split():
+        condition &= Q(**{f"{field}__trigram_word_similar": term})
+    return (
+        queryset
+        .filter(condition)
+        .annotate(similarity=TrigramWordSimilarity(query, field))
+        .order_by(TrigramWordDistance(query, field))
+    )
+
+
+def search_barcode(queryset, query: str):
+    # EAN digits are matched literally (the barcode trigram index serves LIKE), a barcode
+    # prefix ranks first; other words still have to match the name. Digits are selective,
+    # so ranking every match stays cheap.
+    condition = Q()
+    ranks = []
+    for term in query.split():
+        if term.isdigit():
+            condition &= Q(barcode__contains=term)
+            ranks.append(Case(When(barcode__startswith=term, then=Value(1.0)), default=Value(0.0)))
+        else:
+            condition &= Q(name__trigram_word_similar=term)
+            ranks.append(Coalesce(TrigramWordSimilarity(term, "name"), Value(0.0)))
+    return queryset.filter(condition).annotate(similarity=sum(ranks[1:], ranks[0])).order_by("-similarity", "pk")
+
+
+def search_products(queryset, query: str):
+    if any(term.isdigit() for term in query.split()):
+        return search_barcode(queryset, query)
+    return search(queryset, query, "name")
+
+
+def search_contractors(queryset, query: str):
+    return search(queryset.alias(search_text=contractor_search_text()), query, "search_text")
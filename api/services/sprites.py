@@ -0,0 +1,128 @@
+import json
+import hashlib
+import logging
+from io import BytesIO
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+from main.models import Product, Contractor
+from api.serializers import ProductPayloadSerializer, ContractorPayloadSerializer
+from .label_service import label_service
+from .render_cache import render_cache
+
+logger = logging.getLogger(__name__)
+
+SPRITE_COLUMNS = 10
+SPRITE_GAP = 4
+SPRITE_KINDS = ("product", "contractor")
+
+Entry = Tuple[int, Any, Dict[str, Any]]
+
+
+@dataclass
+class SpriteCell:
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass
+class SpritePlan:
+    key: str
+    width: int
+    height: int
+    cells: Dict[int, SpriteCell]
+
+    @property
+    def manifest_key(self) -> str:
+        return manifest_key(self.key)
+
+
+def manifest_key(key: str) -> str:
+    return hashlib.sha256(f"sprite-manifest:{key}".encode()).hexdigest()
+
+
+def plan_sprite(kind: str, entries: List[Entry], dpi: int = 203) -> SpritePlan:
+    # Lays out one sheet for a list page from thumbnail sizes alone. The key hashes every
+    # thumbnail's render key, so a changed product or template gives the page a new sheet.
+    if kind not in SPRITE_KINDS:
+        raise ValueError(f"Unknown sprite kind: {kind}")
+    sizes = [label_service.thumbnail_size(template, dpi) for _, template, _ in entries]
+    cell_w = max((w for w, _ in sizes), default=0) + SPRITE_GAP
+    cell_h = max((h for _, h in sizes), default=0) + SPRITE_GAP
+    columns = min(SPRITE_COLUMNS, len(entries)) or 1
+    rows = -(-len(entries) // columns)
+
+    cells = {}
+    digest = hashlib.sha256(f"{kind}:{dpi}".encode())
+    for n, ((pk, template, payload), (w, h)) in enumerate(zip(entries, sizes)):
+        cells[pk] = SpriteCell((n % columns) * cell_w, (n // columns) * cell_h, w, h)
+        digest.update(f"|{pk}:{label_service.cache_key(template, payload, 'thumbnail', dpi)}".encode())
+    plan = SpritePlan(digest.hexdigest(), max(columns * cell_w - SPRITE_GAP, 1), max(rows * cell_h - SPRITE_GAP, 1), cells)
+
+    if not render_cache.contains(plan.manifest_key):
+        manifest = {
+            "kind": kind,
+            "dpi": dpi,
+            "size": [plan.width, plan.height],
+            "cells": [[pk, *asdict(cell).values()] for pk, cell in cells.items()],
+        }
+        render_cache.set(plan.manifest_key, json.dumps(manifest).encode(), tags=_tags(kind, cells))
+    return plan
+
+
+def build_sprite(key: str) -> Optional[bytes]:
+    # None when the manifest is gone (evicted or invalidated); the list request plans it again
+    data = render_cache.get(key)
+    if data is not None:
+        return data
+    raw = render_cache.get(manifest_key(key))
+    if raw is None:
+        return None
+    manifest = json.loads(raw)
+    kind, dpi = manifest["kind"], manifest["dpi"]
+    cells = {pk: SpriteCell(x, y, w, h) for pk, x, y, w, h in manifest["cells"]}
+
+    sheet = Image.new("L", tuple(manifest["size"]), 255)
+    templates = set()
+    for pk, template, payload in load_entries(kind, list(cells)):
+        cell = cells[pk]
+        thumb = label_service.render(template, payload, "thumbnail", dpi=dpi, tags=[f"{kind}:{pk}"])
+        image = Image.open(BytesIO(thumb)).convert("L")
+        sheet.paste(image.crop((0, 0, cell.width, cell.height)), (cell.x, cell.y))
+        templates.add(label_service.compile_layout(template).version.split(":", 1)[0])
+
+    data = label_service._encode_png(sheet, dpi=dpi, thumbnail=True)
+    tags = _tags(kind, cells) + [f"template:{pk}" for pk in templates if pk != "draft"]
+    render_cache.set(key, data, tags=tags)
+    logger.info(f"Sprite {key[:12]}: {len(cells)} {kind} thumbnails, {len(data)} bytes")
+    return data
+
+
+def _tags(kind: str, cells: Dict[int, SpriteCell]) -> List[str]:
+    return [f"{kind}:{pk}" for pk in cells]
+
+
+def entity_entries(kind: str, objects) -> List[Entry]:
+    # payloads without request context, the same ones the build task serializes again
+    serializer = ProductPayloadSerializer if kind == "product" else ContractorPayloadSerializer
+    entries = []
+    for obj in objects:
+        entity_template = obj.entity_template
+        if entity_template:
+            entries.append((obj.pk, entity_template.template, serializer(instance=obj).data))
+    return entries
+
+
+def load_entries(kind: str, pks: List[int]) -> List[Entry]:
+    if kind == "product":
+        objects = (
+            Product.objects
+            .filter(pk__in=pks)
+            .select_related("category")
+            .prefetch_related("product_template__template", "org_standart__org_standart")
+        )
+    else:
+        objects = Contractor.objects.filter(pk__in=pks).select_related("category").prefetch_related("contractor_template__template")
+    return entity_entries(kind, objects)
@@ -0,0 +1,138 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from reportlab.platypus import Paragraph
+from reportlab.lib.styles import ParagraphStyle
+
+logger = logging.getLogger(__name__)
+
+FONT_STEP = 0.5
+
+
+def last_step(start: float, min_fontsize: Optional[float]) -> int:
+    # number of FONT_STEP reductions allowed before reaching min_fontsize
+    if not min_fontsize:
+        return 0
+    step = 0
+    while min_fontsize < start - FONT_STEP * step and start - FONT_STEP * (step + 1) > 0:
+        step += 1
+    return step
+
+
+@dataclass
+class FitResult:
+    paragraph: Paragraph
+    font_size: float
+    height: float
+    fits: bool
+    wraps: int
+
+
+class TextFitter:
+    # Same candidate sizes as the old recursive shrink (base size, then 0.5pt steps
+    # down to min_fontsize), but searched by bisection over memoized wraps.
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self.wrap_calls = 0
+        self._wraps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fit(
+        self,
+        text: str,
+        style_name: str,
+        raw_style: Dict[str, Any],
+        width: float,
+        height: float,
+        min_fontsize: Optional[float] = None,
+        override_styles: Dict[str, Any] = {},
+    ) -> FitResult:
+        base = {**raw_style, **(override_styles or {})}
+        start = (override_styles or {}).get("fontSize", None) or raw_style.get("fontSize")
+        wraps = 0
+
+        def attempt(step: int) -> Tuple[Paragraph, float]:
+            nonlocal wraps
+            if step == 0:
+                merged = base
+            else:
+                size = start - FONT_STEP * step
+                merged = {**base, "fontSize": size, "leading": size}
+            p, h, wrapped = self._wrap(text, style_name, merged, width)
+            wraps += wrapped
+            return p, h
+
+        p, h = attempt(0)
+        if h <= height:
+            return FitResult(p, start, h, True, wraps)
+
+        logger.info(f"Text does not fit the textbox; reduce font or enlarge box:\r\n{text}")
+        last = last_step(start, min_fontsize)
+        best = None
+        lo, hi = 1, last
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            mid_p, mid_h = attempt(mid)
+            if mid_h <= height:
+                best = (mid, mid_p, mid_h)
+                hi = mid - 1
+            else:
+                lo = mid + 1
+
+        if best is not None:
+            step, p, h = best
+            return FitResult(p, start - FONT_STEP * step, h, True, wraps)
+        if last:
+            p, h = attempt(last)
+        return FitResult(p, start - FONT_STEP * last, h, False, wraps)
+
+    def clear(self):
+        with self._lock:
+            self._wraps.clear()
+            self.wrap_calls = 0
+
+    def _wrap(self, text: str, style_name: str, merged: Dict[str, Any], width: float) -> Tuple[Paragraph, float, int]:
+        key = (text, style_name, merged.get("fontSize"), merged.get("leading"), width)
+        with self._lock:
+            cached = self._wraps.get(key)
+            if cached is not None:
+                self._wraps.move_to_end(key)
+                return cached[0], cached[1], 0
+
+        p = Paragraph(text, ParagraphStyle(style_name, **merged))
+        _, h = p.wrap(width, 0)
+
+        with self._lock:
+            self.wrap_calls += 1
+            self._wraps[key] = (p, h)
+            while len(self._wraps) > self.maxsize:
+                self._wraps.popitem(last=False)
+        return p, h, 1
+
+
+def linear_fit(
+    text: str,
+    style_name: str,
+    raw_style: Dict[str, Any],
+    width: float,
+    height: float,
+    min_fontsize: Optional[float] = None,
+) -> Tuple[float, int]:
+    # The old recursive 0.5pt shrink loop, kept as the reference for TextFitter.fit.
+    # Returns the chosen size and the number of wraps it took.
+    fitter = TextFitter()
+    size = raw_style.get("fontSize")
+    merged = raw_style
+    wraps = 0
+    while True:
+        _, h, wrapped = fitter._wrap(text, style_name, merged, width)
+        wraps += wrapped
+        if h <= height or not (min_fontsize and min_fontsize < size):
+            return size, wraps
+        size -= FONT_STEP
+        merged = {**raw_style, "fontSize": size, "leading": size}
+
+
+text_fitter = TextFitter()
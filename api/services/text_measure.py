@@ -0,0 +1,256 @@
+import re
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from reportlab.lib.styles import ParagraphStyle
+from main.utils.fonts import font_registry
+from .text_fit import FONT_STEP, last_step
+
+# Characters that make Paragraph parse markup, split on nbsp or hyphenate.
+UNSUPPORTED_CHARS = re.compile("[<>&\xa0\xad]")
+# Style options that change how Paragraph breaks lines; any of them set means fall back.
+UNSUPPORTED_STYLE = ("wordWrap", "hyphenationLang", "embeddedHyphenation", "uriWasteReduce", "endDots", "shaping", "backColor")
+TIE_EPSILON = 1e-9
+
+
+@dataclass
+class MeasuredFit:
+    font_size: float
+    lines: int
+    height: float
+    fits: bool
+
+
+class _Words:
+    # Word advances of many texts in one font, in 1/1000 em. For word j (numbered across
+    # the whole batch) bounds[j] - offsets[i] is the width of words i..j of one line with
+    # shrunk spaces, so a line starting at i ends at bisect_right(bounds, limit + offsets[i]).
+    def __init__(self, units, bounds, offsets, spans, widest, space):
+        self.units: List[float] = units
+        self.bounds: List[float] = bounds
+        self.offsets: List[float] = offsets
+        self.spans: List[Optional[Tuple[int, int]]] = spans
+        self.widest: List[float] = widest
+        self.space: float = space
+
+
+class TextMeasure:
+    # Greedy line breaking of Paragraph (plain text, one font) on glyph-advance arrays.
+    # Returns None wherever Paragraph could break differently; callers then wrap for real.
+    def __init__(self):
+        self._tables: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def style(self, raw_style: Dict[str, Any], override_styles: Dict[str, Any] = {}) -> Optional[Dict[str, Any]]:
+        style = {**ParagraphStyle.defaults, **raw_style, **(override_styles or {})}
+        if style["fontName"] not in font_registry.files:
+            return None
+        if any(style.get(name) for name in UNSUPPORTED_STYLE) or style.get("autoLeading") not in ("", "off", None):
+            return None
+        return style
+
+    def advances(self, font_name: str) -> np.ndarray:
+        # advance per code point; the last slot holds the width of missing glyphs
+        table = self._tables.get(font_name)
+        if table is None:
+            widths, default = font_registry.widths(font_name)
+            table = np.full(max(widths, default=0) + 2, default, dtype=np.float64)
+            table[np.fromiter(widths.keys(), dtype=np.int64, count=len(widths))] = np.fromiter(widths.values(), dtype=np.float64, count=len(widths))
+            with self._lock:
+                table = self._tables.setdefault(font_name, table)
+        return table
+
+    def words(self, texts: Sequence[Any], style: Dict[str, Any]) -> _Words:
+        table = self.advances(style["fontName"])
+        space = float(table[32])
+        step = space * (1 - style["spaceShrinkage"])
+
+        spans = []
+        flat = []
+        for text in texts:
+            if not isinstance(text, str) or UNSUPPORTED_CHARS.search(text):
+                spans.append(None)
+                continue
+            split = text.split()
+            spans.append((len(flat), len(flat) + len(split)))
+            flat.extend(split)
+        if not flat:
+            return _Words([], [], [], spans, [0.0] * len(spans), space)
+
+        lengths = np.fromiter(map(len, flat), dtype=np.int64, count=len(flat))
+        codes = np.frombuffer("".join(flat).encode("utf-32-le"), dtype=np.uint32)
+        chars = table[np.minimum(codes, len(table) - 1)]
+        units = np.add.reduceat(chars, np.cumsum(lengths) - lengths)
+        ends = np.cumsum(units)
+        index = np.arange(len(units)) * step
+        firsts = np.array([span[0] for span in spans if span and span[0] < span[1]], dtype=np.int64)
+        widest = dict(zip(firsts.tolist(), np.maximum.reduceat(units, firsts).tolist())) if len(firsts) else {}
+        return _Words(
+            units.tolist(),
+            (ends + index).tolist(),
+            (ends - units + index).tolist(),
+            spans,
+            [widest.get(span[0], 0.0) if span else 0.0 for span in spans],
+            space,
+        )
+
+    def breaks(
+        self,
+        words: _Words,
+        n: int,
+        font_size: float,
+        widths: Tuple[float, float],
+        shrinkage: float,
+        max_lines: Optional[int] = None,
+    ) -> Optional[List[int]]:
+        # First word index of every line of text n, or None when Paragraph would split a
+        # long word. With max_lines, stops once the text is known to need more lines.
+        span = words.spans[n]
+        if span is None:
+            return None
+        start, stop = span
+        scale = 0.001 * font_size
+        if scale * words.widest[n] > min(widths):
+            return None
+
+        bounds, offsets = words.bounds, words.offsets
+        if max_lines is None:
+            max_lines = stop - start
+        limit = widths[0]
+        lines = []
+        i = start
+        while i < stop:
+            threshold = limit / scale + offsets[i]
+            end = bisect_right(bounds, threshold, i + 1, stop)
+            epsilon = TIE_EPSILON * (threshold if threshold > 1.0 else 1.0)
+            if (end < stop and bounds[end] - threshold <= epsilon) or (end - 1 > i and threshold - bounds[end - 1] <= epsilon):
+                end = self._exact_end(words, i, stop, scale, limit, shrinkage)
+            lines.append(i - start)
+            if len(lines) > max_lines:
+                break
+            limit = widths[1]
+            i = end
+        return lines
+
+    def wrap(self, text: str, raw_style: Dict[str, Any], width: float, override_styles: Dict[str, Any] = {}) -> Optional[Tuple[List[str], float]]:
+        style = self.style(raw_style, override_styles)
+        if style is None or width < 1e-8:
+            return None
+        words = self.words([text], style)
+        starts = self.breaks(words, 0, style["fontSize"], self._widths(style, width), style["spaceShrinkage"])
+        if starts is None:
+            return None
+        split = text.split()
+        lines = [" ".join(split[a:b]) for a, b in zip(starts, starts[1:] + [len(split)])]
+        return lines, len(lines) * style["leading"]
+
+    def fit(
+        self,
+        text: str,
+        raw_style: Dict[str, Any],
+        width: float,
+        height: float,
+        min_fontsize: Optional[float] = None,
+        override_styles: Dict[str, Any] = {},
+    ) -> Optional[MeasuredFit]:
+        return self.fit_many([text], raw_style, width, height, min_fontsize, override_styles)[0]
+
+    def fit_many(
+        self,
+        texts: Sequence[str],
+        raw_style: Dict[str, Any],
+        width: float,
+        height: float,
+        min_fontsize: Optional[float] = None,
+        override_styles: Dict[str, Any] = {},
+    ) -> List[Optional[MeasuredFit]]:
+        # Same candidate sizes and bisection as TextFitter.fit, for many texts of one element.
+        # Repeated texts (shared captions, company info) are measured once.
+        style = self.style(raw_style, override_styles)
+        if style is None or width < 1e-8:
+            return [None] * len(texts)
+        unique = {}
+        for text in texts:
+            if isinstance(text, str) and text not in unique:
+                unique[text] = len(unique)
+        words = self.words(list(unique), style)
+        widths = self._widths(style, width)
+        shrinkage = style["spaceShrinkage"]
+        start = style["fontSize"]
+        last = last_step(start, min_fontsize)
+
+        def attempt(n: int, step: int, full: bool = False) -> Optional[Tuple[int, float]]:
+            size = start - FONT_STEP * step
+            leading = style["leading"] if step == 0 else size
+            max_lines = None if full else self._max_lines(height, leading)
+            starts = self.breaks(words, n, size, widths, shrinkage, max_lines)
+            if starts is None:
+                return None
+            return len(starts), len(starts) * leading
+
+        fits = [self._search(n, attempt, start, height, last) for n in range(len(unique))]
+        return [fits[unique[text]] if isinstance(text, str) else None for text in texts]
+
+    def _search(self, n, attempt, start: float, height: float, last: int) -> Optional[MeasuredFit]:
+        first = attempt(n, 0)
+        if first is None:
+            return None
+        if first[1] <= height:
+            return MeasuredFit(start, first[0], first[1], True)
+
+        best = None
+        lo, hi = 1, last
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            result = attempt(n, mid)
+            if result is None:
+                return None
+            if result[1] <= height:
+                best = (mid, result)
+                hi = mid - 1
+            else:
+                lo = mid + 1
+
+        if best is not None:
+            step, (lines, h) = best
+            return MeasuredFit(start - FONT_STEP * step, lines, h, True)
+        # the overflowing size is reported with its full line count
+        result = attempt(n, last, full=True)
+        if result is None:
+            return None
+        return MeasuredFit(start - FONT_STEP * last, result[0], result[1], False)
+
+    def _max_lines(self, height: float, leading: float) -> Optional[int]:
+        # most lines whose total height still passes the h <= height check
+        if leading <= 0:
+            return None
+        lines = int(height // leading)
+        while lines > 0 and lines * leading > height:
+            lines -= 1
+        while (lines + 1) * leading <= height:
+            lines += 1
+        return lines
+
+    def _widths(self, style: Dict[str, Any], width: float) -> Tuple[float, float]:
+        left = style["leftIndent"]
+        return width - (left + style["firstLineIndent"]) - style["rightIndent"], width - left - style["rightIndent"]
+
+    def _exact_end(self, words: _Words, i: int, stop: int, scale: float, limit: float, shrinkage: float) -> int:
+        # Paragraph.breakLines arithmetic, for lines that end within rounding of the limit
+        space = scale * words.space
+        shrink = shrinkage * space
+        current = -space
+        count = 0
+        while i < stop:
+            new = current + space + scale * words.units[i]
+            if count and new > limit + shrink * count:
+                break
+            current = new
+            count += 1
+            i += 1
+        return i
+
+
+text_measure = TextMeasure()
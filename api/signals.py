@@ -0,0 +1,111 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.dispatch import receiver
+from simple_history.signals import post_create_historical_record
+from main.models import (
+    BaseInfo,
+    Template,
+    OrgStandart,
+    Product,
+    ProductTemplate,
+    ProductOrgStandart,
+    Contractor,
+    ContractorCategory,
+    ContractorTemplate,
+)
+from main.utils.base_info import base_info_cache
+from .services.layout import layout_cache
+from .services.render_cache import render_cache
+from .utils.access import user_access
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Template)
+def invalidate_template_layout(sender, instance, **kwargs):
+    layout_cache.invalidate(instance.pk)
+    render_cache.invalidate(f"template:{instance.pk}")
+
+
+@receiver(post_create_historical_record, sender=Template.history.model)
+def invalidate_template_layout_history(sender, instance, **kwargs):
+    layout_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_render(sender, instance, **kwargs):
+    render_cache.invalidate(f"product:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=ProductTemplate)
+@receiver([post_save, post_delete], sender=ProductOrgStandart)
+def invalidate_product_link_render(sender, instance, **kwargs):
+    render_cache.invalidate(f"product:{instance.product_id}")
+
+
+@receiver([post_save, post_delete], sender=OrgStandart)
+def invalidate_org_standart_render(sender, instance, **kwargs):
+    product_ids = ProductOrgStandart.objects.filter(org_standart_id=instance.pk).values_list("product_id", flat=True)
+    render_cache.invalidate(*[f"product:{pk}" for pk in product_ids])
+
+
+@receiver([post_save, post_delete], sender=Contractor)
+def invalidate_contractor_render(sender, instance, **kwargs):
+    render_cache.invalidate(f"contractor:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=ContractorTemplate)
+def invalidate_contractor_link_render(sender, instance, **kwargs):
+    render_cache.invalidate(f"contractor:{instance.contractor_id}")
+
+
+@receiver([post_save, post_delete], sender=ContractorCategory)
+def invalidate_contractor_category_render(sender, instance, **kwargs):
+    contractor_ids = Contractor.objects.filter(category_id=instance.pk).values_list("pk", flat=True)
+    render_cache.invalidate(*[f"contractor:{pk}" for pk in contractor_ids])
+
+
+@receiver([post_save, post_delete], sender=BaseInfo)
+def invalidate_base_info_render(sender, instance, **kwargs):
+    # company details are printed on every label
+    base_info_cache.invalidate()
+    render_cache.clear()
+
+
+@receiver(post_create_historical_record, sender=BaseInfo.history.model)
+def invalidate_base_info_history(sender, instance, **kwargs):
+    base_info_cache.invalidate()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_access(sender, instance, action, reverse, pk_set, **kwargs):
+    # clear has no pk_set, so members are looked up before the rows go
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        user_access.invalidate([instance.pk])
+    elif pk_set is not None:
+        user_access.invalidate(pk_set)
+    else:
+        user_access.invalidate(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        users = User.objects.filter(groups=instance)
+    elif pk_set is not None:
+        users = User.objects.filter(groups__in=pk_set)
+    else:
+        users = User.objects.filter(groups__permissions=instance)
+    user_access.invalidate(users.values_list("pk", flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_access(sender, instance, **kwargs):
+    # memberships are deleted without m2m_changed
+    user_access.invalidate(instance.user_set.values_list("pk", flat=True))
@@ -0,0 +1,78 @@
+import time
+import logging
+from datetime import date, timedelta
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from .models import RenderJob
+from .services.batch import BATCH_JOBS
+from .services.label_service import label_service
+from .services.prerender import prerender_labels
+from .services.sprites import build_sprite
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = "label_jobs"
+PROGRESS_INTERVAL = 0.5
+
+
+def job_artifact_path(job_id: str) -> str:
+    return f"{JOBS_DIR}/{job_id}.pdf"
+
+
+@shared_task(bind=True)
+def render_label_job(self, kind, items, pdf_profile=None):
+    jobs = BATCH_JOBS[kind](items)
+    total = sum(quantity for _, _, quantity in jobs)
+    last_report = 0.0
+
+    def progress(done, total):
+        nonlocal last_report
+        now = time.monotonic()
+        if done == total or now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            self.update_state(state="PROGRESS", meta={"pages_done": done, "pages_total": total})
+
+    self.update_state(state="PROGRESS", meta={"pages_done": 0, "pages_total": total})
+    pdf = label_service.generate_batch_pdf(jobs, progress=progress, pdf_profile=pdf_profile)
+    path = job_artifact_path(self.request.id)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(pdf))
+    logger.info(f"Render job {self.request.id}: {total} pages, {len(pdf)} bytes")
+    return {"pages_done": total, "pages_total": total, "path": path}
+
+
+@shared_task
+def cleanup_label_jobs():
+    expires = timezone.now() - timedelta(hours=settings.LABEL_JOB_TTL_HOURS)
+    RenderJob.objects.filter(created_at__lt=expires).delete()
+    if not default_storage.exists(JOBS_DIR):
+        return 0
+    removed = 0
+    for filename in default_storage.listdir(JOBS_DIR)[1]:
+        path = f"{JOBS_DIR}/{filename}"
+        if default_storage.get_modified_time(path) < expires:
+            default_storage.delete(path)
+            removed += 1
+    return removed
+
+
+@shared_task
+def prerender_next_day(day=None, formats=None):
+    day = date.fromisoformat(day) if day else None
+    formats = formats or settings.LABEL_PRERENDER_FORMATS
+    report = prerender_labels(day, formats=formats).as_dict()
+    logger.info(
+        f"Prerender {report['date']}: {report['rendered']} rendered, {report['reused']} reused, "
+        f"{report['failed']} failed in {report['seconds']}s ({report['labels_per_second']} labels/s)"
+    )
+    return report
+
+
+@shared_task
+def build_label_sprite(key):
+    data = build_sprite(key)
+    return len(data) if data is not None else None
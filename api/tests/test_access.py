@@ -0,0 +1,132 @@
+import pytest
+from django.contrib.auth.models import Group, Permission, User
+from api.utils import access as access_module
+from api.utils.access import REDIS_PREFIX, UserAccessCache, user_access
+
+
+def fresh(user):
+    # a new request loads request.user again, without the per-request snapshot
+    return User.objects.get(pk=user.pk)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(access_module.time, "monotonic", clock)
+    return clock
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.broken = False
+
+    def check(self):
+        if self.broken:
+            raise ConnectionError("redis is down")
+
+    def get(self, key):
+        self.check()
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.check()
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    def delete(self, *keys):
+        self.check()
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(access_module, "get_label_cache_redis", lambda: fake)
+    return fake
+
+
+def test_snapshot_is_read_once(operator, django_assert_num_queries):
+    # group names, then the user's and the groups' permissions
+    with django_assert_num_queries(3):
+        assert user_access.get(operator).groups == {"Печатник"}
+    user = fresh(operator)
+    # the next request of the same user is served from the process cache
+    with django_assert_num_queries(0):
+        assert user_access.in_group(operator, "Печатник")
+        assert not user_access.in_group(user, "Контрагент")
+
+
+def test_has_perm(operator):
+    perm = Permission.objects.get(codename="change_product")
+    assert not user_access.has_perm(operator, "main.change_product")
+
+    operator.user_permissions.add(perm)
+    operator = fresh(operator)
+    assert user_access.has_perm(operator, "main.change_product")
+    operator.is_active = False
+    assert not user_access.has_perm(operator, "main.change_product")
+
+    admin = User.objects.create_superuser("admin", password="admin")
+    assert user_access.has_perm(admin, "main.change_product")
+
+
+def test_group_changes_invalidate(operator):
+    printers = Group.objects.get(name="Печатник")
+    assert user_access.in_group(fresh(operator), "Печатник")
+
+    operator.groups.remove(printers)
+    assert not user_access.in_group(fresh(operator), "Печатник")
+
+    printers.user_set.add(operator)
+    assert user_access.in_group(fresh(operator), "Печатник")
+
+    perm = Permission.objects.get(codename="change_product")
+    assert not user_access.has_perm(fresh(operator), "main.change_product")
+    printers.permissions.add(perm)
+    assert user_access.has_perm(fresh(operator), "main.change_product")
+
+    printers.delete()
+    assert user_access.get(fresh(operator)).groups == frozenset()
+
+
+def test_other_processes_drop_a_revoked_group_after_local_ttl(operator, clock):
+    other = UserAccessCache(ttl=60, local_ttl=5)
+    assert other.in_group(fresh(operator), "Печатник")
+
+    operator.groups.clear()
+    assert not user_access.in_group(fresh(operator), "Печатник")
+    # the signal only reached this process's cache
+    clock.now += 4
+    assert other.in_group(fresh(operator), "Печатник")
+    clock.now += 1
+    assert not other.in_group(fresh(operator), "Печатник")
+
+
+def test_redis_shares_invalidation_between_processes(operator, redis):
+    other = UserAccessCache(ttl=60, local_ttl=5)
+    assert other.in_group(fresh(operator), "Печатник")
+    assert redis.expiry[REDIS_PREFIX + str(operator.pk)] == 60
+
+    operator.groups.clear()
+    assert REDIS_PREFIX + str(operator.pk) not in redis.data
+    assert not other.in_group(fresh(operator), "Печатник")
+
+
+def test_redis_errors_fall_back_to_the_database(operator, redis, django_assert_num_queries):
+    redis.broken = True
+    user = fresh(operator)
+    with django_assert_num_queries(3):
+        assert user_access.in_group(user, "Печатник")
+    operator.groups.clear()
+    assert not user_access.in_group(fresh(operator), "Печатник")
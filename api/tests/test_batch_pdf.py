@@ -0,0 +1,57 @@
+import pytest
+from reportlab.pdfgen.canvas import Canvas
+from api.serializers import ProductPayloadSerializer
+from api.services.label_service import label_service
+
+
+@pytest.fixture
+def forms(monkeypatch):
+    # names of the forms drawn and of every form stamped, in order
+    drawn, stamped = [], []
+    begin_form, do_form = Canvas.beginForm, Canvas.doForm
+    monkeypatch.setattr(Canvas, "beginForm", lambda c, name, *args, **kwargs: (drawn.append(name), begin_form(c, name, *args, **kwargs))[1])
+    monkeypatch.setattr(Canvas, "doForm", lambda c, name: (stamped.append(name), do_form(c, name))[1])
+    return drawn, stamped
+
+
+def job(product, quantity):
+    return product.entity_template.template, ProductPayloadSerializer(instance=product).data, quantity
+
+
+def test_single_label_is_drawn_inline(product, forms):
+    drawn, stamped = forms
+    label_service.generate_batch_pdf([job(product, 1)])
+    assert drawn == stamped == []
+
+
+def test_shared_elements_form_is_drawn_once_per_template(base_info, make_product, forms):
+    drawn, stamped = forms
+    products = [make_product(name=f"Салат {n}", barcode=f"460000000000{n}") for n in range(3)]
+
+    label_service.generate_batch_pdf([job(product, 1) for product in products])
+
+    # the names differ, the rest of the label is shared: one form stamped on every page,
+    # each label's own elements drawn inline
+    static = [name for name in drawn if name.startswith("Static")]
+    assert static and drawn == static
+    assert len(set(drawn)) == len(drawn)
+    assert stamped == [name for _ in products for name in static]
+
+
+def test_copies_stamp_the_label_forms(base_info, make_product, forms):
+    drawn, stamped = forms
+    products = [make_product(name=f"Салат {n}", barcode=f"460000000000{n}") for n in range(2)]
+
+    label_service.generate_batch_pdf([job(product, 3) for product in products])
+
+    static = [name for name in drawn if name.startswith("Static")]
+    labels = [name for name in drawn if name.startswith("Label")]
+    assert len(set(drawn)) == len(drawn) == len(static) + len(labels)
+    assert all(stamped.count(name) == 6 for name in static)
+    assert all(stamped.count(name) == 3 for name in labels)
+
+
+def test_pdf_grows_sublinearly_with_copies(product):
+    sizes = {copies: len(label_service.generate_batch_pdf([job(product, copies)])) for copies in (1, 10, 50)}
+    # a copy is a page stamping the forms, not another label
+    assert (sizes[50] - sizes[10]) / 40 < sizes[1] / 50
@@ -0,0 +1,52 @@
+from main.models import Product
+
+EAN = "4600000000017"
+
+
+def by_barcode(api_client, ean=EAN):
+    return api_client.get(f"/api/label/product/by-barcode/{ean}/")
+
+
+def test_unknown_barcode_is_404(api_client, db):
+    response = by_barcode(api_client)
+    assert response.status_code == 404
+    assert response.data == {"error": f"Product with barcode {EAN} not found"}
+
+
+def test_label_by_barcode(api_client, base_info, make_product):
+    product = make_product(barcode=EAN)
+    make_product()
+
+    response = by_barcode(api_client)
+    assert response.status_code == 200
+    assert response.data["id"] == product.pk
+    assert response.data["pdf"]
+    # the same label and ETag as the product's own endpoint
+    assert response["ETag"] == api_client.get(f"/api/label/product/{product.pk}/")["ETag"]
+    assert by_barcode(api_client, "4699999999999").status_code == 404
+
+
+def test_available_product_wins_over_archived(api_client, base_info, make_product):
+    archived = make_product(barcode=EAN, status=Product.ProductStatus.ARCHIEVED)
+    assert by_barcode(api_client).data["id"] == archived.pk
+
+    available = make_product(barcode=EAN)
+    assert by_barcode(api_client).data["id"] == available.pk
+
+
+def test_ambiguous_barcode_is_409(api_client, base_info, make_product):
+    first = make_product(barcode=EAN)
+    second = make_product(barcode=EAN)
+    make_product(barcode=EAN, status=Product.ProductStatus.ARCHIEVED)
+
+    response = by_barcode(api_client)
+    assert response.status_code == 409
+    assert response.data == {"error": f"Barcode {EAN} belongs to several products: {[first.pk, second.pk]}"}
+
+
+def test_product_without_template_is_400(api_client, base_info, make_product):
+    product = make_product(barcode=EAN, template=None)
+
+    response = by_barcode(api_client)
+    assert response.status_code == 400
+    assert response.data == {"error": f"Product {product.pk} has no template"}
@@ -0,0 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+from celery.signals import worker_process_shutdown
+from api.serializers import ProductPayloadSerializer
+from api.services.executor import RenderExecutor, render_executor
+
+
+def test_single_worker_renders_inline(product):
+    executor = RenderExecutor(chunk_pages=1)
+    payload = ProductPayloadSerializer(instance=product).data
+    pdf = executor.render_pdf([(product.entity_template.template, payload, 3)])
+    assert pdf.startswith(b"%PDF")
+    assert executor.workers == 1
+    assert executor._pool is None
+
+
+def test_zero_workers_does_not_mean_every_core():
+    assert RenderExecutor(workers=0).workers == 1
+
+
+def test_pool_is_shut_down_with_the_celery_child(monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=1)
+    monkeypatch.setattr(render_executor, "_pool", pool)
+    worker_process_shutdown.send(sender=None, pid=0, exitcode=0)
+    assert render_executor._pool is None
+    assert pool._shutdown_thread
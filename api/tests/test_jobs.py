@@ -0,0 +1,125 @@
+import time
+import threading
+import pytest
+from django.contrib.auth.models import Group, User
+from rest_framework.test import APIClient
+from core.celery import app as celery_app
+from api import tasks
+from api.models import RenderJob
+from api.services.label_service import label_service
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings, tmp_path):
+    # the celery app reads its CELERY_* settings through django.conf.settings
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.CELERY_TASK_STORE_EAGER_RESULT = True
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+
+
+@pytest.fixture
+def other_client(db):
+    user = User.objects.create_user("other", password="other")
+    user.groups.add(Group.objects.get_or_create(name="Печатник")[0])
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def create_job(client, product, quantity=3):
+    items = [{"product_id": product.pk, "quantity": quantity}]
+    return client.post("/api/label/jobs/", {"kind": "product", "items": items}, format="json")
+
+
+def test_create_poll_download(api_client, operator, product):
+    response = create_job(api_client, product)
+    assert response.status_code == 202
+    job_id = response.data["job_id"]
+    assert RenderJob.objects.get(pk=job_id).owner == operator
+
+    status = api_client.get(f"/api/label/jobs/{job_id}/")
+    assert status.status_code == 200
+    assert status.data["status"] == "success"
+    assert status.data["pages_done"] == status.data["pages_total"] == 3
+    assert status.data["download_url"].endswith(f"/api/label/jobs/{job_id}/download/")
+
+    download = api_client.get(f"/api/label/jobs/{job_id}/download/")
+    assert download.status_code == 200
+    assert download["Content-Type"] == "application/pdf"
+    assert b"".join(download.streaming_content).startswith(b"%PDF")
+
+
+def test_other_users_cannot_see_the_job(api_client, other_client, product):
+    job_id = create_job(api_client, product).data["job_id"]
+
+    assert other_client.get(f"/api/label/jobs/{job_id}/").status_code == 404
+    assert other_client.get(f"/api/label/jobs/{job_id}/download/").status_code == 404
+
+
+def test_unknown_job_is_not_found(api_client, db):
+    response = api_client.get("/api/label/jobs/00000000-0000-0000-0000-000000000000/")
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def redis_worker(eager_jobs, settings, redis_url, monkeypatch):
+    # a real broker and result backend, and a worker thread consuming from them
+    from celery.contrib.testing.worker import start_worker
+
+    settings.CELERY_TASK_ALWAYS_EAGER = False
+    settings.CELERY_BROKER_URL = settings.CELERY_RESULT_BACKEND = redis_url
+    monkeypatch.setattr(celery_app, "_pool", None)
+    monkeypatch.setattr(celery_app, "_backend_cache", None)
+    monkeypatch.setattr(celery_app, "_local", threading.local())
+    with start_worker(celery_app, pool="solo", perform_ping_check=False, shutdown_timeout=10):
+        yield
+
+
+@pytest.fixture
+def paused_render(monkeypatch):
+    # hold the render after its first page so the PROGRESS state can be read
+    release = threading.Event()
+    generate = label_service.generate_batch_pdf
+
+    def generate_batch_pdf(jobs, progress=None, **kwargs):
+        def paused(done, total):
+            progress(done, total)
+            if done == 1:
+                assert release.wait(10), "the test never released the render"
+
+        return generate(jobs, progress=paused, **kwargs)
+
+    monkeypatch.setattr(tasks, "PROGRESS_INTERVAL", 0)
+    monkeypatch.setattr(label_service, "generate_batch_pdf", generate_batch_pdf)
+    yield release
+    release.set()
+
+
+def poll(client, job_id, until, timeout=20):
+    deadline = time.monotonic() + timeout
+    while True:
+        data = client.get(f"/api/label/jobs/{job_id}/").data
+        if until(data):
+            return data
+        assert time.monotonic() < deadline, f"job stuck at {data}"
+        time.sleep(0.05)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_job_through_redis_reports_progress(redis_worker, paused_render, api_client, product):
+    response = create_job(api_client, product, quantity=3)
+    assert response.status_code == 202
+    job_id = response.data["job_id"]
+
+    status = poll(api_client, job_id, lambda data: data["status"] == "progress" and data["pages_done"] == 1)
+    assert status["pages_total"] == 3
+    assert "download_url" not in status
+
+    paused_render.set()
+    status = poll(api_client, job_id, lambda data: data["status"] != "progress")
+    assert status["status"] == "success"
+    assert status["pages_done"] == status["pages_total"] == 3
+
+    download = api_client.get(f"/api/label/jobs/{job_id}/download/")
+    assert download.status_code == 200
+    assert b"".join(download.streaming_content).startswith(b"%PDF")
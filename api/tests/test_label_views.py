@@ -0,0 +1,36 @@
+from main.models import ProductCategory
+
+
+def test_contractor_without_template_is_a_bad_request(api_client, base_info, make_contractor):
+    contractor = make_contractor(template=None)
+    response = api_client.get(f"/api/label/contractor/{contractor.pk}/")
+    assert response.status_code == 400
+    assert response.data == {"error": f"Contractor {contractor.pk} has no template"}
+
+
+def test_product_without_template_is_a_bad_request(api_client, base_info, make_product):
+    product = make_product(template=None)
+    response = api_client.get(f"/api/label/product/{product.pk}/")
+    assert response.status_code == 400
+    assert response.data == {"error": f"Product {product.pk} has no template"}
+
+
+def test_category_rename_changes_the_json_etag(api_client, product):
+    url = f"/api/label/product/{product.pk}/"
+    first = api_client.get(url)
+    assert first.status_code == 200
+    etag = first["ETag"]
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    ProductCategory.objects.filter(pk=product.category_id).update(name="Супы")
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["category"] == "Супы"
+    assert response["ETag"] != etag
+
+
+def test_binary_etag_follows_the_label_only(api_client, product):
+    url = f"/api/label/product/{product.pk}.pdf"
+    etag = api_client.get(url)["ETag"]
+    ProductCategory.objects.filter(pk=product.category_id).update(name="Супы")
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
@@ -0,0 +1,21 @@
+import pytest
+from api.services.label_service import label_service
+from conftest import PRODUCT_ELEMENTS
+
+TEMPLATE = {"width": 58, "height": 40, "elements": PRODUCT_ELEMENTS}
+
+
+def op_for(key):
+    plan = label_service.compile_layout(TEMPLATE)
+    return next(op for op in plan.ops if op.key == key)
+
+
+@pytest.mark.parametrize("markup", ["<span>ООО</span> «Кухня»", "ООО «Кухня»<br />"])
+def test_markup_paragraph_shares_plain_baseline(markup):
+    # markup paragraphs have no blPara.ascent; the first line's ascent is used instead
+    op = op_for("company_info")
+    plain = label_service._layout_text(op, "ООО «Кухня»")
+    block = label_service._layout_text(op, markup)
+    assert label_service._fit_text(op, markup).paragraph.blPara.kind == 1
+    assert len(block.lines) == 1
+    assert block.y == pytest.approx(plain.y)
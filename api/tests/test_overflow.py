@@ -0,0 +1,91 @@
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from api.services import overflow
+from api.services.executor import RenderExecutor
+from api.services.overflow import analyze_template
+
+INGREDIENTS = "Капуста белокочанная, морковь, лук репчатый, масло подсолнечное, уксус, сахар, соль, перец черный молотый. "
+
+
+@pytest.fixture
+def catalog(base_info, make_product, make_contractor):
+    # ingredients: 14 mm of product__body_2 down to 2pt; weight: a 1 mm box nothing fits in
+    return {
+        "short": make_product(ingredients="Капуста, соль."),
+        "shrunk": make_product(ingredients=INGREDIENTS * 12),
+        "overflow": make_product(ingredients=INGREDIENTS * 60),
+        "contractor": make_contractor(),
+    }
+
+
+def report_data(report):
+    data = report.as_dict()
+    del data["seconds"], data["workers"]
+    return data
+
+
+def test_counts_overflow_and_min_fontsize(catalog, product_template):
+    report = analyze_template(product_template)
+    assert (report.products, report.contractors) == (3, 0)
+
+    ingredients = report.elements["ingredients"]
+    assert (ingredients.texts, ingredients.shrunk, ingredients.at_min, ingredients.overflow, ingredients.errors) == (3, 2, 1, 1, 0)
+    assert [(item["pk"], item["font_size"]) for item in ingredients.worst] == [(catalog["overflow"].pk, 2)]
+    assert ingredients.worst[0]["text_height"] > ingredients.height
+    assert ingredients.longest["pk"] == catalog["overflow"].pk
+    weight = report.elements["weight"]
+    assert (weight.texts, weight.shrunk, weight.at_min, weight.overflow) == (3, 3, 3, 3)
+    assert {element.key for element in report.problems} == {"weight", "ingredients"}
+
+
+def test_catalog_scope_takes_every_entity(catalog, product_template):
+    report = analyze_template(product_template, scope="catalog")
+    assert (report.products, report.contractors) == (3, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pooled_report_matches_inline(catalog, product_template, make_product, monkeypatch):
+    for n in range(5):
+        make_product(ingredients=INGREDIENTS * n * 10)
+    inline = analyze_template(product_template, executor=RenderExecutor(workers=1))
+
+    # spawned workers set Django up from the environment: point them at the test database
+    monkeypatch.setenv("POSTGRES_DB", connection.settings_dict["NAME"])
+    monkeypatch.setattr(overflow, "CHUNK_SIZE", 2)
+    executor = RenderExecutor(workers=2)
+    try:
+        pooled = analyze_template(product_template, executor=executor)
+    finally:
+        executor.shutdown()
+
+    assert pooled.workers == 2
+    assert report_data(pooled) == report_data(inline)
+
+
+def test_command_checks_a_draft_without_saving_it(catalog, product_template, tmp_path):
+    elements = {**product_template.elements, "ingredients": {**product_template.elements["ingredients"], "height": 40}}
+    path = tmp_path / "elements.json"
+    path.write_text(json.dumps(elements), encoding="utf-8")
+    history = product_template.history.count()
+
+    out = StringIO()
+    call_command("analyze_template_overflow", str(product_template.pk), "--elements", str(path), "--height", "80", "--json", stdout=out)
+    draft = json.loads(out.getvalue())
+
+    ingredients = next(element for element in draft["elements"] if element["key"] == "ingredients")
+    assert ingredients["overflow"] == 0
+    assert draft["version"] != analyze_template(product_template).version
+
+    product_template.refresh_from_db()
+    assert (product_template.height, product_template.elements["ingredients"]["height"]) == (40, 14)
+    assert product_template.history.count() == history
+
+
+def test_command_prints_the_problem_elements(catalog, product_template):
+    out = StringIO()
+    call_command("analyze_template_overflow", product_template.name, stdout=out)
+    assert "Проблемных элементов: 2" in out.getvalue()
+    assert f"product:{catalog['overflow'].pk}" in out.getvalue()
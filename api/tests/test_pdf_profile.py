@@ -0,0 +1,18 @@
+import pytest
+from reportlab import rl_config
+from api.serializers import ProductPayloadSerializer
+from api.services.label_service import label_service
+
+
+@pytest.mark.parametrize("profile, ascii85", [("legacy", True), ("compact", False), ("stable", False)])
+def test_ascii85_follows_the_profile(product, profile, ascii85):
+    default = rl_config.useA85
+    payload = ProductPayloadSerializer(instance=product).data
+    template = product.entity_template.template
+
+    single = label_service.render(template, payload, "pdf", pdf_profile=profile)
+    batch = label_service.generate_batch_pdf([(template, payload, 2)], pdf_profile=profile)
+
+    for pdf in (single, batch):
+        assert (b"/ASCII85Decode" in pdf) is ascii85
+    assert rl_config.useA85 == default
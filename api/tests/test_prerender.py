@@ -0,0 +1,29 @@
+from datetime import date
+from api.serializers import ProductPayloadSerializer
+from api.services.label_service import label_service
+from api.services.prerender import prerender_labels
+
+DAY = date(2026, 3, 2)
+
+
+def test_prerender_fills_and_reuses_the_cache(product, make_contractor):
+    make_contractor()
+    report = prerender_labels(DAY, formats=["pdf", "zpl"]).as_dict()
+    assert (report["products"], report["contractors"]) == (1, 1)
+    assert (report["rendered"], report["reused"], report["failed"]) == (4, 0, 0)
+
+    report = prerender_labels(DAY, formats=["pdf", "zpl"]).as_dict()
+    assert (report["rendered"], report["reused"]) == (0, 4)
+
+
+def test_printer_jobs_are_served_from_the_prerender(product, monkeypatch):
+    prerender_labels(DAY, formats=["zpl", "tspl"])
+    payload = ProductPayloadSerializer(instance=product, context={"date": DAY.isoformat()}).data
+    template = product.entity_template.template
+
+    def no_layout(*args, **kwargs):
+        raise AssertionError("printer job was laid out again")
+
+    monkeypatch.setattr(label_service, "layout_label", no_layout)
+    assert label_service.generate_zpl(template, payload).startswith(b"^XA")
+    assert label_service.generate_tspl(template, payload).startswith(b"SIZE ")
@@ -0,0 +1,49 @@
+import base64
+import pytest
+from api.services.label_service import label_service
+from api.services.layout import layout_cache
+
+
+@pytest.fixture
+def layout_passes(monkeypatch):
+    calls = []
+    layout_label = label_service.layout_label
+
+    def counted(plan, payload):
+        calls.append(plan.version)
+        return layout_label(plan, payload)
+
+    monkeypatch.setattr(label_service, "layout_label", counted)
+    return calls
+
+
+def preview(api_client, template):
+    data = {
+        "name": "Салат «Весенний»",
+        "ingredients": "Капуста, огурцы, укроп, масло подсолнечное.",
+        "weight": "150 гр.",
+        "calories": "85.00",
+        "protein": "1.20",
+        "fat": "6.10",
+        "carbs": "5.30",
+        "barcode": "4600000000017",
+        "best_before": 2,
+        "product_template-0-template": str(template.pk),
+    }
+    return api_client.post("/api/label/preview/product/?thumbnail=1", data, format="json")
+
+
+def test_multi_format_preview_lays_out_once(api_client, base_info, product_template, layout_passes):
+    response = preview(api_client, product_template)
+    assert response.status_code == 200
+    assert base64.b64decode(response.data["pdf"]).startswith(b"%PDF")
+    assert base64.b64decode(response.data["image"]).startswith(b"\x89PNG")
+    assert base64.b64decode(response.data["thumbnail"]).startswith(b"\x89PNG")
+    assert len(layout_passes) == 1
+    assert len(layout_cache) == 1
+
+
+def test_cached_preview_skips_layout(api_client, base_info, product_template, layout_passes):
+    preview(api_client, product_template)
+    preview(api_client, product_template)
+    assert len(layout_passes) == 1
@@ -0,0 +1,100 @@
+import threading
+import pytest
+from PIL import Image
+from api.management.commands.printer_stub import PrinterStubServer
+from api.serializers import ProductPayloadSerializer
+from api.services.label_service import label_service
+from api.services.printer import bitmap_rows, send_raw
+
+
+@pytest.fixture
+def printer():
+    received = threading.Event()
+    raw = []
+    server = PrinterStubServer(("127.0.0.1", 0), on_job=lambda client, data, jobs: (raw.append(data), received.set()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def send(data: bytes):
+        send_raw(*server.server_address, data)
+        assert received.wait(5), "printer stub received nothing"
+        return raw[-1], server.jobs[-1]
+
+    yield send
+    server.shutdown()
+    server.server_close()
+
+
+def print_job(product, language, **options):
+    payload = ProductPayloadSerializer(instance=product).data
+    return label_service.generate_printer_job(product.entity_template.template, payload, language, **options)
+
+
+@pytest.mark.parametrize("text_mode", ["graphic", "font"])
+def test_zpl_job_reaches_printer(printer, product, text_mode):
+    data, job = printer(print_job(product, "zpl", text_mode=text_mode, copies=3))
+
+    assert data.startswith(b"^XA^CI28^PW464^LL320")
+    assert data.endswith(b"^PQ3^XZ\n")
+    assert data.count(b"^XA") == data.count(b"^XZ") == 1
+    assert b"^BEN," in data
+    assert f"^FD{product.barcode[:12]}^FS".encode() in data
+    assert job["language"] == "zpl"
+    assert job["barcodes"] == [product.barcode[:12]]
+    assert job["copies"] == 3
+    if text_mode == "font":
+        assert b"^A0N," in data and product.name.encode() in data
+    else:
+        assert job["graphics"] > 0 and b"^A0N," not in data
+
+
+@pytest.mark.parametrize("text_mode", ["graphic", "font"])
+def test_tspl_job_reaches_printer(printer, product, text_mode):
+    data, job = printer(print_job(product, "tspl", text_mode=text_mode, copies=2))
+
+    assert data.startswith(b"SIZE 58.0 mm,40.0 mm\r\nGAP 2 mm,0 mm\r\nDIRECTION 0\r\nCODEPAGE UTF-8\r\nCLS\r\n")
+    assert data.endswith(b"PRINT 1,2\r\n")
+    assert b'"EAN13",' in data
+    assert f'"{product.barcode[:12]}"\r\n'.encode() in data
+    assert job["language"] == "tspl"
+    assert job["barcodes"] == [product.barcode[:12]]
+    assert job["copies"] == 2
+    assert job["bytes"] == len(data)
+    if text_mode == "font":
+        assert b'TEXT ' in data and product.name.encode() in data
+    else:
+        assert job["graphics"] > 0 and b"TEXT " not in data
+
+
+def tspl_bitmaps(data: bytes):
+    # (bytes per row, rows) of every BITMAP command, decoded by its declared size
+    bitmaps = []
+    pos = data.find(b"BITMAP ")
+    while pos >= 0:
+        header = data[pos + len(b"BITMAP "):].split(b",", 5)
+        width_bytes, height = int(header[2]), int(header[3])
+        start = pos + len(b"BITMAP ") + sum(len(part) + 1 for part in header[:5])
+        payload = data[start:start + width_bytes * height]
+        bitmaps.append((width_bytes, [payload[i:i + width_bytes] for i in range(0, len(payload), width_bytes)]))
+        pos = data.find(b"BITMAP ", start + len(payload))
+    return bitmaps
+
+
+@pytest.mark.parametrize("ink_bit, blank, black", [(0, b"\xff\xff", b"\x00\x3f"), (1, b"\x00\x00", b"\xff\xc0")])
+def test_bitmap_rows_padding_never_burns(ink_bit, blank, black):
+    assert bitmap_rows(Image.new("1", (10, 2), 1), ink_bit) == (2, [blank, blank])
+    assert bitmap_rows(Image.new("1", (10, 2), 0), ink_bit) == (2, [black, black])
+    assert bitmap_rows(Image.new("1", (16, 1), 1), ink_bit) == (2, [blank[:1] * 2])
+
+
+def test_tspl_bitmap_payload(printer, product):
+    data, job = printer(print_job(product, "tspl", text_mode="graphic"))
+    bitmaps = tspl_bitmaps(data)
+    assert len(bitmaps) == job["graphics"] > 0
+
+    for (width_bytes, rows), (_, args) in zip(bitmaps, [c for c in job["commands"] if c[0] == "BITMAP"]):
+        assert args.split(",")[2:4] == [str(width_bytes), str(len(rows))]
+        assert all(len(row) == width_bytes for row in rows)
+        # 0 burns in TSPL: every bitmap has ink, and the right edge is never solid black
+        assert any(byte != 0xFF for row in rows for byte in row)
+        assert not all(row[-1] & 1 == 0 for row in rows)
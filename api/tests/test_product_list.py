@@ -0,0 +1,78 @@
+import pytest
+from main.models import Product, ProductCategory, Template
+from conftest import PRODUCT_ELEMENTS
+
+N = 5
+
+
+def rows(response):
+    return response.data["results"] if isinstance(response.data, dict) else response.data
+
+
+@pytest.mark.parametrize("query, queries", [("", 1), ("?limit=500", 1), ("?thumbnails=url", 5)])
+def test_list_queries_do_not_grow_with_products(api_client, base_info, make_product, django_assert_num_queries, query, queries):
+    for _ in range(N):
+        make_product()
+    # warm up: the operator's access snapshot and BaseInfo are read once, not per product
+    api_client.get(f"/api/label/product/{query}")
+    with django_assert_num_queries(queries):
+        assert len(rows(api_client.get(f"/api/label/product/{query}"))) == N
+
+    for _ in range(9 * N):
+        make_product()
+    with django_assert_num_queries(queries):
+        assert len(rows(api_client.get(f"/api/label/product/{query}"))) == 10 * N
+
+
+def walk(api_client, url):
+    ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.data["results"]]
+        url = response.data["next"]
+    return ids
+
+
+def test_cursor_is_stable_across_ties(api_client, make_product):
+    soups = ProductCategory.objects.create(name="Супы")
+    # equal category and name: only pk tells them apart
+    products = [make_product(name="Борщ", category=soups) for _ in range(5)]
+    products += [make_product(name="Борщ") for _ in range(4)]
+    products += [make_product(name="Аджапсандал") for _ in range(2)]
+
+    ids = walk(api_client, "/api/label/product/?limit=2")
+    assert ids == [row["id"] for row in api_client.get("/api/label/product/").data]
+    assert sorted(ids) == sorted(product.pk for product in products)
+
+    # rows inserted behind the cursor do not shift the remaining pages
+    first = api_client.get("/api/label/product/?limit=3").data
+    make_product(name="Аджапсандал", category=soups)
+    assert [row["id"] for row in first["results"]] + walk(api_client, first["next"]) == ids
+
+
+def test_invalid_cursor_is_rejected(api_client, db):
+    assert api_client.get("/api/label/product/?cursor=bm9wZQ").status_code == 400
+    assert api_client.get("/api/label/product/?limit=0").status_code == 400
+
+
+def test_list_filters(api_client, make_product, product_template):
+    other_category = ProductCategory.objects.create(name="Супы")
+    other_template = Template.objects.create(name="product-small", width=40, height=30, elements=PRODUCT_ELEMENTS)
+    available = make_product()
+    archived = make_product(status=Product.ProductStatus.ARCHIEVED)
+    soup = make_product(category=other_category)
+    small = make_product(template=other_template)
+
+    def ids(query):
+        response = api_client.get(f"/api/label/product/{query}")
+        assert response.status_code == 200
+        return {row["id"] for row in rows(response)}
+
+    assert ids("") == {available.pk, soup.pk, small.pk}
+    assert ids("?status=ARCHIEVED") == {archived.pk}
+    assert ids(f"?category={other_category.pk}") == {soup.pk}
+    assert ids(f"?template={other_template.pk}") == {small.pk}
+    assert ids(f"?template={product_template.pk}&limit=10") == {available.pk, soup.pk}
+    assert api_client.get("/api/label/product/?status=DELETED").status_code == 400
+    assert api_client.get("/api/label/product/?category=soup").status_code == 400
@@ -0,0 +1,49 @@
+import shutil
+import pytest
+from io import BytesIO
+from PIL import Image
+from api.serializers import ContractorPayloadSerializer, ProductPayloadSerializer
+from api.services.label_service import label_service
+from api.services.raster import RASTER_TOLERANCE, pixel_diff
+
+needs_poppler = pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler (pdftoppm) is not installed")
+
+
+def poppler_diff(entity, serializer):
+    from pdf2image import convert_from_bytes
+
+    payload = serializer(instance=entity).data
+    plan = label_service.compile_layout(entity.entity_template.template)
+    placements = label_service.layout_label(plan, payload)
+    png = label_service._render_png(plan, placements)
+    reference = convert_from_bytes(label_service._render_pdf(plan, placements), dpi=203)[0]
+    return pixel_diff(Image.open(BytesIO(png)), reference)
+
+
+@needs_poppler
+def test_product_raster_matches_poppler(make_product, base_info):
+    product = make_product(
+        name="Салат из свежих овощей с сыром фета и оливками",
+        ingredients="Огурцы, томаты, перец болгарский, сыр фета (молоко, соль, закваска), оливки, масло оливковое, соль.",
+    )
+    assert poppler_diff(product, ProductPayloadSerializer) <= RASTER_TOLERANCE
+
+
+@needs_poppler
+def test_contractor_raster_matches_poppler(make_contractor, base_info):
+    contractor = make_contractor(comment="Взрослая травматология")
+    assert poppler_diff(contractor, ContractorPayloadSerializer) <= RASTER_TOLERANCE
+
+
+def test_pixel_diff_forgives_a_pixel_of_offset():
+    image = Image.new("L", (40, 20), 255)
+    image.paste(0, (10, 5, 30, 15))
+    shifted = Image.new("L", (40, 20), 255)
+    shifted.paste(0, (11, 6, 31, 16))
+    moved = Image.new("L", (40, 20), 255)
+    moved.paste(0, (0, 0, 5, 5))
+
+    assert pixel_diff(image, image) == 0
+    assert pixel_diff(image, shifted) == 0
+    assert pixel_diff(image, moved) == 100
+    assert pixel_diff(Image.new("L", (40, 20), 255), Image.new("L", (40, 20), 255)) == 0
@@ -0,0 +1,78 @@
+import os
+import pytest
+import redis
+from api.services.render_cache import DiskRenderStore, RedisRenderStore
+
+
+def tag_keys(store, tag):
+    path = store.root / "tags" / tag
+    return path.read_text().split() if path.exists() else None
+
+
+def test_eviction_prunes_tag_files(tmp_path):
+    store = DiskRenderStore(tmp_path, max_bytes=1000)
+    keys = [f"{n:064x}" for n in range(1, 4)]
+    for age, key in zip((300, 200, 100), keys):
+        store.set(key, b"x" * 300, tags=["template:1", f"product:{key[-1]}"])
+        os.utime(store._path(key), (0, 10 ** 9 - age))
+    store.set(keys[0], b"x" * 300, tags=["template:1"])  # a repeated append
+    os.utime(store._path(keys[0]), (0, 10 ** 9 - 300))
+
+    # 1200 bytes: the oldest entry goes to get back under 90% of the budget
+    latest = f"{9:064x}"
+    store.set(latest, b"y" * 300, tags=["template:1", "product:9"])
+
+    assert not store.contains(keys[0])
+    assert tag_keys(store, "product:1") is None
+    assert tag_keys(store, "template:1") == [keys[1], keys[2], latest]
+    assert tag_keys(store, "product:2") == [keys[1]]
+    assert store.invalidate_tag("template:1") == 3
+    assert store.size() == 0
+
+
+def test_disk_overwrite_is_counted_once(tmp_path):
+    store = DiskRenderStore(tmp_path, max_bytes=1000)
+    key = f"{1:064x}"
+    store.set(f"{2:064x}", b"x" * 100)
+    for _ in range(3):
+        store.set(key, b"x" * 300)
+    assert store._size == store.size() == 400
+
+
+@pytest.fixture
+def redis_store(redis_url):
+    return RedisRenderStore(redis.Redis.from_url(redis_url), max_bytes=1000, ttl=60)
+
+
+def test_redis_overwrite_and_drop_keep_the_byte_count(redis_store):
+    keys = [f"{n:064x}" for n in range(1, 4)]
+    for key in keys:
+        redis_store.set(key, b"x" * 200, tags=["template:1"])
+    redis_store.set(keys[0], b"x" * 100, tags=["template:1"])
+    assert redis_store.size() == 500
+    assert redis_store.get(keys[0]) == b"x" * 100
+
+    assert redis_store.invalidate_tag("template:1") == 3
+    assert redis_store.size() == 0
+    assert redis_store.client.hlen("render:sizes") == redis_store.client.zcard("render:lru") == 0
+
+
+def test_redis_expired_entries_do_not_wipe_the_cache(redis_store):
+    keys = [f"{n:064x}" for n in range(1, 5)]
+    for age, key in zip((300, 200, 100), keys):
+        redis_store.set(key, b"x" * 300)
+        redis_store.client.zadd("render:lru", {key: 10 ** 9 - age})
+    # the first two expire by TTL
+    redis_store.client.delete(*[redis_store.prefix + key for key in keys[:2]])
+
+    # 1200 bytes counted: dropping the oldest (expired) entry is enough
+    redis_store.set(keys[3], b"x" * 300)
+    assert redis_store.size() == 900
+    assert redis_store.get(keys[2]) is not None and redis_store.get(keys[3]) is not None
+
+    # a miss on an expired key stops counting it
+    assert redis_store.get(keys[1]) is None
+    assert redis_store.size() == 600
+
+    redis_store.clear()
+    assert redis_store.size() == 0 and not redis_store.client.exists("render:sizes", "render:lru")
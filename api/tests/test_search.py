@@ -0,0 +1,147 @@
+import json
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.services.search import search_contractors, search_products
+from main.models import Contractor, Product
+
+
+@pytest.fixture(autouse=True)
+def cyrillic_trigrams(db):
+    # pg_trgm only splits letters of the database ctype; a C-locale cluster sees none in Cyrillic
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT show_trgm('ж')")
+        if not cursor.fetchone()[0]:
+            pytest.skip("database ctype does not classify Cyrillic letters")
+
+
+def names(queryset):
+    return [row.name for row in queryset]
+
+
+def test_product_search_ranks_exact_word_first(make_product):
+    make_product(name="Салат витаминный")
+    make_product(name="Салат «Оливье»")
+    make_product(name="Винегрет")
+
+    assert names(search_products(Product.objects.all(), "оливье")) == ["Салат «Оливье»"]
+    assert names(search_products(Product.objects.all(), "салат витаминный"))[0] == "Салат витаминный"
+
+
+def test_product_search_matches_prefix_and_typo(make_product):
+    make_product(name="Котлета куриная")
+    make_product(name="Плов")
+
+    assert names(search_products(Product.objects.all(), "котл")) == ["Котлета куриная"]
+    assert names(search_products(Product.objects.all(), "курина")) == ["Котлета куриная"]
+    assert names(search_products(Product.objects.all(), "котлета говяжья")) == []
+
+
+def test_product_search_matches_barcode_digits(make_product):
+    inside = make_product(name="Плов", barcode="4600000461234")
+    prefix = make_product(name="Борщ", barcode="4612345000000")
+    make_product(name="Винегрет", barcode="4699999999999")
+
+    found = list(search_products(Product.objects.all(), "461234"))
+    # a barcode prefix outranks a match further in
+    assert [product.pk for product in found] == [prefix.pk, inside.pk]
+    assert found[0].similarity > found[1].similarity
+    assert list(search_products(Product.objects.all(), "0461234")) == [inside]
+
+
+def test_contractor_search_covers_name_city_and_street(make_contractor):
+    ward = make_contractor(name="Терапия", city="Тюмень", street="Мельникайте, 75")
+    make_contractor(name="Хирургия", city="Ишим", street="Ленина, 1")
+
+    for query in ("терапия", "тюмень", "мельникайте", "терапия тюмень"):
+        assert list(search_contractors(Contractor.objects.all(), query)) == [ward]
+
+
+def test_search_endpoints(api_client, make_product, make_contractor):
+    make_product(name="Котлета куриная")
+    make_contractor(name="Терапия")
+
+    response = api_client.get("/api/label/product/search/?q=котлета")
+    assert response.status_code == 200
+    assert [row["name"] for row in response.data] == ["Котлета куриная"]
+    assert response.data[0]["similarity"] > 0
+    response = api_client.get("/api/label/contractor/search/?q=терапия")
+    assert [row["name"] for row in response.data] == ["Терапия"]
+
+    assert api_client.get("/api/label/product/search/?q=к").status_code == 400
+    assert api_client.get("/api/label/product/search/?q=котлета&limit=x").status_code == 400
+    assert api_client.get("/api/label/product/search/?q=котлета&status=ARCHIEVED").data == []
+
+
+SEED_ROWS = 100_000
+BUDGET_MS = 20
+
+
+@pytest.fixture
+def catalog(product_category, contractor_category):
+    # 100k products and contractors: 20 dishes x 15 kinds, every dish word in 5000 names
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO main_product (status, category_id, name, ingredients, weight, best_before,
+                                      calories, protein, fat, carbs, barcode, caption)
+            SELECT 'CREATED', %s,
+                   (ARRAY['Салат','Суп','Котлета','Запеканка','Каша','Рагу','Плов','Омлет','Сырники','Гуляш',
+                          'Борщ','Щи','Солянка','Пюре','Тефтели','Голубцы','Блины','Оладьи','Рис','Гречка'])[1 + n %% 20]
+                   || ' ' ||
+                   (ARRAY['куриный','говяжий','овощной','рыбный','домашний','сливочный','грибной','молочный',
+                          'творожный','свекольный','морковный','капустный','гороховый','тыквенный','сырный'])[1 + n / 20 %% 15]
+                   || ' №' || n,
+                   '-', '100 гр.', 4, 1, 1, 1, 1, '46' || lpad(n::text, 11, '0'), ''
+            FROM generate_series(1, %s) n
+            """,
+            [product_category.pk, SEED_ROWS],
+        )
+        cursor.execute(
+            """
+            INSERT INTO main_contractor (category_id, name, city, street)
+            SELECT %s, 'Отделение №' || n,
+                   (ARRAY['Тюмень','Тюмень','Тюмень','Ишим','Тобольск','Ялуторовск'])[1 + n %% 6],
+                   (ARRAY['Мельникайте','Республики','Ленина','Широтная','Котовского'])[1 + n / 6 %% 5] || ', ' || n %% 200
+            FROM generate_series(1, %s) n
+            """,
+            [contractor_category.pk, SEED_ROWS],
+        )
+        cursor.execute("ANALYZE main_product")
+        cursor.execute("ANALYZE main_contractor")
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql)
+        plan = cursor.fetchone()[0]
+    return json.loads(plan)[0] if isinstance(plan, str) else plan[0]
+
+
+# Exact words, several words and digits keep to the budget. A prefix or a typo of a word
+# that thousands of names share has no row at distance 0, so the nearest-first scan reads
+# more of the index: those only have to be served by it (benchmark_labels --suite search).
+@pytest.mark.parametrize("url, index, budget", [
+    ("/api/label/product/search/?q=котлета", "product_name_gist", True),
+    ("/api/label/product/search/?q=котлета куриный", "product_name_gist", True),
+    ("/api/label/product/search/?q=котл", "product_name_gist", False),
+    ("/api/label/product/search/?q=катлета", "product_name_gist", False),
+    ("/api/label/product/search/?q=0004242", "product_barcode_trgm", True),
+    ("/api/label/contractor/search/?q=тюмень", "contractor_search_gist", True),
+    ("/api/label/contractor/search/?q=мельникайте 75", "contractor_search_gist", False),
+])
+def test_search_at_100k_rows(api_client, catalog, url, index, budget):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url)
+    assert response.status_code == 200
+    assert len(response.data) == 20 or "0004242" in url
+
+    # the plan of the endpoint's own query; best of three against the budget
+    sql = queries.captured_queries[-1]["sql"]
+    plans = [explain(sql) for _ in range(3)]
+    plan = json.dumps(plans[0]["Plan"])
+    assert index in plan
+    if index.endswith("_gist"):
+        assert '"Order By"' in plan
+    if budget:
+        assert min(plan["Execution Time"] for plan in plans) < BUDGET_MS
@@ -0,0 +1,66 @@
+from io import BytesIO
+from PIL import Image
+from api.services.label_service import label_service
+from api.services.render_cache import render_cache
+from api.services.sprites import SPRITE_COLUMNS, SPRITE_GAP, build_sprite, entity_entries, plan_sprite
+
+
+def test_sprite_sheet_matches_its_plan(base_info, make_product):
+    products = [make_product() for _ in range(SPRITE_COLUMNS + 2)]
+    entries = entity_entries("product", products)
+    plan = plan_sprite("product", entries)
+    width, height = label_service.thumbnail_size(entries[0][1])
+
+    assert (plan.width, plan.height) == (SPRITE_COLUMNS * (width + SPRITE_GAP) - SPRITE_GAP, 2 * height + SPRITE_GAP)
+    last = plan.cells[products[-1].pk]
+    assert (last.x, last.y, last.width, last.height) == (width + SPRITE_GAP, height + SPRITE_GAP, width, height)
+
+    sheet = Image.open(BytesIO(build_sprite(plan.key)))
+    assert sheet.size == (plan.width, plan.height)
+    first = plan.cells[products[0].pk]
+    cell = sheet.convert("L").crop((first.x, first.y, first.x + first.width, first.y + first.height))
+    assert cell.getextrema()[0] < 128  # the thumbnail has ink
+
+
+def test_sprite_key_follows_the_products(base_info, make_product):
+    products = [make_product() for _ in range(3)]
+    key = plan_sprite("product", entity_entries("product", products)).key
+    assert plan_sprite("product", entity_entries("product", products)).key == key
+
+    products[1].name = "Борщ"
+    products[1].save()
+    assert plan_sprite("product", entity_entries("product", products)).key != key
+
+
+def test_evicted_manifest_is_planned_again(base_info, make_product):
+    plan = plan_sprite("product", entity_entries("product", [make_product()]))
+    render_cache.clear()
+    assert build_sprite(plan.key) is None
+
+
+def test_list_links_the_sprite(api_client, base_info, make_product):
+    products = [make_product() for _ in range(3)]
+    response = api_client.get("/api/label/product/?thumbnails=sprite")
+    assert response.status_code == 200
+    thumbnails = {row["id"]: row["thumbnail"] for row in response.data}
+    assert set(thumbnails) == {product.pk for product in products}
+    assert len({thumbnail["url"] for thumbnail in thumbnails.values()}) == 1
+
+    sheet = api_client.get(thumbnails[products[0].pk]["url"])
+    assert sheet.status_code == 200
+    assert sheet["Content-Type"] == "image/png"
+    assert api_client.get(thumbnails[products[0].pk]["url"], HTTP_IF_NONE_MATCH=sheet["ETag"]).status_code == 304
+
+
+def test_list_links_single_thumbnails(api_client, base_info, make_product):
+    product = make_product()
+    response = api_client.get("/api/label/product/?thumbnails=url")
+    url = response.data[0]["thumbnail"]["url"]
+    assert url.endswith(f"/api/label/product/{product.pk}/thumbnail/")
+    thumbnail = api_client.get(url)
+    assert thumbnail.status_code == 200
+    assert Image.open(BytesIO(thumbnail.content)).size == label_service.thumbnail_size(product.entity_template.template)
+
+
+def test_unknown_thumbnail_mode_is_rejected(api_client, db):
+    assert api_client.get("/api/label/product/?thumbnails=inline").status_code == 400
@@ -0,0 +1,53 @@
+import pytest
+from api.services.label_service import label_service
+from api.services.text_fit import FONT_STEP, TextFitter, linear_fit
+from api.utils.styles import STYLES
+from conftest import CONTRACTOR_ELEMENTS, PRODUCT_ELEMENTS
+
+INGREDIENTS = (
+    "Состав: мясо цыплят-бройлеров, лук репчатый, хлеб пшеничный (мука пшеничная хлебопекарная высшего сорта, "
+    "вода питьевая, дрожжи хлебопекарные, соль поваренная пищевая, сахар), яйцо куриное, молоко питьевое 2,5%, "
+    "масло подсолнечное рафинированное дезодорированное, сухари панировочные, соль поваренная пищевая, "
+    "перец черный молотый, чеснок сушеный. Пищевая ценность в 100 г: белки 16,2 г, жиры 12,4 г, углеводы 9,8 г. "
+    "Энергетическая ценность 215 ккал / 900 кДж. Хранить при температуре от +2 до +6 °C не более 72 часов."
+)
+TEXTS = [INGREDIENTS, INGREDIENTS[:160], "Котлета куриная", "Сыр"]
+BOXES = [(164, 6), (164, 40), (164, 120), (60, 20), (60, 400)]
+
+# min_fontsize relative to the style's own size: none, below it, off the 0.5pt grid,
+# one step down, equal to it and above it
+MIN_FONTSIZES = [
+    pytest.param(lambda size: None, id="none"),
+    pytest.param(lambda size: 0, id="zero"),
+    pytest.param(lambda size: 2, id="2pt"),
+    pytest.param(lambda size: size / 3 + 0.2, id="off-grid"),
+    pytest.param(lambda size: size - FONT_STEP, id="one-step"),
+    pytest.param(lambda size: size, id="equal"),
+    pytest.param(lambda size: size + 1, id="above"),
+]
+
+
+@pytest.mark.parametrize("min_fontsize", MIN_FONTSIZES)
+@pytest.mark.parametrize("style_name", list(STYLES))
+def test_fit_picks_the_linear_size(style_name, min_fontsize):
+    raw_style = STYLES[style_name]
+    minimum = min_fontsize(raw_style["fontSize"])
+    for text in TEXTS:
+        for width, height in BOXES:
+            fit = TextFitter().fit(text, style_name, raw_style, width, height, min_fontsize=minimum)
+            size, _ = linear_fit(text, style_name, raw_style, width, height, minimum)
+            assert fit.font_size == size, (text[:20], width, height)
+            assert fit.fits == (fit.height <= height)
+
+
+@pytest.mark.parametrize("elements", [PRODUCT_ELEMENTS, CONTRACTOR_ELEMENTS])
+def test_fit_picks_the_linear_size_on_template_elements(elements):
+    plan = label_service.compile_layout({"width": 58, "height": 40, "elements": elements})
+    fitter = TextFitter()
+    for op in plan.ops:
+        if op.kind != "text":
+            continue
+        for text in TEXTS:
+            fit = fitter.fit(text, op.style_name, op.raw_style, op.width, op.height, min_fontsize=op.min_fontsize)
+            size, _ = linear_fit(text, op.style_name, op.raw_style, op.width, op.height, op.min_fontsize)
+            assert fit.font_size == size, (op.key, text[:20])
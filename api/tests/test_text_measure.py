@@ -0,0 +1,81 @@
+import random
+import pytest
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph
+from api.services.text_measure import text_measure
+from api.utils.styles import STYLES
+
+LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯ"
+PUNCTUATION = ",.:;%()-«»"
+
+
+def random_text(rng):
+    words = []
+    for _ in range(rng.randint(1, 40)):
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(1, 12)))
+        if rng.random() < 0.2:
+            word += rng.choice(PUNCTUATION)
+        if rng.random() < 0.1:
+            word = str(rng.randint(1, 999)) + word
+        words.append(word)
+    return " ".join(words)
+
+
+def paragraph_wrap(text, raw_style, width):
+    p = Paragraph(text, ParagraphStyle("measure", **raw_style))
+    _, height = p.wrap(width, 0)
+    assert p.blPara.kind == 0
+    return [" ".join(words) for _, words in p.blPara.lines], height
+
+
+def line_limits(style, width):
+    style = {**ParagraphStyle.defaults, **style}
+    left, right = style["leftIndent"], style["rightIndent"]
+    return width - left - style["firstLineIndent"] - right, width - left - right
+
+
+def assert_same_wrap(text, raw_style, width):
+    measured = text_measure.wrap(text, raw_style, width)
+    if measured is None:
+        # only where Paragraph has to split a word wider than the line
+        widest = max(stringWidth(word, raw_style["fontName"], raw_style["fontSize"]) for word in text.split())
+        assert widest > min(line_limits(raw_style, width))
+        return False
+    assert measured == paragraph_wrap(text, raw_style, width)
+    return True
+
+
+@pytest.mark.parametrize("style_name", list(STYLES))
+def test_wrap_matches_paragraph(style_name):
+    rng = random.Random(style_name)
+    raw_style = STYLES[style_name]
+    size = raw_style["fontSize"]
+    matched = 0
+    for _ in range(300):
+        matched += assert_same_wrap(random_text(rng), raw_style, rng.uniform(size * 4, size * 25))
+    assert matched > 200
+
+
+@pytest.mark.parametrize("style_name", list(STYLES))
+def test_wrap_matches_paragraph_at_line_boundaries(style_name, monkeypatch):
+    # widths where a line ends exactly at the limit, or at the limit with every space
+    # shrunk, go through _exact_end; a hair either side must break the same as Paragraph
+    exact_ends = []
+    exact_end = text_measure._exact_end
+    monkeypatch.setattr(text_measure, "_exact_end", lambda *args: exact_ends.append(args) or exact_end(*args))
+
+    rng = random.Random(style_name)
+    raw_style = STYLES[style_name]
+    font, size = raw_style["fontName"], raw_style["fontSize"]
+    shrink = ParagraphStyle.defaults["spaceShrinkage"] * stringWidth(" ", font, size)
+    indents = raw_style.get("leftIndent", 0) + raw_style.get("rightIndent", 0)
+    for _ in range(20):
+        text = random_text(rng)
+        words = text.split()
+        for count in range(1, min(len(words), 6) + 1):
+            line = stringWidth(" ".join(words[:count]), font, size)
+            for limit in (line, line - shrink * (count - 1)):
+                for delta in (-1e-9, 0, 1e-9, 1e-6):
+                    assert_same_wrap(text, raw_style, limit + indents + delta)
+    assert exact_ends
@@ -0,0 +1,118 @@
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from django.conf import settings
+from core.utils.redis_client import get_label_cache_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "access:"
+
+
+@dataclass(frozen=True)
+class UserAccess:
+    groups: FrozenSet[str]
+    permissions: FrozenSet[str]
+
+    def dumps(self) -> str:
+        return json.dumps({"groups": sorted(self.groups), "permissions": sorted(self.permissions)})
+
+    @classmethod
+    def loads(cls, raw) -> "UserAccess":
+        data = json.loads(raw)
+        return cls(frozenset(data["groups"]), frozenset(data["permissions"]))
+
+
+NO_ACCESS = UserAccess(frozenset(), frozenset())
+
+
+class UserAccessCache:
+    # Group names and permissions of a user, read once per request from Redis (shared by all
+    # workers, so a group change is seen everywhere at once) or from this process. Signals only
+    # clear the copy of the process that made the change, so without Redis other workers keep
+    # a revoked group for up to local_ttl seconds. is_active/is_superuser come from
+    # request.user itself and are never cached.
+    def __init__(self, ttl: int = 60, local_ttl: int = 5):
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self._items: Dict[int, Tuple[UserAccess, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user) -> UserAccess:
+        if not user.is_authenticated:
+            return NO_ACCESS
+        access = getattr(user, "_access_snapshot", None)
+        if access is None:
+            access = self._cached(user.pk)
+            if access is None:
+                access = self._load(user)
+                self._store(user.pk, access)
+            user._access_snapshot = access
+        return access
+
+    def in_group(self, user, name: str) -> bool:
+        return name in self.get(user).groups
+
+    def has_perm(self, user, perm: str) -> bool:
+        # ModelBackend.has_perm without its per-request queries
+        if not user.is_active:
+            return False
+        return user.is_superuser or perm in self.get(user).permissions
+
+    def invalidate(self, user_ids: Iterable[int]):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            for pk in user_ids:
+                self._items.pop(pk, None)
+        client = get_label_cache_redis()
+        if client is None:
+            return
+        try:
+            client.delete(*[REDIS_PREFIX + str(pk) for pk in user_ids])
+        except Exception as e:
+            logger.warning(f"Access cache invalidation failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def _load(self, user) -> UserAccess:
+        groups = frozenset(user.groups.values_list("name", flat=True))
+        return UserAccess(groups, frozenset(user.get_all_permissions()))
+
+    def _cached(self, pk: int) -> Optional[UserAccess]:
+        client = get_label_cache_redis()
+        if client is not None:
+            try:
+                raw = client.get(REDIS_PREFIX + str(pk))
+                return UserAccess.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Access cache read failed: {e}")
+                return None
+        with self._lock:
+            item = self._items.get(pk)
+        if item is not None and item[1] > time.monotonic():
+            return item[0]
+        return None
+
+    def _store(self, pk: int, access: UserAccess):
+        client = get_label_cache_redis()
+        if client is not None:
+            try:
+                client.set(REDIS_PREFIX + str(pk), access.dumps(), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Access cache write failed: {e}")
+            return
+        with self._lock:
+            self._items[pk] = (access, time.monotonic() + self.local_ttl)
+
+
+user_access = UserAccessCache(
+    ttl=getattr(settings, "ACCESS_CACHE_TTL", 60),
+    local_ttl=getattr(settings, "ACCESS_CACHE_LOCAL_TTL", 5),
+)
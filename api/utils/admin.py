@@ -1,9 +1,10 @@
 from django.urls import reverse
 from main.models import Product, Contractor
+from .access import user_access
 
 
 def admin_has_change_perm(user, model):
-    return user.has_perm(f"{model._meta.app_label}.change_{model._meta.model_name}")
+    return user_access.has_perm(user, f"{model._meta.app_label}.change_{model._meta.model_name}")
 
 def admin_change_url(model, pk):
     return reverse(
@@ -2,7 +2,8 @@ import json
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
-from main.models import BaseInfo, Template, OrgStandart, ContractorCategory
+from main.models import Template, OrgStandart, ContractorCategory
+from main.utils.base_info import base_info_cache
 
 def to_dec(value):
     ZERO_DEC = Decimal('0')
@@ -59,7 +60,7 @@ def format_dates(base, now = None):
     return manufacture, expiry_str
 
 def format_company_info():
-    company = BaseInfo.get_solo()
+    company = base_info_cache.get()
     return (
         f"Изготовитель: {company.name}<br />"
         f"Адрес производства: {company.address}<br />"
@@ -67,7 +68,7 @@ def format_company_info():
     )
 
 def format_company_short_info():
-    company = BaseInfo.get_solo()
+    company = base_info_cache.get()
     return (
         f"{company.name}<br />"
         f"{company.short_address}"
@@ -119,7 +120,10 @@ def extract_org_standarts_from_mapping(instance):
 def extract_org_standarts_from_instance(instance):
     org_strings = []
     if hasattr(instance, 'org_standart'):
-        rel_qs = instance.org_standart.select_related('org_standart').all()
+        if 'org_standart' in getattr(instance, '_prefetched_objects_cache', {}):
+            rel_qs = instance.org_standart.all()
+        else:
+            rel_qs = instance.org_standart.select_related('org_standart').all()
         for rel in rel_qs:
             o = getattr(rel, 'org_standart', None)
             if o:
@@ -1,3 +1,6 @@
+import json
+import uuid
+import hashlib
 import logging
 import base64
 import urllib.parse
@@ -5,16 +8,26 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
+from django.db.models import F, OuterRef, Subquery
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseBadRequest, FileResponse
+from django.core.files.storage import default_storage
+from django.utils.http import parse_etags
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization
-from main.models import BaseInfo, Template, Product, Contractor
+from main.models import Template, Product, ProductTemplate, Contractor
+from main.utils.base_info import base_info_cache
 from core.settings import BASE_DIR, DEBUG
+from core.celery import app as celery_app
+from .models import RenderJob
 from .serializers import (
     UserInfoModelSerializer,
     TemplatePayloadSerializer,
@@ -23,11 +36,28 @@ from .serializers import (
     ProductTemplateSerializer,
     ProductTemplateListSerializer,
     ContractorTemplateSerializer,
-    ContractorTemplateListSerializer
+    ContractorTemplateListSerializer,
+    ProductBatchSerializer,
+    ContractorBatchSerializer,
+    LabelBatchResultSerializer,
+    RenderJobCreateSerializer,
+    RenderJobSerializer
 )
 from .services.label_service import label_service
+from .services.layout import layout_cache
+from .services.render_cache import render_cache
+from .services.pdf_profile import get_pdf_profile
+from .services.search import DEFAULT_LIMIT, MAX_LIMIT, MIN_QUERY_LENGTH, search_contractors, search_products
+from .services.sprites import build_sprite, entity_entries, load_entries, plan_sprite
+from main.utils.barcode import barcode_cache
+from .services.executor import render_executor
+from .services.batch import BatchError, product_jobs, contractor_jobs
+from .tasks import build_label_sprite, render_label_job
 from .permissions import IsPrintOperator, IsContractor
+from .renderers import BinaryRenderer, PDFRenderer, PNGRenderer
+from .pagination import KeysetPagination
 from .utils.admin import admin_has_change_perm, admin_change_url
+from .utils.access import user_access
 from .utils.format import extract_template_from_mapping
 
 logger = logging.getLogger(__name__)
@@ -37,7 +67,7 @@ class InfoView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        info = BaseInfo.get_solo()
+        info = base_info_cache.get()
         if not info:
             return Response({}, status=404)
         result = {
@@ -45,19 +75,182 @@ class InfoView(APIView):
             "username": request.user.username,
             "is_staff": request.user.is_staff,
             "is_superuser": request.user.is_superuser,
-            "groups": list(request.user.groups.values_list('name', flat=True)),
+            "groups": sorted(user_access.get(request.user).groups),
         }
         serializer = UserInfoModelSerializer(data=result)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.validated_data)
 
 
-class TemplateLabelViewSet(ViewSet):
+class LabelCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "render": render_cache.stats(),
+            "barcode": barcode_cache.stats(),
+            "layout": {"size": len(layout_cache)},
+        })
+
+
+class PdfProfileMixin:
+    # None falls back to LABEL_PDF_PROFILE; clients may override with ?pdf_profile=
+    pdf_profile = None
+
+    def get_pdf_profile(self, request) -> str:
+        try:
+            return get_pdf_profile(request.query_params.get('pdf_profile') or self.pdf_profile).name
+        except ValueError as e:
+            raise ValidationError({'pdf_profile': str(e)})
+
+
+class LabelResponseMixin(PdfProfileMixin):
+    # JSON with base64 stays the default for the admin JS; Accept: application/pdf or
+    # image/png (or a .pdf/.png suffix) returns the file itself
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PDFRenderer, PNGRenderer]
+
+    def label_format(self, request) -> str:
+        fmt = request.accepted_renderer.format
+        return fmt if fmt in ('pdf', 'png') else 'json'
+
+    def label_etag(self, template, payload, fmt, pdf_profile=None, fields=None) -> str:
+        # the render cache key covers the template version and every resolved field of the entity;
+        # fields are the rest of the JSON body (name, category, ...) that the label may not print
+        key = label_service.cache_key(template, payload, 'pdf' if fmt == 'json' else fmt, pdf_profile=pdf_profile)
+        if fmt == 'json' and fields:
+            raw = json.dumps([key, fields], sort_keys=True, ensure_ascii=False, default=str)
+            key = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return f'"{key}-{fmt}"'
+
+    def is_not_modified(self, request, etag) -> bool:
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        return etag in etags or '*' in etags
+
+    def label_headers(self, etag=None):
+        headers = {'Cache-Control': 'private, no-cache', 'Vary': 'Accept'}
+        if etag:
+            headers['ETag'] = etag
+        return headers
+
+    def not_modified(self, etag):
+        return Response(status=304, headers=self.label_headers(etag))
+
+    def binary_response(self, data, filename, etag=None):
+        headers = self.label_headers(etag) | {'Content-Disposition': f'inline; filename="{filename}"'}
+        return Response(data, headers=headers)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # errors are rendered as JSON whatever the client asked for
+        renderer = getattr(request, 'accepted_renderer', None)
+        if isinstance(renderer, BinaryRenderer) and not isinstance(response.data, (bytes, type(None))):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def search_query(request) -> str:
+    query = ' '.join(request.query_params.get('q', '').split())
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ValidationError({'q': f'Ensure this field has at least {MIN_QUERY_LENGTH} characters.'})
+    return query
+
+
+def search_limit(request) -> int:
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValidationError({'limit': 'A valid integer is required.'})
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+class LabelThumbnailMixin(LabelResponseMixin):
+    # ?thumbnails=sprite places every label of the list on one sheet (one image request per page),
+    # ?thumbnails=url links each label's own thumbnail
+    thumbnail_kind = None
+    thumbnail_model = None
+    thumbnail_modes = ('sprite', 'url')
+
+    def attach_thumbnails(self, request, results):
+        mode = request.query_params.get('thumbnails')
+        if not mode:
+            return
+        if mode not in self.thumbnail_modes:
+            raise ValidationError({'thumbnails': f'Unknown mode: {mode}'})
+
+        by_id = {res["id"]: res for res in results}
+        order = {pk: n for n, pk in enumerate(by_id)}
+        entries = sorted(load_entries(self.thumbnail_kind, list(by_id)), key=lambda entry: order[entry[0]])
+        if not entries:
+            return
+        # without a render cache there is nowhere to keep the sheet between requests
+        if mode == 'url' or render_cache.store is None:
+            for pk, _, _ in entries:
+                url = reverse(f'{self.basename}-thumbnail', args=[pk])
+                by_id[pk]["thumbnail"] = {"url": request.build_absolute_uri(url)}
+            return
+
+        sprite = plan_sprite(self.thumbnail_kind, entries)
+        url = request.build_absolute_uri(reverse(f'{self.basename}-sprite', kwargs={'key': sprite.key}))
+        for pk, cell in sprite.cells.items():
+            by_id[pk]["thumbnail"] = {"url": url, "x": cell.x, "y": cell.y, "width": cell.width, "height": cell.height}
+        if not render_cache.contains(sprite.key):
+            try:
+                build_label_sprite.delay(sprite.key)
+            except Exception as e:
+                # the sprite endpoint builds it on first request anyway
+                logger.warning(f"Sprite task was not queued: {e}")
+
+    @action(detail=False, methods=['get'], url_path=r'sprite/(?P<key>[0-9a-f]{64})', renderer_classes=[PNGRenderer])
+    def sprite(self, request, key=None):
+        # the key covers every thumbnail on the sheet, so a sheet never changes under its URL
+        etag = f'"{key}-sprite"'
+        if self.is_not_modified(request, etag):
+            return self.not_modified(etag)
+        data = build_sprite(key)
+        if data is None:
+            return Response({'error': 'Sprite not found'}, status=404)
+        return self.binary_response(data, f"{self.thumbnail_kind}-sprite.png", etag)
+
+    @action(detail=True, methods=['get'], url_path='thumbnail', renderer_classes=[PNGRenderer])
+    def thumbnail(self, request, pk=None):
+        obj = get_object_or_404(self.thumbnail_model, id=pk)
+        entries = entity_entries(self.thumbnail_kind, [obj])
+        if not entries:
+            return Response({'error': f'{self.thumbnail_model.__name__} {obj.pk} has no template'}, status=404)
+        _, template, payload = entries[0]
+        etag = self.label_etag(template, payload, 'thumbnail')
+        if self.is_not_modified(request, etag):
+            return self.not_modified(etag)
+        data = label_service.render(template, payload, 'thumbnail', tags=[f"{self.thumbnail_kind}:{obj.pk}"])
+        return self.binary_response(data, f"{self.thumbnail_kind}-{obj.pk}-thumbnail.png", etag)
+
+
+class TemplateLabelViewSet(LabelResponseMixin, ViewSet):
     permission_classes = [IsAuthenticated]
 
-    @action(detail=False, methods=['post'], url_path='template')
+    def preview_data(self, request, template, payload, pdf_profile):
+        formats = ['pdf', 'png']
+        if request.query_params.get('thumbnail'):
+            formats.append('thumbnail')
+        outputs = label_service.render_many(template, payload, formats, pdf_profile=pdf_profile)
+        data = {
+            'image': base64.b64encode(outputs['png']).decode('utf-8'),
+            'pdf': base64.b64encode(outputs['pdf']).decode('utf-8'),
+        }
+        if 'thumbnail' in outputs:
+            data['thumbnail'] = base64.b64encode(outputs['thumbnail']).decode('utf-8')
+        return data
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='template',
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, PNGRenderer],
+    )
     def template(self, request):
         serializer = TemplatePayloadSerializer(instance=request.data)
+        if self.label_format(request) == 'png':
+            return self.binary_response(label_service.generate_template_png(serializer.data), "template.png")
         image = label_service.generate_template_png_preview_base64(serializer.data)
         return Response({'image': image})
 
@@ -70,9 +263,14 @@ class TemplateLabelViewSet(ViewSet):
             logger.error("Missing field: template")
             return Response({'error': 'Missing field: template'}, status=400)
 
-        image = label_service.generate_png_preview_base64(template, serializer.data)
-        pdf = label_service.generate_pdf_preview_base64(template, serializer.data)
-        return Response({'image': image, 'pdf': pdf})
+        fmt = self.label_format(request)
+        pdf_profile = self.get_pdf_profile(request)
+        if fmt != 'json':
+            data = label_service.render(template, serializer.data, fmt, pdf_profile=pdf_profile)
+            etag = self.label_etag(template, serializer.data, fmt, pdf_profile)
+            return self.binary_response(data, f"product-preview.{fmt}", etag)
+
+        return Response(self.preview_data(request, template, serializer.data, pdf_profile))
 
     @action(detail=False, methods=['post'], url_path='contractor')
     def contractor(self, request):
@@ -83,59 +281,178 @@ class TemplateLabelViewSet(ViewSet):
             logger.error("Missing field: template")
             return Response({'error': 'Missing field: template'}, status=400)
 
-        image = label_service.generate_png_preview_base64(template, serializer.data)
-        pdf = label_service.generate_pdf_preview_base64(template, serializer.data)
-        return Response({'image': image, 'pdf': pdf})
+        fmt = self.label_format(request)
+        pdf_profile = self.get_pdf_profile(request)
+        if fmt != 'json':
+            data = label_service.render(template, serializer.data, fmt, pdf_profile=pdf_profile)
+            etag = self.label_etag(template, serializer.data, fmt, pdf_profile)
+            return self.binary_response(data, f"contractor-preview.{fmt}", etag)
 
+        return Response(self.preview_data(request, template, serializer.data, pdf_profile))
 
-class ProductLabelViewSet(ViewSet):
+
+class ProductLabelViewSet(LabelThumbnailMixin, ViewSet):
     permission_classes = [IsAuthenticated, IsPrintOperator]
+    thumbnail_kind = "product"
+    thumbnail_model = Product
+
+    # the catalog order (Product.Meta.ordering) with pk to keep the keyset unique
+    list_ordering = ('-category_name', 'name', 'pk')
 
     def list(self, request):
-        products = (
+        products = self.list_queryset(request)
+        pagination = KeysetPagination(self.list_ordering)
+        paginated = pagination.is_requested(request)
+        products = pagination.paginate(products, request) if paginated else products.order_by(*self.list_ordering)
+
+        data = ProductTemplateListSerializer(self.list_results(request, products), many=True).data
+        if paginated:
+            return Response({"next": pagination.get_next_url(), "results": data})
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        query = search_query(request)
+        products = search_products(self.list_queryset(request), query).values(
+            'pk', 'name', 'category_name', 'template_name', 'similarity'
+        )
+        products = products[:search_limit(request)]
+        return Response(ProductTemplateListSerializer(self.list_results(request, products), many=True).data)
+
+    def list_queryset(self, request):
+        first_template = ProductTemplate.objects.filter(product=OuterRef('pk')).order_by('pk')
+        return (
             Product.objects
-            .filter(status=Product.ProductStatus.AVAILABLE)
-            .select_related('category',)
-            .prefetch_related('org_standart__org_standart')
+            .annotate(
+                category_name=F('category__name'),
+                template_id=Subquery(first_template.values('template_id')[:1]),
+                template_name=Subquery(first_template.values('template__name')[:1]),
+            )
+            .filter(**self.list_filters(request))
+            .values('pk', 'name', 'category_name', 'template_name')
         )
 
+    def list_results(self, request, products):
+        can_edit = admin_has_change_perm(request.user, Product)
         results = []
         for product in products:
             res = {
-                "id": product.pk,
-                "template": product.entity_template.template.name,
-                "name": product.name,
-                "category": getattr(product.category, 'name', None),
+                "id": product["pk"],
+                "template": product["template_name"],
+                "name": product["name"],
+                "category": product["category_name"],
             }
-            if admin_has_change_perm(request.user, Product):
-                res["edit_url"] = request.build_absolute_uri(admin_change_url(Product, product.pk))
+            if "similarity" in product:
+                res["similarity"] = product["similarity"]
+            if can_edit:
+                res["edit_url"] = request.build_absolute_uri(admin_change_url(Product, product["pk"]))
             results.append(res)
-        return Response(ProductTemplateListSerializer(results, many=True).data)
+        self.attach_thumbnails(request, results)
+        return results
 
-    def retrieve(self, request, pk=None):
+    def list_filters(self, request):
+        params = request.query_params
+        filters = {'status': params.get('status', Product.ProductStatus.AVAILABLE)}
+        if filters['status'] not in Product.ProductStatus.values:
+            raise ValidationError({'status': f'Unknown status: {filters["status"]}'})
+        for param, lookup in (('category', 'category_id'), ('template', 'template_id')):
+            value = params.get(param)
+            if value is None:
+                continue
+            if not value.isdigit():
+                raise ValidationError({param: 'A valid integer is required.'})
+            filters[lookup] = int(value)
+        return filters
+
+    def retrieve(self, request, pk=None, format=None):
         product = get_object_or_404(Product, id=pk)
-        serializer = ProductPayloadSerializer(instance=product, context={'request': request})
-        pdf = label_service.generate_pdf_preview_base64(product.entity_template.template, serializer.data)
+        return self.label_response(request, product)
 
+    @action(detail=False, methods=['get'], url_path=r'by-barcode/(?P<ean>\d{13})')
+    def by_barcode(self, request, ean=None, format=None):
+        # scan-to-reprint: one indexed lookup, then the same cached render as retrieve
+        products = list(
+            Product.objects
+            .filter(barcode=ean)
+            .select_related('category')
+            .prefetch_related('product_template__template', 'org_standart__org_standart')
+            .order_by('pk')
+        )
+        available = [product for product in products if product.status == Product.ProductStatus.AVAILABLE]
+        candidates = available or products
+        if not candidates:
+            return Response({'error': f'Product with barcode {ean} not found'}, status=404)
+        if len(candidates) > 1:
+            ids = [product.pk for product in candidates]
+            return Response({'error': f'Barcode {ean} belongs to several products: {ids}'}, status=409)
+        return self.label_response(request, candidates[0])
+
+    def label_response(self, request, product):
+        serializer = ProductPayloadSerializer(instance=product, context={'request': request})
+        entity_template = product.entity_template
+        if not entity_template:
+            return Response({'error': f'Product {product.pk} has no template'}, status=400)
+        template = entity_template.template
+        fmt = self.label_format(request)
+        pdf_profile = self.get_pdf_profile(request)
         result = {
+            "id": product.pk,
             "name": product.name,
             "category": getattr(product.category, 'name', None),
+        }
+        etag = self.label_etag(template, serializer.data, fmt, pdf_profile, fields=result)
+        if self.is_not_modified(request, etag):
+            return self.not_modified(etag)
+
+        tags = [f"product:{product.pk}"]
+        if fmt != 'json':
+            data = label_service.render(template, serializer.data, fmt, tags=tags, pdf_profile=pdf_profile)
+            return self.binary_response(data, f"product-{product.pk}.{fmt}", etag)
+
+        result["pdf"] = label_service.generate_pdf_preview_base64(template, serializer.data, tags=tags, pdf_profile=pdf_profile)
+        return Response(ProductTemplateSerializer(result).data, headers=self.label_headers(etag))
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        serializer = ProductBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+
+        try:
+            jobs = product_jobs(items, request=request)
+        except BatchError as e:
+            return Response({'error': str(e)}, status=e.status)
+
+        pdf = base64.b64encode(render_executor.render_pdf(jobs, pdf_profile=self.get_pdf_profile(request))).decode("utf-8")
+        result = {
+            "pages": sum(item['quantity'] for item in items),
             "pdf": pdf,
         }
-        return Response(ProductTemplateSerializer(result).data)
+        return Response(LabelBatchResultSerializer(result).data)
 
 
-class ContractorLabelViewSet(ViewSet):
+class ContractorLabelViewSet(LabelThumbnailMixin, ViewSet):
     permission_classes = [IsAuthenticated, IsPrintOperator]
+    thumbnail_kind = "contractor"
+    thumbnail_model = Contractor
 
     def list(self, request):
         contractors = (
             Contractor.objects
             .all()
             .select_related('category')
-            .prefetch_related('category')
         )
+        return Response(ContractorTemplateListSerializer(self.list_results(request, contractors), many=True).data)
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        query = search_query(request)
+        contractors = search_contractors(Contractor.objects.select_related('category'), query)
+        contractors = contractors[:search_limit(request)]
+        return Response(ContractorTemplateListSerializer(self.list_results(request, contractors), many=True).data)
+
+    def list_results(self, request, contractors):
+        can_edit = admin_has_change_perm(request.user, Contractor)
         results = []
         for contractor in contractors:
             res = {
@@ -144,22 +461,123 @@ class ContractorLabelViewSet(ViewSet):
                 "street": contractor.street,
                 "category": getattr(contractor.category, 'name', None),
             }
-            if admin_has_change_perm(request.user, Contractor):
+            if hasattr(contractor, 'similarity'):
+                res["similarity"] = contractor.similarity
+            if can_edit:
                 res["edit_url"] = request.build_absolute_uri(admin_change_url(Contractor, contractor.pk))
             results.append(res)
-        return Response(ContractorTemplateListSerializer(results, many=True).data)
+        self.attach_thumbnails(request, results)
+        return results
 
-    def retrieve(self, request, pk=None):
+    def retrieve(self, request, pk=None, format=None):
         contractor = get_object_or_404(Contractor, id=pk)
         serializer = ContractorPayloadSerializer(instance=contractor)
-        pdf = label_service.generate_pdf_preview_base64(contractor.entity_template.template, serializer.data)
-
+        entity_template = contractor.entity_template
+        if not entity_template:
+            return Response({'error': f'Contractor {contractor.pk} has no template'}, status=400)
+        template = entity_template.template
+        fmt = self.label_format(request)
+        pdf_profile = self.get_pdf_profile(request)
         result = {
             "name": contractor.name,
             "category": getattr(contractor.category, 'name', None),
+        }
+        etag = self.label_etag(template, serializer.data, fmt, pdf_profile, fields=result)
+        if self.is_not_modified(request, etag):
+            return self.not_modified(etag)
+
+        tags = [f"contractor:{contractor.pk}"]
+        if fmt != 'json':
+            data = label_service.render(template, serializer.data, fmt, tags=tags, pdf_profile=pdf_profile)
+            return self.binary_response(data, f"contractor-{contractor.pk}.{fmt}", etag)
+
+        result["pdf"] = label_service.generate_pdf_preview_base64(template, serializer.data, tags=tags, pdf_profile=pdf_profile)
+        return Response(ContractorTemplateSerializer(result).data, headers=self.label_headers(etag))
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        serializer = ContractorBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+
+        try:
+            jobs = contractor_jobs(items, request=request)
+        except BatchError as e:
+            return Response({'error': str(e)}, status=e.status)
+
+        pdf = base64.b64encode(render_executor.render_pdf(jobs, pdf_profile=self.get_pdf_profile(request))).decode("utf-8")
+        result = {
+            "pages": sum(item['quantity'] for item in items),
             "pdf": pdf,
         }
-        return Response(ContractorTemplateSerializer(result).data)
+        return Response(LabelBatchResultSerializer(result).data)
+
+
+class RenderJobViewSet(ViewSet):
+    permission_classes = [IsAuthenticated, IsPrintOperator]
+
+    def create(self, request):
+        serializer = RenderJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [
+            {k: v.isoformat() if hasattr(v, 'isoformat') else v for k, v in item.items()}
+            for item in serializer.validated_data['items']
+        ]
+        # recorded before dispatch, so the owner is known while the job is still pending
+        job = RenderJob.objects.create(id=str(uuid.uuid4()), owner=request.user)
+        result = render_label_job.apply_async(
+            (serializer.validated_data['kind'], items),
+            {'pdf_profile': serializer.validated_data.get('pdf_profile')},
+            task_id=job.id,
+        )
+        return Response(self._job_data(request, result), status=202)
+
+    def retrieve(self, request, pk=None):
+        result = self._get_result(request, pk)
+        if result is None:
+            return Response({'error': f'Job {pk} not found'}, status=404)
+        return Response(self._job_data(request, result))
+
+    @action(detail=True, methods=['get'], url_path='download')
+    def download(self, request, pk=None):
+        result = self._get_result(request, pk)
+        if result is None:
+            return Response({'error': f'Job {pk} not found'}, status=404)
+        if result.state != 'SUCCESS':
+            return Response({'error': f'Job is not finished: {result.state}'}, status=409)
+
+        path = result.result['path']
+        if not default_storage.exists(path):
+            return Response({'error': 'Job artifact has expired'}, status=404)
+        return FileResponse(
+            default_storage.open(path, 'rb'),
+            content_type='application/pdf',
+            as_attachment=True,
+            filename=f'labels-{pk}.pdf',
+        )
+
+    def _get_result(self, request, pk):
+        # someone else's job id looks the same as an unknown one
+        jobs = RenderJob.objects.filter(pk=pk)
+        if not request.user.is_superuser:
+            jobs = jobs.filter(owner=request.user)
+        if not jobs.exists():
+            return None
+        return celery_app.AsyncResult(pk)
+
+    def _job_data(self, request, result):
+        info = result.info if isinstance(result.info, dict) else {}
+        data = {
+            "job_id": result.id,
+            "status": result.state.lower(),
+            "pages_done": info.get('pages_done', 0),
+            "pages_total": info.get('pages_total'),
+        }
+        if result.state == 'SUCCESS':
+            data["download_url"] = request.build_absolute_uri(reverse('render-job-download', args=[result.id]))
+        elif result.state == 'FAILURE':
+            data["error"] = str(result.info)
+        return RenderJobSerializer(data).data
 
 
 def qz_cert(request):
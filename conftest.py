@@ -0,0 +1,160 @@
+import os
+import pytest
+import redis
+from decimal import Decimal
+from django.contrib.auth.models import Group, User
+from rest_framework.test import APIClient
+from main.models import (
+    BaseInfo,
+    Contractor,
+    ContractorCategory,
+    ContractorTemplate,
+    Product,
+    ProductCategory,
+    ProductTemplate,
+    Template,
+)
+
+PRODUCT_ELEMENTS = {
+    "name": {"x": 0, "y": 1, "width": 58, "height": 8, "style": "product__title", "options": {"min_fontsize": 6}},
+    "ingredients": {"x": 0, "y": 10, "width": 58, "height": 14, "style": "product__body_2", "options": {"min_fontsize": 2}},
+    "nutrition": {"x": 0, "y": 25, "width": 58, "height": 3, "style": "product__caption"},
+    "caption": {"x": 0, "y": 28, "width": 40, "height": 6, "style": "product__caption"},
+    "company_info": {"x": 0, "y": 34, "width": 40, "height": 5, "style": "product__caption"},
+    "barcode": {"x": 40, "y": 28, "width": 18, "height": 10, "type": "barcode"},
+    "eac": {"x": 50, "y": 1, "width": 6, "height": 5, "type": "image", "filename": "EAC.png"},
+    "weight": {"x": 0, "y": 39, "width": 58, "height": 1, "style": "contractor__title", "options": {"min_fontsize": 4}},
+}
+
+CONTRACTOR_ELEMENTS = {
+    "contractor": {"x": 0, "y": 2, "width": 58, "height": 10, "style": "contractor__title", "options": {"min_fontsize": 10}},
+    "name": {"x": 0, "y": 12, "width": 58, "height": 8, "style": "contractor__subtitle_1"},
+    "city": {"x": 0, "y": 20, "width": 58, "height": 6, "style": "contractor__subtitle_2"},
+    "street": {"x": 0, "y": 26, "width": 58, "height": 6, "style": "contractor__subtitle_2", "options": {"min_fontsize": 6}},
+    "comment": {"x": 0, "y": 32, "width": 58, "height": 4, "style": "contractor__caption"},
+    "company_short_info": {"x": 0, "y": 36, "width": 58, "height": 4, "style": "contractor__caption"},
+}
+
+
+@pytest.fixture(autouse=True)
+def label_settings(settings, tmp_path):
+    # every test gets its own render cache and no Redis
+    settings.LABEL_RENDER_CACHE = "disk"
+    settings.LABEL_RENDER_CACHE_DIR = str(tmp_path / "render_cache")
+    settings.LABEL_CACHE_REDIS_URL = ""
+    settings.LABEL_RENDER_WORKERS = 0
+    yield settings
+    from api.services.layout import layout_cache
+    from api.services.render_cache import render_cache
+    from api.utils.access import user_access
+    from main.utils.base_info import base_info_cache
+
+    layout_cache.invalidate()
+    render_cache.reset_stats()
+    user_access.clear()
+    base_info_cache.clear()
+
+
+@pytest.fixture
+def redis_url():
+    # a real Redis (the CI service); its own database, flushed around each test
+    url = os.environ.get("TEST_REDIS_URL", "redis://localhost:6379/15")
+    client = redis.Redis.from_url(url, socket_connect_timeout=0.5)
+    try:
+        client.flushdb()
+    except redis.ConnectionError:
+        pytest.skip(f"Redis is not reachable at {url}")
+    yield url
+    client.flushdb()
+
+
+@pytest.fixture
+def base_info(db):
+    info = BaseInfo.get_solo()
+    info.name = "ООО «Кухня»"
+    info.address = "г. Тюмень, ул. Республики, 1"
+    info.short_address = "Тюмень, Республики, 1"
+    info.phone_number = "+7 (3452) 00-00-00"
+    info.save()
+    return info
+
+
+@pytest.fixture
+def product_template(db):
+    return Template.objects.create(name="product", width=58, height=40, elements=PRODUCT_ELEMENTS)
+
+
+@pytest.fixture
+def contractor_template(db):
+    return Template.objects.create(name="contractor", width=58, height=40, elements=CONTRACTOR_ELEMENTS)
+
+
+@pytest.fixture
+def product_category(db):
+    return ProductCategory.objects.create(name="Салаты")
+
+
+@pytest.fixture
+def make_product(product_category, product_template):
+    counter = iter(range(1, 10 ** 6))
+
+    def make(template=product_template, **fields):
+        n = next(counter)
+        values = {
+            "category": product_category,
+            "name": f"Салат №{n}",
+            "ingredients": "Капуста, морковь, масло подсолнечное, соль.",
+            "weight": "150 гр.",
+            "calories": Decimal("120.50"),
+            "protein": Decimal("2.10"),
+            "fat": Decimal("9.00"),
+            "carbs": Decimal("7.30"),
+            "barcode": f"46{n:011d}",
+        }
+        values.update(fields)
+        product = Product.objects.create(**values)
+        if template is not None:
+            ProductTemplate.objects.create(product=product, template=template)
+        return product
+
+    return make
+
+
+@pytest.fixture
+def product(base_info, make_product):
+    return make_product()
+
+
+@pytest.fixture
+def contractor_category(db):
+    return ContractorCategory.objects.create(name="Больница")
+
+
+@pytest.fixture
+def make_contractor(contractor_category, contractor_template):
+    counter = iter(range(1, 10 ** 6))
+
+    def make(template=contractor_template, **fields):
+        n = next(counter)
+        values = {"category": contractor_category, "name": f"Отделение №{n}", "city": "Тюмень", "street": "Мельникайте, 75"}
+        values.update(fields)
+        contractor = Contractor.objects.create(**values)
+        if template is not None:
+            ContractorTemplate.objects.create(contractor=contractor, template=template)
+        return contractor
+
+    return make
+
+
+@pytest.fixture
+def operator(db):
+    user = User.objects.create_user("operator", password="operator")
+    user.groups.add(Group.objects.get_or_create(name="Печатник")[0])
+    return user
+
+
+@pytest.fixture
+def api_client(operator):
+    client = APIClient()
+    client.force_authenticate(operator)
+    return client
@@ -43,6 +43,50 @@ DATABASES = {
 CELERY_BROKER_URL = env("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND")
 CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER")
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    "cleanup-label-jobs": {
+        "task": "api.tasks.cleanup_label_jobs",
+        "schedule": crontab(minute=0),
+    },
+    "prerender-next-day": {
+        "task": "api.tasks.prerender_next_day",
+        "schedule": crontab(hour=0, minute=30),
+    },
+}
+
+# -------------------------
+# LABELS
+# -------------------------
+
+# Redis shared by every worker for the barcode and render caches, access snapshots and
+# BaseInfo invalidation. Defaults to the Celery broker when that is Redis; "" keeps all of
+# them per process.
+LABEL_CACHE_REDIS_URL = env(
+    "LABEL_CACHE_REDIS_URL",
+    default=CELERY_BROKER_URL if CELERY_BROKER_URL.startswith(("redis://", "rediss://")) else "",
+)
+BARCODE_CACHE_SIZE = env.int("BARCODE_CACHE_SIZE", default=1024)
+BASE_INFO_CACHE_TTL = env.int("BASE_INFO_CACHE_TTL", default=60)
+ACCESS_CACHE_TTL = env.int("ACCESS_CACHE_TTL", default=60)
+# without LABEL_CACHE_REDIS_URL a revoked group stays valid in other workers this long
+ACCESS_CACHE_LOCAL_TTL = env.int("ACCESS_CACHE_LOCAL_TTL", default=5)
+LABEL_BATCH_MAX_PAGES = env.int("LABEL_BATCH_MAX_PAGES", default=2000)
+# Render processes each gunicorn/celery worker may start for large batch PDFs. Every one
+# runs django.setup() and compiles all templates, so the total is workers x this; 1 renders
+# in the worker itself and never starts a pool.
+LABEL_RENDER_WORKERS = env.int("LABEL_RENDER_WORKERS", default=1)
+LABEL_RENDER_CHUNK_PAGES = env.int("LABEL_RENDER_CHUNK_PAGES", default=50)
+LABEL_JOB_TTL_HOURS = env.int("LABEL_JOB_TTL_HOURS", default=24)
+LABEL_RENDER_CACHE = env("LABEL_RENDER_CACHE", default="disk")
+LABEL_RENDER_CACHE_DIR = env("LABEL_RENDER_CACHE_DIR", default=str(BASE_DIR / "media" / "render_cache"))
+LABEL_RENDER_CACHE_MAX_BYTES = env.int("LABEL_RENDER_CACHE_MAX_BYTES", default=256 * 1024 * 1024)
+LABEL_RENDER_CACHE_TTL = env.int("LABEL_RENDER_CACHE_TTL", default=60 * 60 * 24 * 7)
+LABEL_PRERENDER_FORMATS = env.list("LABEL_PRERENDER_FORMATS", default=["pdf"])
+LABEL_PDF_PROFILE = env("LABEL_PDF_PROFILE", default="compact")
+LABEL_PNG_MODE = env("LABEL_PNG_MODE", default="threshold")
+LABEL_PNG_THRESHOLD = env.int("LABEL_PNG_THRESHOLD", default=128)
+LABEL_PNG_COMPRESS_LEVEL = env.int("LABEL_PNG_COMPRESS_LEVEL", default=6)
 
 # -------------------------
 # APPS
@@ -51,6 +95,7 @@ CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER")
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
+    "django.contrib.postgres",
     "simple_history",
     "corsheaders",
     "rest_framework",
@@ -289,6 +334,7 @@ if not DEBUG:
 
 LANGUAGE_CODE = "ru-ru"
 TIME_ZONE = "Asia/Yekaterinburg"
+CELERY_TIMEZONE = TIME_ZONE
 USE_I18N = True
 USE_TZ = True
 
@@ -2,9 +2,8 @@ import os
 import redis
 from django.conf import settings
 from django.db import connections
-from celery import Celery
+from core.celery import app
 
-app = Celery("core")
 REDIS_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 
 def check_db():
@@ -0,0 +1,24 @@
+import redis
+from functools import lru_cache
+from django.conf import settings
+
+
+def get_label_cache_redis():
+    url = getattr(settings, "LABEL_CACHE_REDIS_URL", "")
+    if not url:
+        return None
+    return _client(url)
+
+
+@lru_cache(maxsize=None)
+def _client(url: str):
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def get_label_cache_pubsub():
+    # a fresh connection per subscriber; it blocks on reads, so no socket timeout
+    url = getattr(settings, "LABEL_CACHE_REDIS_URL", "")
+    if not url:
+        return None
+    client = redis.Redis.from_url(url, socket_connect_timeout=0.5, health_check_interval=30)
+    return client.pubsub(ignore_subscribe_messages=True)
@@ -3,10 +3,12 @@ from django.contrib import admin, messages
 from django.utils.safestring import mark_safe
 from django.db.models import JSONField
 from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
 from django_celery_beat import models
 from django_json_widget.widgets import JSONEditorWidget
 from simple_history.admin import SimpleHistoryAdmin
-from .utils.admin import ProductTemplateFilter, generate_barcode
+from .utils.admin import DuplicateBarcodeFilter, ProductTemplateFilter, generate_barcode
 from .models import BaseInfo, Template, OrgStandart, ContractorCategory, ContractorTemplate, Contractor, Product, ProductCategory, ProductTemplate, ProductOrgStandart
 
 logger = logging.getLogger(__name__)
@@ -21,6 +23,8 @@ class BaseInfoAdmin(SimpleHistoryAdmin):
 
 @admin.register(Template)
 class TemplateAdmin(SimpleHistoryAdmin):
+    change_form_template = "admin/template_overflow_action.html"
+
     list_display = ["name", "width", "height",]
     fields = ["name", "width", "height", "elements", "label_preview",]
     readonly_fields = ["label_preview",]
@@ -28,6 +32,35 @@ class TemplateAdmin(SimpleHistoryAdmin):
         JSONField: {'widget': JSONEditorWidget},
     }
 
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        obj = self.get_object(request, object_id)
+        if obj and request.method == "POST" and '_overflow' in request.POST:
+            if not self.has_change_permission(request, obj):
+                raise PermissionDenied
+            saved = {name: getattr(obj, name) for name in ("width", "height", "elements")}
+            form = self.get_form(request, obj)(request.POST, instance=obj)
+            if form.is_valid():
+                edited = any(form.cleaned_data[name] != value for name, value in saved.items())
+                return self.overflow_report(request, obj, form.cleaned_data, edited)
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    def overflow_report(self, request, obj, data, edited=False):
+        # checks the edited markup without saving it
+        from api.services.overflow import analyze_template
+
+        snapshot = {"pk": obj.pk, "name": obj.name, "width": data["width"], "height": data["height"], "elements": data["elements"]}
+        report = analyze_template(snapshot)
+        logger.info(f"{obj} overflow check: {len(report.problems)} problem elements in {report.seconds:.2f}s")
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "original": obj,
+            "title": "Проверка переполнения",
+            "report": report,
+            "edited": edited,
+        }
+        return TemplateResponse(request, "admin/template_overflow_report.html", context)
+
     @admin.display(description="Этикетка")
     def label_preview(self, obj):
         return mark_safe("""
@@ -135,7 +168,7 @@ class ProductAdmin(SimpleHistoryAdmin):
     )
     readonly_fields = ["status", "barcode_preview", "label_preview",]
     search_fields = ["name", "barcode",]
-    list_filter = ["category", "status", ProductTemplateFilter,]
+    list_filter = ["category", "status", ProductTemplateFilter, DuplicateBarcodeFilter,]
     inlines = [ProductOrgStandartInline, ProductTemplateInline,]
     actions = None
 
@@ -8,12 +8,12 @@ class MainConfig(AppConfig):
     def ready(self):
         from django.contrib import admin
         from .utils.fonts import register_fonts
-        from .models import BaseInfo
+        from .utils.base_info import base_info_cache
 
         register_fonts()
 
         try:
-            info = BaseInfo.get_solo()
+            info = base_info_cache.get()
             if info:
                 admin.site.site_header = info.name
                 admin.site.site_title = info.name
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from main.models import Product, duplicate_barcodes
+
+class Command(BaseCommand):
+    help = "Показать штрихкоды, которые повторяются у нескольких товаров."
+
+    def handle(self, *args, **options):
+        duplicates = list(duplicate_barcodes())
+        if not duplicates:
+            self.stdout.write(self.style.SUCCESS("Повторяющихся штрихкодов нет"))
+            return
+
+        products = (
+            Product.objects
+            .filter(barcode__in=[row["barcode"] for row in duplicates])
+            .select_related("category")
+            .order_by("barcode", "pk")
+        )
+        by_barcode = {}
+        for product in products:
+            by_barcode.setdefault(product.barcode, []).append(product)
+
+        for row in duplicates:
+            self.stdout.write(self.style.WARNING(f"{row['barcode']}: {row['count']} товара(ов)"))
+            for product in by_barcode.get(row["barcode"], []):
+                self.stdout.write(f"    {product.pk} {product.category.name}: {product.name} ({product.get_status_display()})")
+        self.stdout.write(f"Повторяющихся штрихкодов: {len(duplicates)}")
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0015_alter_historicalproduct_status_alter_product_status"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="contractor",
+            index=GinIndex(fields=["name"], name="contractor_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="contractor",
+            index=GinIndex(fields=["city"], name="contractor_city_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="contractor",
+            index=GinIndex(fields=["street"], name="contractor_street_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=GinIndex(fields=["name"], name="product_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=GinIndex(fields=["barcode"], name="product_barcode_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
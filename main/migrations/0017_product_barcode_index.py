@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0016_trigram_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="historicalproduct",
+            name="barcode",
+            field=models.CharField(
+                db_index=True,
+                max_length=13,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        message="Штрихкод должен содержать ровно 13 цифр",
+                        regex="^\\d{13}$",
+                    )
+                ],
+                verbose_name="Штрихкод",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="barcode",
+            field=models.CharField(
+                db_index=True,
+                max_length=13,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        message="Штрихкод должен содержать ровно 13 цифр",
+                        regex="^\\d{13}$",
+                    )
+                ],
+                verbose_name="Штрихкод",
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:41
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0017_product_barcode_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="contractor",
+            name="contractor_name_trgm",
+        ),
+        migrations.RemoveIndex(
+            model_name="contractor",
+            name="contractor_city_trgm",
+        ),
+        migrations.RemoveIndex(
+            model_name="contractor",
+            name="contractor_street_trgm",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_name_trgm",
+        ),
+        migrations.AddIndex(
+            model_name="contractor",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Concat(
+                        "name",
+                        models.Value(" "),
+                        "city",
+                        models.Value(" "),
+                        "street",
+                        output_field=models.TextField(),
+                    ),
+                    name="gist_trgm_ops",
+                ),
+                name="contractor_search_gist",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"], name="product_name_gist", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+    ]
@@ -1,8 +1,23 @@
 from django.db import models
+from django.db.models.functions import Concat
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from simple_history.models import HistoricalRecords
 
 
+def first_related(manager):
+    # .first() always hits the database, even for a prefetched relation
+    queryset = manager.all()
+    if queryset._result_cache is not None:
+        return min(queryset, key=lambda obj: obj.pk, default=None)
+    return queryset.first()
+
+
+def contractor_search_text():
+    # name, city and street as one text: indexed as is and searched by the API
+    return Concat("name", models.Value(" "), "city", models.Value(" "), "street", output_field=models.TextField())
+
+
 class BaseInfo(models.Model):
     name = models.CharField(
         "Название",
@@ -157,10 +172,13 @@ class Contractor(models.Model):
         verbose_name = "этикетка контрагента"
         verbose_name_plural = "этикетки контрагентов"
         ordering = ["-category__name", "city", "street", "name",]
+        indexes = [
+            GistIndex(OpClass(contractor_search_text(), name="gist_trgm_ops"), name="contractor_search_gist"),
+        ]
 
     @property
     def entity_template(self):
-        return self.contractor_template.first()
+        return first_related(self.contractor_template)
 
     def __str__(self):
         name = self.category.name
@@ -191,6 +209,17 @@ class ContractorTemplate(models.Model):
         return f"{self.contractor.category.name} {self.contractor.name if self.contractor.name else ''} ({self.template.name})"
 
 
+def duplicate_barcodes():
+    # one query; the report command and the admin filter share it
+    return (
+        Product.objects
+        .values("barcode")
+        .annotate(count=models.Count("pk"))
+        .filter(count__gt=1)
+        .order_by("-count", "barcode")
+    )
+
+
 class ProductCategory(models.Model):
     name = models.CharField(
         "Название",
@@ -263,6 +292,7 @@ class Product(models.Model):
     barcode = models.CharField(
         "Штрихкод",
         max_length=13,
+        db_index=True,
         validators=[
             RegexValidator(regex=r'^\d{13}$',message='Штрихкод должен содержать ровно 13 цифр'),
         ]
@@ -277,10 +307,15 @@ class Product(models.Model):
         verbose_name = "этикетка товара"
         verbose_name_plural = "этикетки товаров"
         ordering = ["-category__name", "name",]
+        indexes = [
+            # GiST returns the nearest names first (search ordering); GIN serves barcode LIKE
+            GistIndex(fields=["name"], name="product_name_gist", opclasses=["gist_trgm_ops"]),
+            GinIndex(fields=["barcode"], name="product_barcode_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     @property
     def entity_template(self):
-        return self.product_template.first()
+        return first_related(self.product_template)
 
     def __str__(self):
         return self.name
@@ -0,0 +1,79 @@
+import queue
+import runpy
+import pytest
+from django.conf import settings
+from main.models import BaseInfo
+from main.utils import base_info as base_info_module
+from main.utils.base_info import BaseInfoCache
+
+
+def load_settings(monkeypatch, broker):
+    monkeypatch.setenv("CELERY_BROKER_URL", broker)
+    monkeypatch.delenv("LABEL_CACHE_REDIS_URL", raising=False)
+    return runpy.run_path(str(settings.BASE_DIR / "core" / "settings.py"))
+
+
+def test_label_cache_redis_defaults_to_a_redis_broker(monkeypatch):
+    assert load_settings(monkeypatch, "redis://redis:6379/0")["LABEL_CACHE_REDIS_URL"] == "redis://redis:6379/0"
+    assert load_settings(monkeypatch, "memory://")["LABEL_CACHE_REDIS_URL"] == ""
+
+
+class FakePubSub:
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.channels = []
+
+    def subscribe(self, channel):
+        self.channels.append(channel)
+
+    def listen(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                raise ConnectionError("connection closed")
+            yield message
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pubsub(settings, monkeypatch):
+    settings.LABEL_CACHE_REDIS_URL = "redis://redis:6379/1"
+    fake = FakePubSub()
+    connections = iter([fake])
+    monkeypatch.setattr(base_info_module, "get_label_cache_pubsub", lambda: next(connections, None))
+    monkeypatch.setattr(base_info_module, "RETRY_SECONDS", 0)
+    yield fake
+    fake.messages.put(None)
+
+
+def wait_until(condition, timeout=5):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_published_invalidation_reaches_other_processes(base_info, pubsub):
+    cache = BaseInfoCache(ttl=0)
+    assert cache.get().name == base_info.name
+    wait_until(cache._listening.is_set)
+    assert pubsub.channels == [base_info_module.CHANNEL]
+    cache.get()
+
+    # a save in another process: no signal here, only the published message
+    BaseInfo.objects.filter(pk=base_info.pk).update(name="ООО «Новая кухня»")
+    assert cache.get().name == base_info.name
+    pubsub.messages.put({"type": "message", "data": b"1"})
+    wait_until(lambda: cache._info is None)
+    assert cache.get().name == "ООО «Новая кухня»"
+
+
+def test_without_redis_the_copy_expires(base_info):
+    cache = BaseInfoCache(ttl=0)
+    cache.get()
+    BaseInfo.objects.filter(pk=base_info.pk).update(name="ООО «Новая кухня»")
+    assert cache.get().name == "ООО «Новая кухня»"
@@ -0,0 +1,45 @@
+from io import StringIO
+from django.core.management import call_command
+from main.models import Product, duplicate_barcodes
+
+
+def test_duplicate_barcodes(make_product):
+    assert list(duplicate_barcodes()) == []
+
+    make_product(barcode="4600000000017")
+    make_product(barcode="4600000000017", status=Product.ProductStatus.ARCHIEVED)
+    for _ in range(3):
+        make_product(barcode="4600000000024")
+    make_product()
+
+    assert list(duplicate_barcodes()) == [
+        {"barcode": "4600000000024", "count": 3},
+        {"barcode": "4600000000017", "count": 2},
+    ]
+
+
+def test_admin_duplicate_filter(admin_client, make_product):
+    first = make_product(barcode="4600000000017")
+    second = make_product(barcode="4600000000017")
+    make_product()
+
+    response = admin_client.get("/main/product/?barcode_duplicate=yes")
+    assert response.status_code == 200
+    assert {product.pk for product in response.context["cl"].result_list} == {first.pk, second.pk}
+    assert len(admin_client.get("/main/product/").context["cl"].result_list) == 3
+
+
+def test_report_duplicate_barcodes(make_product):
+    out = StringIO()
+    call_command("report_duplicate_barcodes", stdout=out)
+    assert "Повторяющихся штрихкодов нет" in out.getvalue()
+
+    first = make_product(barcode="4600000000017", name="Плов")
+    second = make_product(barcode="4600000000017", name="Борщ", status=Product.ProductStatus.ARCHIEVED)
+    out = StringIO()
+    call_command("report_duplicate_barcodes", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "4600000000017: 2 товара(ов)"
+    assert lines[1].split() == [str(first.pk), "Салаты:", "Плов", "(Доступен)"]
+    assert lines[2].split()[:3] == [str(second.pk), "Салаты:", "Борщ"]
+    assert lines[-1] == "Повторяющихся штрихкодов: 1"
@@ -0,0 +1,38 @@
+import threading
+from pathlib import Path
+from main.utils.fonts import FONT_FILES, FontRegistry, font_registry, get_pil_font
+
+
+def test_each_font_file_is_read_once_and_shared(monkeypatch):
+    reads = []
+    read_bytes = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda path: (reads.append(path.name), read_bytes(path))[1])
+    registry = FontRegistry()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def use_fonts():
+        barrier.wait()
+        results.append([
+            (registry.ttfont(name), registry.pil_font(name, 24), registry.widths(name), registry.data(name))
+            for name in list(FONT_FILES) + ["Unknown"]
+        ])
+
+    threads = [threading.Thread(target=use_fonts) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(reads) == sorted(FONT_FILES.values())
+    first = results[0]
+    for other in results[1:]:
+        assert all(a is b for mine, theirs in zip(first, other) for a, b in zip(mine, theirs))
+    # an unknown name shares everything with the fallback
+    assert all(a is b for a, b in zip(first[-1], first[list(FONT_FILES).index(registry.fallback)]))
+
+
+def test_pil_fonts_are_cached_per_size():
+    assert get_pil_font("Tahoma", 24) is font_registry.pil_font("Tahoma", 24.0001)
+    assert get_pil_font("Tahoma", 24) is not get_pil_font("Tahoma", 25)
+    assert font_registry.pil_font("Tahoma", 25).size == 25
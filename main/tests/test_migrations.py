@@ -0,0 +1,52 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+# index name: (method, opclass) after 0018
+TRIGRAM_INDEXES = {
+    "product_barcode_trgm": ("gin", "gin_trgm_ops"),
+    "product_name_gist": ("gist", "gist_trgm_ops"),
+    "contractor_search_gist": ("gist", "gist_trgm_ops"),
+}
+# what 0016 created
+GIN_INDEXES = {
+    "contractor_name_trgm",
+    "contractor_city_trgm",
+    "contractor_street_trgm",
+    "product_name_trgm",
+    "product_barcode_trgm",
+}
+
+
+def trigram_indexes():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE indexdef LIKE '%%trgm_ops%%'")
+        return dict(cursor.fetchall())
+
+
+def has_trigram_extension():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def migrate(target):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([target])
+
+
+def test_trigram_indexes_migrations(db):
+    assert has_trigram_extension()
+    indexes = trigram_indexes()
+    assert set(indexes) == set(TRIGRAM_INDEXES)
+    for name, (method, opclass) in TRIGRAM_INDEXES.items():
+        assert f"USING {method}" in indexes[name] and opclass in indexes[name]
+
+    migrate(("main", "0017_product_barcode_index"))
+    assert set(trigram_indexes()) == GIN_INDEXES
+    assert all("USING gin" in indexdef for indexdef in trigram_indexes().values())
+
+    migrate(("main", "0015_alter_historicalproduct_status_alter_product_status"))
+    assert trigram_indexes() == {}
+    migrate(("main", "0018_trigram_gist_indexes"))
+    assert set(trigram_indexes()) == set(TRIGRAM_INDEXES)
@@ -0,0 +1,37 @@
+import json
+from main.models import Template
+
+
+def overflow_post(admin_client, template, **changes):
+    data = {"name": template.name, "width": template.width, "height": template.height, "elements": template.elements}
+    data.update(changes)
+    data["elements"] = json.dumps(data["elements"])
+    return admin_client.post(f"/main/template/{template.pk}/change/", {**data, "_overflow": "1"})
+
+
+def test_overflow_report_of_the_saved_markup(admin_client, product_template, make_product):
+    make_product(ingredients="Капуста, морковь. " * 400)
+
+    response = overflow_post(admin_client, product_template)
+    assert response.status_code == 200
+    assert response.context["edited"] is False
+    report = response.context["report"]
+    assert report.products == 1
+    assert report.elements["ingredients"].overflow == 1
+
+
+def test_overflow_report_of_a_draft_leaves_the_template_alone(admin_client, product_template, make_product):
+    make_product(ingredients="Капуста, морковь. " * 400)
+    saved = Template.objects.get(pk=product_template.pk)
+    history = product_template.history.count()
+    elements = {**product_template.elements, "ingredients": {**product_template.elements["ingredients"], "height": 38}}
+
+    response = overflow_post(admin_client, product_template, height=80, elements=elements)
+    assert response.status_code == 200
+    assert response.context["edited"] is True
+    assert response.context["report"].elements["ingredients"].overflow == 0
+    assert "не сохранена" in response.content.decode()
+
+    product_template.refresh_from_db()
+    assert (product_template.height, product_template.elements) == (saved.height, saved.elements)
+    assert product_template.history.count() == history
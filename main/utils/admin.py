@@ -1,9 +1,7 @@
 import base64
 from django.contrib.admin import SimpleListFilter
-from io import BytesIO
-from main.models import Template
-from barcode import EAN13
-from barcode.writer import ImageWriter
+from main.models import Template, duplicate_barcodes
+from .barcode import barcode_cache
 
 
 class ProductTemplateFilter(SimpleListFilter):
@@ -25,19 +23,19 @@ class ProductTemplateFilter(SimpleListFilter):
             )
         return queryset
 
+
+class DuplicateBarcodeFilter(SimpleListFilter):
+    title = "Штрихкод"
+    parameter_name = "barcode_duplicate"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Повторяется")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(barcode__in=duplicate_barcodes().values("barcode"))
+        return queryset
+
+
 def generate_barcode(barcode: str) -> str:
-    code = barcode[:12]
-    buffer = BytesIO()
-    writer = ImageWriter()
-    writer.dpi = 300
-    EAN13(code, writer=writer).write(
-        buffer,
-        options={
-            "quiet_zone": 0,
-            "write_text": True,
-            "foreground": "black",
-            "background": "white",
-            "module_width": 0.5,
-        },
-    )
-    return base64.b64encode(buffer.getvalue()).decode()
+    return base64.b64encode(barcode_cache.get_png(barcode)).decode()
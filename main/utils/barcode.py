@@ -0,0 +1,118 @@
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from barcode import EAN13
+from barcode.writer import ImageWriter
+from django.conf import settings
+from core.utils.redis_client import get_label_cache_redis
+
+logger = logging.getLogger(__name__)
+
+BARCODE_DPI = 300
+BARCODE_OPTIONS = {
+    "quiet_zone": 0,
+    "write_text": True,
+    "foreground": "black",
+    "background": "white",
+    "module_width": 0.5,
+}
+REDIS_PREFIX = "barcode:"
+REDIS_TTL = 60 * 60 * 24 * 30
+
+
+class BarcodeCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def get_png(self, barcode: str, options: Optional[Dict[str, Any]] = None, dpi: int = BARCODE_DPI) -> bytes:
+        code = str(barcode)[:12]
+        options = {**BARCODE_OPTIONS, **(options or {})}
+        key = self._key(code, options, dpi)
+
+        with self._lock:
+            png = self._items.get(key)
+            if png is not None:
+                self._items.move_to_end(key)
+                self.memory_hits += 1
+                return png
+
+        png = self._redis_get(key)
+        if png is not None:
+            with self._lock:
+                self.redis_hits += 1
+        else:
+            png = self._render(code, options, dpi)
+            self._redis_set(key, png)
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._items[key] = png
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return png
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.redis_hits + self.misses
+            return {
+                "size": len(self._items),
+                "memory_hits": self.memory_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.memory_hits = self.redis_hits = self.misses = 0
+
+    def _key(self, code: str, options: Dict[str, Any], dpi: int) -> str:
+        opts = ",".join(f"{k}={options[k]}" for k in sorted(options))
+        return f"{code}|{dpi}|{opts}"
+
+    def _render(self, code: str, options: Dict[str, Any], dpi: int) -> bytes:
+        buffer = BytesIO()
+        writer = ImageWriter()
+        writer.dpi = dpi
+        EAN13(code, writer=writer).write(buffer, options=options)
+        return buffer.getvalue()
+
+    def _redis_get(self, key: str) -> Optional[bytes]:
+        client = get_label_cache_redis()
+        if client is None:
+            return None
+        try:
+            return client.get(REDIS_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Barcode cache redis read failed: {e}")
+            return None
+
+    def _redis_set(self, key: str, png: bytes):
+        client = get_label_cache_redis()
+        if client is None:
+            return
+        try:
+            client.set(REDIS_PREFIX + key, png, ex=REDIS_TTL)
+        except Exception as e:
+            logger.warning(f"Barcode cache redis write failed: {e}")
+
+
+def ean13_widget(barcode: str, width: float, height: float, min_dpi: int = 203):
+    from reportlab.graphics.barcode import eanbc
+
+    raw_module = width / 95
+    module_px = max(1, round(raw_module * min_dpi / 72))
+    bar_width = module_px * 72 / min_dpi
+    return eanbc.Ean13BarcodeWidget(barcode, barWidth=bar_width, barHeight=height, humanReadable=True)
+
+
+barcode_cache = BarcodeCache(maxsize=getattr(settings, "BARCODE_CACHE_SIZE", 1024))
@@ -0,0 +1,92 @@
+import os
+import time
+import logging
+import threading
+from django.conf import settings
+from core.utils.redis_client import get_label_cache_pubsub, get_label_cache_redis
+from main.models import BaseInfo
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "base_info:invalidate"
+RETRY_SECONDS = 5
+
+
+class BaseInfoCache:
+    # One BaseInfo per process. Saves anywhere are broadcast over Redis pub/sub; without
+    # a subscription (no Redis, or it is down) the copy is only trusted for ttl seconds.
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._info = None
+        self._loaded = 0.0
+        self._generation = 0
+        self._pid = None
+        self._listening = threading.Event()
+        self._lock = threading.Lock()
+
+    def get(self):
+        self._ensure_listener()
+        info = self._info
+        if info is not None and (self._listening.is_set() or time.monotonic() - self._loaded < self.ttl):
+            return info
+        generation = self._generation
+        info = BaseInfo.get_solo()
+        with self._lock:
+            # an invalidation that arrived during the query wins
+            if generation == self._generation:
+                self._info, self._loaded = info, time.monotonic()
+        return info
+
+    def invalidate(self, broadcast: bool = True):
+        self.clear()
+        if not broadcast:
+            return
+        client = get_label_cache_redis()
+        if client is None:
+            return
+        try:
+            client.publish(CHANNEL, str(os.getpid()))
+        except Exception as e:
+            logger.warning(f"BaseInfo invalidation publish failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._info = None
+            self._generation += 1
+
+    def _ensure_listener(self):
+        # threads do not survive fork, so every gunicorn/celery child starts its own
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._info = None
+            self._listening.clear()
+            if getattr(settings, "LABEL_CACHE_REDIS_URL", ""):
+                threading.Thread(target=self._listen, name="base-info-invalidation", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            pubsub = get_label_cache_pubsub()
+            if pubsub is None:
+                return
+            try:
+                pubsub.subscribe(CHANNEL)
+                # saves made while unsubscribed were missed
+                self.clear()
+                self._listening.set()
+                for _ in pubsub.listen():
+                    self.clear()
+            except Exception as e:
+                logger.warning(f"BaseInfo invalidation listener failed: {e}")
+            finally:
+                self._listening.clear()
+                self.clear()
+                pubsub.close()
+            time.sleep(RETRY_SECONDS)
+
+
+base_info_cache = BaseInfoCache(ttl=getattr(settings, "BASE_INFO_CACHE_TTL", 60))
@@ -1,5 +1,9 @@
 import logging
+import threading
+from io import BytesIO
 from pathlib import Path
+from typing import Dict, Tuple
+from PIL import ImageFont
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
 
@@ -7,18 +11,92 @@ logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 FONTS_DIR = BASE_DIR / "static" / "fonts"
+FONT_FILES = {
+    "Tahoma": "tahoma.ttf",
+    "Tahoma Bold": "tahoma_bold.ttf",
+    "DejaVu Sans": "dejavu_sans.ttf",
+    "DejaVu Sans Bold": "dejavu_sans_bold.ttf",
+}
+FALLBACK_FONT = "DejaVu Sans"
+
+
+class FontRegistry:
+    # Each font file is read once; ReportLab, PIL and text measurement all share it.
+    def __init__(self, root: Path = FONTS_DIR, files: Dict[str, str] = FONT_FILES, fallback: str = FALLBACK_FONT):
+        self.root = root
+        self.files = files
+        self.fallback = fallback
+        self._data: Dict[str, bytes] = {}
+        self._ttfonts: Dict[str, TTFont] = {}
+        self._pil_fonts: Dict[Tuple[str, float], ImageFont.FreeTypeFont] = {}
+        self._widths: Dict[str, Tuple[Dict[int, float], float]] = {}
+        self._lock = threading.RLock()
+
+    def resolve(self, name: str) -> str:
+        return name if name in self.files else self.fallback
+
+    def data(self, name: str) -> bytes:
+        name = self.resolve(name)
+        data = self._data.get(name)
+        if data is None:
+            with self._lock:
+                data = self._data.get(name)
+                if data is None:
+                    data = self._data[name] = (self.root / self.files[name]).read_bytes()
+        return data
+
+    def ttfont(self, name: str) -> TTFont:
+        name = self.resolve(name)
+        font = self._ttfonts.get(name)
+        if font is None:
+            with self._lock:
+                font = self._ttfonts.get(name)
+                if font is None:
+                    font = self._ttfonts[name] = TTFont(name, BytesIO(self.data(name)))
+        return font
+
+    def pil_font(self, name: str, size_px: float) -> ImageFont.FreeTypeFont:
+        key = (self.resolve(name), round(size_px, 2))
+        font = self._pil_fonts.get(key)
+        if font is None:
+            with self._lock:
+                font = self._pil_fonts.get(key)
+                if font is None:
+                    font = self._pil_fonts[key] = ImageFont.truetype(BytesIO(self.data(key[0])), key[1])
+        return font
+
+    def widths(self, name: str) -> Tuple[Dict[int, float], float]:
+        # advance widths per code point in 1/1000 em, plus the width of missing glyphs
+        name = self.resolve(name)
+        table = self._widths.get(name)
+        if table is None:
+            with self._lock:
+                table = self._widths.get(name)
+                if table is None:
+                    face = self.ttfont(name).face
+                    table = self._widths[name] = (dict(face.charWidths), face.defaultWidth)
+        return table
+
+    def string_width(self, text: str, name: str, size: float) -> float:
+        widths, default = self.widths(name)
+        return sum(widths.get(ord(ch), default) for ch in text) * size / 1000
+
+    def register(self):
+        for name in self.files:
+            try:
+                pdfmetrics.registerFont(self.ttfont(name))
+                self.widths(name)
+                logger.info(f"Шрифт {name} успешно зарегистрирован")
+            except Exception as e:
+                logger.exception(f"Не удалось зарегистрировать шрифт {name}: {e}")
+
+
+font_registry = FontRegistry()
+
 
 def register_fonts():
-    fonts = {
-        "Tahoma": "tahoma.ttf",
-        "Tahoma Bold": "tahoma_bold.ttf",
-        "DejaVu Sans": "dejavu_sans.ttf",
-        "DejaVu Sans Bold": "dejavu_sans_bold.ttf",
-    }
-    for name, file in fonts.items():
-        try:
-            pdfmetrics.registerFont(TTFont(name, str(FONTS_DIR / file)))
-            logger.info(f"Шрифт {name} успешно зарегистрирован")
-        except Exception as e:
-            logger.exception(f"Не удалось зарегистрировать шрифт {name}: {e}")
-            pass
+    font_registry.register()
+
+
+def get_pil_font(font_name: str, size_px: float) -> ImageFont.FreeTypeFont:
+    return font_registry.pil_font(font_name, size_px)